@@ -1,8 +1,15 @@
 # ai_player.py
 import random
-from config import BOARD_SIZE, EMPTY, BLACK, WHITE, DIRECTIONS
-from utils import is_on_board
-import rules
+import numpy as np
+from config import EMPTY, BLACK, WHITE, DIRECTIONS
+import ruleset as ruleset_module
+from candidates import CandidateSet
+import profiling
+import lazy_smp
+import mcts
+import ponder
+import search
+import transposition
 # game_io 用於學習，這裡不需要
 # analysis 模組會在傳入的 handler 中使用
 
@@ -17,116 +24,199 @@ WEIGHT_BLOCK_LIVE_THREE = 150 # 阻止對方活三，價值可能略高於自己
 WEIGHT_BLOCK_JUMP_LIVE_THREE = 70
 WEIGHT_BLOCK_SLEEP_THREE = 15
 
+# AnalysisHandler.threat_grids 的權重：(棋型, 形成時的分數, 擋住對手時的分數)，依優先順序
+HEURISTIC_WEIGHTS = (
+    ("five", WEIGHT_WIN, WEIGHT_WIN),
+    ("four", WEIGHT_FOUR, WEIGHT_BLOCK_LIVE_THREE),
+    ("jump_four", WEIGHT_JUMP_FOUR, WEIGHT_BLOCK_JUMP_LIVE_THREE),
+    ("live_three", WEIGHT_LIVE_THREE, WEIGHT_BLOCK_LIVE_THREE),
+    ("jump_live_three", WEIGHT_JUMP_LIVE_THREE, WEIGHT_BLOCK_JUMP_LIVE_THREE),
+)
+
+# --- 引擎：玩家類型 -> find_best_ai_move 的 engine ---
+ENGINE_HEURISTIC = "heuristic"  # 一層啟發式評估
+ENGINE_ALPHABETA = "alphabeta"  # search.AlphaBetaSearch
+ENGINE_MCTS = "mcts"            # mcts.MCTSSearch
+PLAYER_ENGINES = {
+    "ai": ENGINE_HEURISTIC,
+    "ai-ab": ENGINE_ALPHABETA,
+    "ai-mcts": ENGINE_MCTS,
+}
+
+# --- 每手思考時間 (由剩餘時間決定) ---
+MOVES_TO_GO = 30          # 假設剩餘時間要再下的手數
+MIN_MOVE_TIME = 0.2       # 秒
+MAX_MOVE_TIME = 3.0       # 秒，避免畫面長時間停住
+
+
+def is_ai_type(player_type):
+    """player_type 是否由 AI 下棋 ("ai"、"ai-ab"、"ai-mcts" 等)。"""
+    return player_type in PLAYER_ENGINES
+
+
+def engine_for(player_type):
+    return PLAYER_ENGINES.get(player_type, ENGINE_HEURISTIC)
+
+
+def move_time_budget(time_left):
+    """剩餘 time_left 秒時這一手的搜尋時間 (time_left 為 None 時使用 search 的預設值)。"""
+    if time_left is None:
+        return search.DEFAULT_TIME_LIMIT
+    return max(MIN_MOVE_TIME, min(MAX_MOVE_TIME, time_left / MOVES_TO_GO))
+
+
 class AIPlayer:
-    def __init__(self):
-        pass
+    def __init__(self, ruleset=None, tt_mb=transposition.DEFAULT_SIZE_MB, mcts_workers=mcts.DEFAULT_WORKERS,
+                 search_threads=lazy_smp.DEFAULT_WORKERS):
+        """
+        ruleset: ruleset.RuleSet，決定棋盤大小、合法點與鄰點表 (預設 15x15 連珠)。
+        tt_mb: 搜尋共用的置換表大小 (MB)，第一次搜尋時配置。
+        mcts_workers: MCTS 根平行化的行程數 (預設為環境變數 GO5_MCTS_WORKERS 或 1，即在本行程搜尋)。
+        search_threads: alpha-beta 搜尋的行程數 (預設為環境變數 GO5_SEARCH_THREADS 或 1)；
+                        大於 1 時使用 lazy_smp.LazySMPSearch，置換表放在共用記憶體。
+        """
+        self.ruleset = ruleset if ruleset is not None else ruleset_module.default_ruleset()
+        self.tt_mb = tt_mb
+        self.mcts_workers = mcts_workers
+        self.search_threads = search_threads
+        # 行程池在主執行緒建立 (背景思考的執行緒不能建立行程池)
+        if mcts_workers > 1:
+            mcts.start_pool(mcts_workers)
+        if search_threads > 1:
+            lazy_smp.start_pool(search_threads - 1)
+        self.tt = None          # transposition.TranspositionTable，整盤棋的每次搜尋共用
+        self._searcher = None   # AlphaBetaSearch 或 LazySMPSearch，第一次使用時建立
+        self._mcts = None       # MCTSSearch，第一次使用時建立 (整盤棋保留搜尋樹)
+        self.last_search = None # 最近一次 search.SearchResult 或 mcts.MCTSResult
+        self.ponderer = ponder.Ponderer() # 人類思考時的背景搜尋 (stats 為命中率與節省的時間)
+        self._pondered = None   # (棋盤, 命中的結果或 None, 節省的秒數)，只用於同一個棋盤
 
-    def _evaluate_and_find_best_heuristic(self, board, move_count, ai_player, analysis_handler):
+    def _evaluate_and_find_best_heuristic(self, board, move_count, ai_player, analysis_handler, legal_mask=None,
+                                          candidates=None):
         """
         評估所有合法的下一步棋的啟發式分數，並返回最佳分數的著法列表。
-        分數基於形成自身威脅和阻止對手威脅。
+        分數基於形成自身威脅和阻止對手威脅 (AnalysisHandler.threat_grids 的進攻 + 防守分數格)。
+        legal_mask: RuleSet.legal_move_mask 的結果 (未提供時在此計算)。
+        candidates: 與 board 一致的 CandidateSet (未提供時由 board 建立)。
         """
-        opponent_player = WHITE if ai_player == BLACK else BLACK
-        candidate_moves_scores = {} # {(r, c): score}
-        best_score = -float('inf')
-
-        # --- 從 AnalysisHandler 獲取已過濾的棋型數據 ---
-        # (確保 AnalysisHandler 的 get_player_... 返回的是過濾禁手後的列表)
-        ai_fives = analysis_handler.get_player_fives(ai_player)
-        ai_fours = analysis_handler.get_player_fours(ai_player)
-        ai_jump_fours = analysis_handler.get_player_jump_fours(ai_player)
-        ai_live_threes = analysis_handler.get_player_live_threes(ai_player)
-        ai_jump_live_threes = analysis_handler.get_player_jump_live_threes(ai_player)
-        # 可以考慮加入眠三的數據 (如果 AnalysisHandler 提供)
-        # ai_sleep_threes = analysis_handler.get_player_sleep_threes(ai_player)
-
-        opponent_fives = analysis_handler.get_player_fives(opponent_player)
-        opponent_fours = analysis_handler.get_player_fours(opponent_player)
-        opponent_jump_fours = analysis_handler.get_player_jump_fours(opponent_player)
-        opponent_live_threes = analysis_handler.get_player_live_threes(opponent_player)
-        opponent_jump_live_threes = analysis_handler.get_player_jump_live_threes(opponent_player)
-        # opponent_sleep_threes = analysis_handler.get_player_sleep_threes(opponent_player)
-
-        # --- 遍歷有潛力的空點 ---
-        # 可以基於 influence_map 或簡單地遍歷所有空點附近的點
-        empty_spots = []
-        if move_count == 0: # 特殊處理第一步 (雖然通常會被天元規則覆蓋)
-            empty_spots = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if board[r][c] == EMPTY]
+        size = self.ruleset.board_size
+        if legal_mask is None:
+            legal_mask, _ = self.ruleset.legal_move_mask(board, ai_player, move_count)
+
+        # --- 分數格：每個點一次陣列讀取 (已過濾黑方禁手) ---
+        attack, defence = analysis_handler.threat_grids(HEURISTIC_WEIGHTS)
+        scores = attack[ai_player] + defence[ai_player]
+
+        # --- 只考慮有潛力的空點 (棋子周圍的候選點，隨落子增量維護) ---
+        if candidates is None:
+            candidates = CandidateSet.from_board(board)
+        if move_count == 0 or not len(candidates): # 特殊處理第一步 (雖然通常會被天元規則覆蓋)
+            mask = legal_mask
         else:
-            occupied_spots = set((r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if board[r][c] != EMPTY)
-            adjacent_spots = set()
-            offsets = [(dr, dc) for dr in [-1, 0, 1] for dc in [-1, 0, 1] if not (dr == 0 and dc == 0)]
-            for r_o, c_o in occupied_spots:
-                 for dr, dc in offsets:
-                      nr, nc = r_o + dr, c_o + dc
-                      if is_on_board(nr, nc) and board[nr][nc] == EMPTY:
-                           adjacent_spots.add((nr, nc))
-            empty_spots = list(adjacent_spots)
-            # 如果相鄰點太少，可以考慮擴大範圍或加入所有 influence > 0 的點
-            if not empty_spots:
-                 empty_spots = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if board[r][c] == EMPTY]
-
-
-        for r, c in empty_spots:
-            # 1. 檢查合法性
-            is_valid, _ = rules.is_legal_move(r, c, ai_player, move_count, board)
-            if not is_valid:
-                continue
-
-            # 2. 計算啟發式分數
-            score = 0
-            pos_tuple = (r, c) # 用於快速查找
-
-            # --- 進攻分數 ---
-            # (檢查時只需要座標，不需要 player 和 type)
-            if any(p[0] == r and p[1] == c for p in ai_fives): score += WEIGHT_WIN
-            elif any(p[0] == r and p[1] == c for p in ai_fours): score += WEIGHT_FOUR
-            elif any(p[0] == r and p[1] == c for p in ai_jump_fours): score += WEIGHT_JUMP_FOUR
-            elif any(p[0] == r and p[1] == c for p in ai_live_threes): score += WEIGHT_LIVE_THREE
-            elif any(p[0] == r and p[1] == c for p in ai_jump_live_threes): score += WEIGHT_JUMP_LIVE_THREE
-            # elif any(p[0] == r and p[1] == c for p in ai_sleep_threes): score += WEIGHT_SLEEP_THREE # 如果有眠三數據
-
-            # --- 防守分數 ---
-            if any(p[0] == r and p[1] == c for p in opponent_fives): score += WEIGHT_WIN # 阻止對方五是最高優先級
-            elif any(p[0] == r and p[1] == c for p in opponent_fours): score += WEIGHT_BLOCK_LIVE_THREE # 使用稍高的防守權重
-            elif any(p[0] == r and p[1] == c for p in opponent_jump_fours): score += WEIGHT_BLOCK_JUMP_LIVE_THREE
-            elif any(p[0] == r and p[1] == c for p in opponent_live_threes): score += WEIGHT_BLOCK_LIVE_THREE
-            elif any(p[0] == r and p[1] == c for p in opponent_jump_live_threes): score += WEIGHT_BLOCK_JUMP_LIVE_THREE
-            # elif any(p[0] == r and p[1] == c for p in opponent_sleep_threes): score += WEIGHT_BLOCK_SLEEP_THREE
-
-            # 基礎分數 (例如靠近中心的點或自己的棋子給微小加分) - 可選
-            # score += (7 - abs(r - 7)) * 0.01 + (7 - abs(c - 7)) * 0.01
-
-            # --- 記錄分數 ---
-            if score > 0: # 只考慮有正面價值的點
-                 candidate_moves_scores[(r, c)] = score
-                 if score > best_score:
-                      best_score = score
-
-        # --- 找出最佳分數對應的位置 ---
-        best_moves = []
-        if best_score > -float('inf'): # 確保找到了至少一個有價值的點
-            # 如果最高分是致勝/防五，只返回這些點
-            if best_score >= WEIGHT_WIN:
-                 best_moves = [pos for pos, score in candidate_moves_scores.items() if score >= WEIGHT_WIN]
+            mask = np.zeros(size * size, dtype=bool)
+            mask[list(candidates.indices)] = True
+            mask = mask.reshape(size, size) & legal_mask
+        scores = np.where(mask, scores, 0)
+
+        # --- 找出最佳分數對應的位置 (只考慮有正面價值的點) ---
+        best_score = int(scores.max())
+        if best_score <= 0:
+            return []
+        # 如果最高分是致勝/防五，返回所有這類點；否則返回所有達到最高分數的點
+        threshold = WEIGHT_WIN if best_score >= WEIGHT_WIN else best_score
+        return [(int(r), int(c)) for r, c in zip(*np.nonzero(scores >= threshold))]
+
+
+    def transposition_table(self):
+        """所有搜尋共用的置換表 (第一次呼叫時配置 tt_mb)。"""
+        if self.tt is None:
+            self.tt = transposition.TranspositionTable(self.tt_mb)
+        return self.tt
+
+    def _alphabeta_searcher(self):
+        if self._searcher is None:
+            if self.search_threads > 1:
+                self._searcher = lazy_smp.get_search(self.ruleset, self.search_threads, self.tt_mb)
+                self.tt = self._searcher.tt
             else:
-                 # 返回所有達到最高分數的點
-                 best_moves = [pos for pos, score in candidate_moves_scores.items() if score >= best_score]
+                self._searcher = search.AlphaBetaSearch(self.ruleset, tt=self.transposition_table())
+        return self._searcher
+
+    def _mcts_searcher(self):
+        if self._mcts is None:
+            self._mcts = mcts.MCTSSearch(self.ruleset, workers=self.mcts_workers)
+        return self._mcts
+
+    def search_move(self, board, player, move_count, time_left=None, candidates=None):
+        """以 alpha-beta 搜尋選擇著法，回傳 search.SearchResult (同時存到 last_search)。"""
+        result, _ = self._take_pondered(board)
+        if result is None:
+            result = self._alphabeta_searcher().search(board, player, move_count, move_time_budget(time_left),
+                                                       candidates=candidates)
+        self.last_search = result
+        return result
 
-        # print(f"AI Heuristic Eval: Best score={best_score}, Found {len(best_moves)} moves: {best_moves}")
-        return best_moves
+    def mcts_move(self, board, player, move_count, time_left=None, candidates=None):
+        """以 MCTS 選擇著法，回傳 mcts.MCTSResult (同時存到 last_search)。"""
+        _, saved = self._take_pondered(board) # 命中時沿用子樹，少想背景已經想過的時間
+        time_limit = max(MIN_MOVE_TIME, move_time_budget(time_left) - saved)
+        self.last_search = self._mcts_searcher().search(board, player, move_count, time_limit,
+                                                        candidates=candidates)
+        return self.last_search
 
+    # --- 背景思考 (人類的回合) ---
+    def start_pondering(self, board, ai_player, move_count, engine, time_left=None, candidates=None):
+        """AI (ai_player) 剛下完、輪到人類時開始背景思考 (只有搜尋引擎會思考)。"""
+        if engine == ENGINE_ALPHABETA:
+            self.ponderer.start(self._alphabeta_searcher(), board, ai_player, move_count,
+                                move_time_budget(time_left), candidates)
+        elif engine == ENGINE_MCTS:
+            self.ponderer.start(self._mcts_searcher(), board, ai_player, move_count,
+                                move_time_budget(time_left), candidates, tree=True)
 
-    def find_best_ai_move(self, board, move_log, move_count, current_player, analysis_handler):
-        """AI 尋找最佳著法，整合啟發式評估。"""
+    def stop_pondering(self, board):
+        """人類已下子：停止背景思考，回傳是否有思考 (命中的結果留給這個棋盤的搜尋使用)。"""
+        if not self.ponderer.active:
+            return False
+        result, saved = self.ponderer.finish(board)
+        self._pondered = ([row[:] for row in board], result, saved)
+        return True
+
+    def cancel_pondering(self):
+        """停止背景思考並丟棄結果 (悔棋、重新開始等)。"""
+        self.ponderer.cancel()
+        self._pondered = None
+
+    def _take_pondered(self, board):
+        """取出 board 的背景思考結果：(已完成的結果或 None, 節省的秒數)。"""
+        pondered, self._pondered = self._pondered, None
+        if pondered is None or pondered[0] != board:
+            return None, 0.0
+        return pondered[1], pondered[2]
+
+    @profiling.timed("ai_decision")
+    def find_best_ai_move(self, board, move_log, move_count, current_player, analysis_handler,
+                          engine=ENGINE_HEURISTIC, time_left=None, candidates=None):
+        """
+        AI 尋找最佳著法，整合啟發式評估。
+        engine 為 ENGINE_ALPHABETA / ENGINE_MCTS 時，開局庫之後改用 alpha-beta 搜尋 / MCTS
+        (time_left 為剩餘秒數)。
+        candidates: 與 board 一致的 CandidateSet (RenjuGame.candidates)，未提供時由 board 建立。
+        """
         ai_player = current_player
         opponent_player = WHITE if ai_player == BLACK else BLACK
 
+        ruleset = self.ruleset
+
         # --- 策略 -1: 天元開局 ---
         if move_count == 0 and ai_player == BLACK:
-            if rules.is_legal_move(7, 7, ai_player, move_count, board)[0]:
+            center = (ruleset.center, ruleset.center)
+            if ruleset.is_legal_move(center[0], center[1], ai_player, move_count, board)[0]:
                 # print(f"AI ({ai_player}) mandatory Tengen")
-                return (7, 7), False
+                return center, False
+
+        # --- 整盤合法點遮罩，供以下所有策略使用 ---
+        legal_mask, _ = ruleset.legal_move_mask(board, ai_player, move_count)
 
         # --- 策略 0: 開局庫 (保持不變) ---
         # ... (開局庫邏輯) ...
@@ -136,30 +226,39 @@ class AIPlayer:
             seq = tuple(tuple(m[k] for k in ['row', 'col']) for m in move_log)
             if seq in OPENING_BOOK:
                 possible_moves = OPENING_BOOK[seq]
-                valid_moves = [m for m in possible_moves if rules.is_legal_move(m[0], m[1], ai_player, move_count, board)[0]]
+                valid_moves = [m for m in possible_moves if ruleset.is_on_board(m[0], m[1]) and legal_mask[m[0], m[1]]]
                 if valid_moves:
                     move = random.choice(valid_moves)
                     # print(f"AI ({ai_player}) using book {move} from {len(valid_moves)}")
                     return move, True
 
+        # --- alpha-beta 搜尋 / MCTS (包含致勝與擋五) ---
+        if engine == ENGINE_ALPHABETA:
+            result = self.search_move(board, ai_player, move_count, time_left, candidates)
+            if result.move is not None and legal_mask[result.move]:
+                return result.move, False
+        elif engine == ENGINE_MCTS:
+            result = self.mcts_move(board, ai_player, move_count, time_left, candidates)
+            if result.move is not None and legal_mask[result.move]:
+                return result.move, False
 
         # --- 策略 1: 檢查 AI 能否立即獲勝 ---
         # (需要一個檢查獲勝的輔助函式，或者直接利用 AnalysisHandler 的 five_positions)
-        ai_winning_moves = analysis_handler.get_player_fives(ai_player)
-        valid_winning_moves = [(r, c) for r, c, _, _ in ai_winning_moves if rules.is_legal_move(r, c, ai_player, move_count, board)[0]]
+        ai_winning_moves = analysis_handler.get_five_positions(ai_player)
+        valid_winning_moves = [(r, c) for r, c, _, _ in ai_winning_moves if legal_mask[r, c]]
         if valid_winning_moves:
             move = random.choice(valid_winning_moves)
             # print(f"AI ({ai_player}) found win at {move}")
             return move, False
 
         # --- 策略 2: 檢查對手能否立即獲勝並阻止 ---
-        opponent_winning_moves = analysis_handler.get_player_fives(opponent_player)
-        valid_blocking_moves = [(r, c) for r, c, _, _ in opponent_winning_moves if rules.is_legal_move(r, c, ai_player, move_count, board)[0]]
+        opponent_winning_moves = analysis_handler.get_five_positions(opponent_player)
+        valid_blocking_moves = [(r, c) for r, c, _, _ in opponent_winning_moves if legal_mask[r, c]]
         if valid_blocking_moves:
             # 如果有多個點可以阻止對手獲勝，選擇哪個？
             # 這裡可以簡單隨機選，或者調用啟發式評估來選擇防守價值最高的點
             blocking_scores = {}
-            heuristic_block_candidates = self._evaluate_and_find_best_heuristic(board, move_count, ai_player, analysis_handler)
+            heuristic_block_candidates = self._evaluate_and_find_best_heuristic(board, move_count, ai_player, analysis_handler, legal_mask, candidates)
             # 找出既是阻擋點又是啟發式高分點的交集
             preferred_blocks = [move for move in valid_blocking_moves if move in heuristic_block_candidates]
             if preferred_blocks:
@@ -176,24 +275,18 @@ class AIPlayer:
 
 
         # --- 策略 3: 使用啟發式評估選擇最佳著法 ---
-        heuristic_best_moves = self._evaluate_and_find_best_heuristic(board, move_count, ai_player, analysis_handler)
+        heuristic_best_moves = self._evaluate_and_find_best_heuristic(board, move_count, ai_player, analysis_handler, legal_mask, candidates)
         if heuristic_best_moves:
             move = random.choice(heuristic_best_moves) # 從最佳啟發式著法中隨機選一個
             # print(f"AI ({ai_player}) chose heuristic move {move} from {len(heuristic_best_moves)} options.")
             return move, False
 
         # --- 策略 4: 備用策略 (如果啟發式沒有找到任何有價值的點) ---
-        # 可以選擇相鄰點或隨機點
-        occupied_spots = set((r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if board[r][c] != EMPTY)
-        adjacent_spots = set()
-        offsets = [(dr, dc) for dr in [-1, 0, 1] for dc in [-1, 0, 1] if not (dr == 0 and dc == 0)]
-        for r_o, c_o in occupied_spots:
-             for dr, dc in offsets:
-                  nr, nc = r_o + dr, c_o + dc
-                  if is_on_board(nr, nc) and board[nr][nc] == EMPTY:
-                       adjacent_spots.add((nr, nc))
-
-        valid_adjacent_moves = [spot for spot in adjacent_spots if rules.is_legal_move(spot[0], spot[1], ai_player, move_count, board)[0]]
+        # 從候選點中選相鄰 (八鄰點內有棋子) 的點，或隨機點
+        if candidates is None:
+            candidates = CandidateSet.from_board(board)
+        valid_adjacent_moves = [spot for spot in candidates
+                                if legal_mask[spot] and any(board[nr][nc] != EMPTY for nr, nc in ruleset.neighbors[spot[0]][spot[1]])]
 
         if valid_adjacent_moves:
             move = random.choice(valid_adjacent_moves)
@@ -201,8 +294,7 @@ class AIPlayer:
             return move, False
         else:
             # 最後的備用：隨機選擇任何合法空點
-            all_empty_spots = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if board[r][c] == EMPTY]
-            all_valid_moves = [spot for spot in all_empty_spots if rules.is_legal_move(spot[0], spot[1], ai_player, move_count, board)[0]]
+            all_valid_moves = [(int(r), int(c)) for r, c in zip(*legal_mask.nonzero())]
             if all_valid_moves:
                 move = random.choice(all_valid_moves)
                 # print(f"AI ({ai_player}) chose random fallback {move}")
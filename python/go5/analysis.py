@@ -1,78 +1,190 @@
 # -*- coding: utf-8 -*-
 import logging
-from config import (BOARD_SIZE, EMPTY, BLACK, WHITE)
-from utils import is_on_board
-import os
+import numpy as np
+from config import (GameState, EMPTY, BLACK, WHITE, DIRECTIONS)
+import profiling
 import rules # 確保導入 rules
-
-print(os.getcwd())
-
-# 設定 logger
+import ruleset as ruleset_module
+import pattern_matcher
+from forbidden_map import ForbiddenMap
+from influence_map import InfluenceMap
+import position_cache
+import threat_search
+import zobrist
+
+# logger 的輸出格式與等級由應用程式 (main.py) 設定；熱點路徑的 debug 訊息使用延遲格式化
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+
+# --- 棋型快取 ---
+# 每個空點、每位玩家、每個方向快取一個棋型位元組合；落子只會改變通過它的四條線上
+# 距離 PATTERN_RADIUS 以內的點在「那一條線」方向上的結果。
+PATTERN_BITS = pattern_matcher.PATTERN_BITS
+PATTERN_RADIUS = 5 # 棋型比對最多讀取前後 5 格
+SCAN_DIRECTIONS = tuple(DIRECTIONS) # 與 RuleSet.windows 的方向順序相同
+EMPTY_RECORD = (0, 0, None) # 已佔據或沒有任何棋型的點
+INFLUENCE_RADIUS = 1 # 影響力地圖的範圍 (1 為 3x3)
+
+# --- 分析模式導航 ---
+# 每 KEYFRAME_INTERVAL 手保存一次完整的分析狀態 (關鍵幀)，其餘位置由最近的關鍵幀
+# 或目前位置逐手套用 / 撤銷單手差量到達，因此任何跳轉最多只需要 KEYFRAME_INTERVAL 手的差量。
+KEYFRAME_INTERVAL = 16
+
+# --- 威脅分數格 ---
+# 每個點只取優先順序最高的一種棋型：(pattern_type, 進攻分數, 防守分數)
+# 進攻分數給形成該棋型的一方，防守分數給在該點擋住對手棋型的一方
+THREAT_WEIGHTS = (
+    ("five", 100000, 100000),
+    ("four", 1000, 150),
+    ("jump_four", 800, 70),
+    ("live_three", 100, 150),
+    ("jump_live_three", 50, 70),
+)
 
 
 class AnalysisHandler:
     """五子棋分析處理器"""
 
-    def __init__(self, game_ref):
-        """初始化分析處理器"""
+    def __init__(self, game_ref, ruleset=None, influence_radius=INFLUENCE_RADIUS):
+        """初始化分析處理器 (ruleset 預設為 ruleset.default_ruleset())"""
         self.game = game_ref
+        self.ruleset = ruleset if ruleset is not None else ruleset_module.default_ruleset()
+        self.board_size = self.ruleset.board_size
         self.analysis_step = -1
-        self.analysis_board = [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        self.analysis_board = self.ruleset.new_board()
         self.last_analysis_move = None
 
-        # --- 修改數據結構：使用字典區分玩家 ---
-        self.live_three_positions = {BLACK: [], WHITE: []}
-        self.jump_live_three_positions = {BLACK: [], WHITE: []}
-        self.four_positions = {BLACK: [], WHITE: []}
-        self.jump_four_positions = {BLACK: [], WHITE: []}
-        self.five_positions = {BLACK: [], WHITE: []}
+        # --- 棋型位置 (live_three_positions 等) 是 point_records 的視圖，見下方 property ---
         # 可以考慮為 33 和 34 也創建專門的存儲，如果需要精確區分
         self.three_three_positions = {BLACK: [], WHITE: []}
         self.three_four_positions = {BLACK: [], WHITE: []}
 
-        self.influence_map = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-
-    # ... (navigate, _reconstruct_board, get_board_to_draw, get_last_move_to_draw 保持不變) ...
+        self.influence_radius = influence_radius
+        self.zobrist = zobrist.get_table(self.board_size)
+        # 以 (局面雜湊, 輪到誰下) 保存完整棋型與禁手結果，同一棋規的所有遊戲共用
+        self.cache = position_cache.shared_cache(self.ruleset.name, self.board_size, influence_radius)
+        self._reset_influence()
+        self._reset_pattern_cache()
+
+        # 關鍵幀：_keyframes[i] 為套用前 i * KEYFRAME_INTERVAL 手後的狀態，move_log 改變時重建
+        self._keyframes = []
+        self._keyframe_log = None
+        self._keyframe_log_len = 0
+        self._valid_moves = 0 # move_log 中可以依序套用的手數
+        self._applied = 0     # 目前 analysis_board 上已套用的手數
+        self._threat_search = None # find_winning_sequence 第一次使用時建立
+
+    # --- 分析模式導航 ---
     def navigate(self, direction):
-        """在分析模式下導航步數"""
-        if self.game.game_state != self.game.GameState.ANALYSIS or not self.game.move_log:
+        """在分析模式下導航步數 ('first' / 'prev' / 'next' / 'last')"""
+        if self.game.game_state != GameState.ANALYSIS or not self.game.move_log:
             logger.warning("Analysis Error: Not in analysis mode or no move log.")
             return
 
-        # TODO: 實現 navigate 方法
-        pass
+        targets = {
+            'first': -1,
+            'prev': self.analysis_step - 1,
+            'next': self.analysis_step + 1,
+            'last': len(self.game.move_log) - 1,
+        }
+        if direction not in targets:
+            logger.warning(f"Analysis Error: Unknown navigate direction {direction!r}")
+            return
+        self._reconstruct_board(targets[direction])
+        total = len(self.game.move_log)
+        self.game.status_message = f"分析模式 - 第 {self.analysis_step + 1}/{total} 手"
 
     def _reconstruct_board(self, target_idx):
-        """重建指定步數的棋盤狀態"""
-        logger.info("_reconstruct_board called")
-        self.analysis_board = [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-        self.last_analysis_move = None
-        self.influence_map = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-
-        for i in range(target_idx + 1):
-            if i < len(self.game.move_log):
-                data = self.game.move_log[i]  # 使用 self.game.move_log
-                row, col, player = data.get('row', -1), data.get('col', -1), data.get('player', 0)
-                if is_on_board(row, col):
-                    if self.analysis_board[row][col] == EMPTY:  # 這裡不要改動
-                        self.analysis_board[row][col] = player
-                        self.update_influence_map(player, row, col)  # 傳入下棋者是誰
-                        if i == target_idx:
-                            self.last_analysis_move = (row, col)
-                    else:
-                        logger.warning(f"Warn: Analysis Recon Overwrite step {i+1} at ({row},{col})")
-                        self.last_analysis_move = None
-                        break
-                else:
-                    logger.warning(f"Warn: Analysis Recon Invalid coord step {i+1} at ({row},{col})")
-                    self.last_analysis_move = None
-                    break
+        """移動到指定步數 (target_idx 為最後一手的索引，-1 為空棋盤) 的分析狀態"""
+        self._ensure_keyframes()
+        target = max(0, min(target_idx + 1, self._valid_moves)) # 要套用的手數
+        current = self._applied
+        base = target - target % KEYFRAME_INTERVAL
+        # 目前位置不在同一段時，從 target 之前最近的關鍵幀出發
+        if abs(target - current) > target - base:
+            self._restore_keyframe(self._keyframes[base // KEYFRAME_INTERVAL])
+            current = base
+        while current < target:
+            self._apply_move(current)
+            current += 1
+        while current > target:
+            current -= 1
+            self._revert_move(current)
+
+        self._applied = target
+        self.analysis_step = target - 1
+        if target > 0:
+            data = self.game.move_log[target - 1]
+            self.last_analysis_move = (data.get('row', -1), data.get('col', -1))
+        else:
+            self.last_analysis_move = None
+        self._refresh_patterns() # 棋型覆蓋層與目前位置一致
+
+    def _ensure_keyframes(self):
+        """move_log 改變時，從空棋盤重播一次並在每 KEYFRAME_INTERVAL 手保存關鍵幀。"""
+        move_log = self.game.move_log
+        if self._keyframe_log is move_log and self._keyframe_log_len == len(move_log):
+            return
+        self.analysis_board = self.ruleset.new_board()
+        self._reset_influence()
+        self._reset_pattern_cache() # 之後每一步由 update_influence_map 失效受影響的線
+        self._keyframes = [self._snapshot()]
+        self._valid_moves = 0
+        for i, data in enumerate(move_log):
+            row, col = data.get('row', -1), data.get('col', -1)
+            if not self.ruleset.is_on_board(row, col):
+                logger.warning(f"Warn: Analysis Recon Invalid coord step {i+1} at ({row},{col})")
+                break
+            if self.analysis_board[row][col] != EMPTY:
+                logger.warning(f"Warn: Analysis Recon Overwrite step {i+1} at ({row},{col})")
+                break
+            self._apply_move(i)
+            self._valid_moves = i + 1
+            if self._valid_moves % KEYFRAME_INTERVAL == 0:
+                self._keyframes.append(self._snapshot())
+        self._keyframe_log = move_log
+        self._keyframe_log_len = len(move_log)
+        self._applied = self._valid_moves
+
+    def _apply_move(self, idx):
+        """套用 move_log[idx] 的差量 (落子並更新影響力與棋型快取)。"""
+        data = self.game.move_log[idx]
+        self.update_influence_map(data.get('player', 0), data.get('row', -1), data.get('col', -1))
+
+    def _revert_move(self, idx):
+        """撤銷 move_log[idx] 的差量。"""
+        data = self.game.move_log[idx]
+        self.remove_stone(data.get('player', 0), data.get('row', -1), data.get('col', -1))
+
+    def _snapshot(self):
+        """目前分析狀態的完整複本 (關鍵幀)。"""
+        self._flush_forbidden()
+        self._refresh_patterns()
+        if profiling.ENABLED:
+            profiling.count("board_copy")
+        return (
+            self.position_hash,
+            self.stone_count,
+            [row[:] for row in self.analysis_board],
+            self.influence.copy(),
+            [row[:] for row in self._records],
+            {player: [[cell[:] for cell in row] for row in cache] for player, cache in self._direction_cache.items()},
+            self._forbidden_map.state(),
+        )
+
+    def _restore_keyframe(self, keyframe):
+        """還原關鍵幀 (複製一份，關鍵幀本身保持不變)。"""
+        self.position_hash, self.stone_count, board, influence, records, direction_cache, forbidden = keyframe
+        for row, saved in zip(self.analysis_board, board): # ForbiddenMap 共用同一個棋盤物件
+            row[:] = saved
+        self.influence = influence.copy()
+        self.influence_map = self.influence.display
+        self._records = [row[:] for row in records]
+        self._direction_cache = {player: [[cell[:] for cell in row] for row in cache]
+                                 for player, cache in direction_cache.items()}
+        self._forbidden_map.restore(forbidden)
+        self._forbidden_pending = set()
+        self._dirty_points = set()
+        self._views = {}
 
     def get_board_to_draw(self):
         """獲取用於繪製的棋盤"""
@@ -82,196 +194,348 @@ class AnalysisHandler:
         """獲取最後分析的落子位置"""
         return self.last_analysis_move
 
+    # --- 棋型快取 (增量更新) ---
+    def _reset_pattern_cache(self):
+        """清空棋型快取 (analysis_board 為空棋盤時使用)。"""
+        size = self.board_size
+        # point_records[r][c] = (黑方棋型位元, 白方棋型位元, 黑方禁手原因或 None)，格式與 scan_all 相同
+        self._records = [[EMPTY_RECORD] * size for _ in range(size)]
+        # _direction_cache[player][r][c][d]: 方向 d 的棋型位元，None 表示需要重算
+        self._direction_cache = {player: [[[0] * len(SCAN_DIRECTIONS) for _ in range(size)] for _ in range(size)]
+                                 for player in (BLACK, WHITE)}
+        self._dirty_points = set()
+        self._views = {} # pattern_type -> 位置字典，point_records 改變時清空
+        self._forbidden_map = ForbiddenMap(self.analysis_board, self.ruleset)
+        self._forbidden_pending = set() # 尚未更新禁手地圖的落子 / 提子點 (只在快取未命中時才需要)
+        # analysis_board 的 Zobrist 雜湊與棋子數，隨落子 / 提子增量維護
+        self.position_hash = 0
+        self.stone_count = 0
+
+    def _invalidate_lines(self, x, y):
+        """(x, y) 剛落子 (或提子)：只失效四條線上 PATTERN_RADIUS 以內的點在該線方向的快取。"""
+        for player in (BLACK, WHITE):
+            if self.analysis_board[x][y] == EMPTY:
+                self._direction_cache[player][x][y] = [None] * len(SCAN_DIRECTIONS)
+            else:
+                self._direction_cache[player][x][y] = [0] * len(SCAN_DIRECTIONS) # 已佔據的點沒有棋型
+        self._dirty_points.add((x, y))
+        for d, (dr, dc) in enumerate(SCAN_DIRECTIONS):
+            for k in range(1, PATTERN_RADIUS + 1):
+                for sign in (1, -1):
+                    r, c = x + sign * k * dr, y + sign * k * dc
+                    if self.ruleset.is_on_board(r, c):
+                        for player in (BLACK, WHITE):
+                            self._direction_cache[player][r][c][d] = None
+                        self._dirty_points.add((r, c))
+        # 禁手地圖等到快取未命中時才更新
+        self._forbidden_pending.add((x, y))
+
+    def _flush_forbidden(self):
+        """
+        更新所有待更新落子點影響的禁手狀態。嚴格連珠時改變的點可能不在落子點的四條線上
+        (延伸點的依賴)，這些點也要更新 point_records。
+        """
+        if not self._forbidden_pending:
+            return
+        self._dirty_points |= self._forbidden_map.update_points(self._forbidden_pending)
+        self._forbidden_pending.clear()
+
+    def side_to_move(self):
+        """analysis_board 上輪到哪一方 (黑方先下)。"""
+        return BLACK if self.stone_count % 2 == 0 else WHITE
+
+    def _code_bits(self, code, player):
+        """pattern_matcher 的分類結果，連五再依 RuleSet 判斷長連是否算勝。"""
+        bits = pattern_matcher.classify(code)
+        if bits & pattern_matcher.FIVE and not self.ruleset.table[code] & self.ruleset.win_masks[player]:
+            bits &= ~pattern_matcher.FIVE
+        return bits
+
+    def _line_patterns(self, board, row, col, d):
+        """走訪一次方向 d 的線，回傳 (黑方位元, 白方位元)：雙方分別在 (row, col) 落子後的棋型。"""
+        code_black, code_white = pattern_matcher.line_codes(board, self.ruleset.windows[row][col][d])
+        return self._code_bits(code_black, BLACK), self._code_bits(code_white, WHITE)
+
+    def _direction_bits(self, board, row, col, player, row_dir, col_dir):
+        """(row, col) 視為 player 的棋子時，(row_dir, col_dir) 方向上的棋型位元。"""
+        d = self.ruleset.directions.index((row_dir, col_dir))
+        return self._line_patterns(board, row, col, d)[0 if player == BLACK else 1]
+
+    @profiling.timed("pattern_refresh")
+    def _refresh_patterns(self):
+        """
+        重算待更新點的方向快取，並更新這些點的 point_records。
+        局面已在 cache 中時直接取用；未重算的方向快取保持 None，之後需要時才重算。
+        """
+        if not self._dirty_points:
+            return
+        key = (self.position_hash, self.side_to_move())
+        cached = self.cache.get(key)
+        if cached is not None:
+            records, self._views = cached
+            self._records = [row[:] for row in records]
+            self._dirty_points.clear()
+            return
+
+        self._flush_forbidden()
+        board = self.analysis_board
+        for row, col in self._dirty_points:
+            if board[row][col] != EMPTY:
+                self._records[row][col] = EMPTY_RECORD
+                continue
+            black_cache = self._direction_cache[BLACK][row][col]
+            white_cache = self._direction_cache[WHITE][row][col]
+            black_bits = white_bits = 0
+            for d in range(len(SCAN_DIRECTIONS)):
+                if black_cache[d] is None or white_cache[d] is None:
+                    black_cache[d], white_cache[d] = self._line_patterns(board, row, col, d)
+                black_bits |= black_cache[d]
+                white_bits |= white_cache[d]
+            self._records[row][col] = (black_bits, white_bits, self._forbidden_map.reason(row, col))
+        self._dirty_points.clear()
+        self._views = {}
+        self.cache.put(key, ([row[:] for row in self._records], self._views))
+
+    # --- 單次掃描 ---
+    @profiling.timed("pattern_scan")
+    def scan_all(self, board, move_count=None, should_stop=None):
+        """
+        單次掃描整個棋盤：每個空點的四條線各走訪一次，同時得到雙方的棋型位元，
+        黑方禁手由一次整盤 legal_move_mask 取得 (move_count 預設為目前遊戲的手數)。
+        回傳 records[row][col] = (黑方棋型位元, 白方棋型位元, 黑方禁手原因或 None)。
+        天元規則不是禁手，不記錄在 records 中 (與增量更新的 point_records 相同)。
+        should_stop() 在每一列之前檢查，回傳 True 時放棄掃描並回傳 None (背景分析取消用)。
+        """
+        if move_count is None:
+            move_count = self.game.move_count
+        # 第一手以後的遮罩：只有禁手原因，沒有天元規則
+        black_legal, reasons = self.ruleset.legal_move_mask(board, BLACK, max(move_count, 1))
+        records = [[EMPTY_RECORD] * self.board_size for _ in range(self.board_size)]
+        for row in range(self.board_size):
+            if should_stop is not None and should_stop():
+                return None
+            for col in range(self.board_size):
+                if board[row][col] != EMPTY:
+                    continue
+                black_bits = white_bits = 0
+                for d in range(len(SCAN_DIRECTIONS)):
+                    b, w = self._line_patterns(board, row, col, d)
+                    black_bits |= b
+                    white_bits |= w
+                forbidden = None if black_legal[row, col] else self.ruleset.reason_text(int(reasons[row, col]))
+                records[row][col] = (black_bits, white_bits, forbidden)
+        return records
+
+    def _positions_from(self, records, pattern_type, influence_map=None):
+        """
+        由 records 取出指定棋型的位置，格式 {player: [(row, col, player, type), ...]}。
+        黑方禁手點不列入；活三只看有影響力的點 (與原本的 find_live_threes 相同)。
+        influence_map 預設為 self.influence_map。
+        """
+        if influence_map is None:
+            influence_map = self.influence_map
+        bit = PATTERN_BITS[pattern_type]
+        positions = {BLACK: [], WHITE: []}
+        for row, record_row in enumerate(records):
+            for col, (black_bits, white_bits, forbidden) in enumerate(record_row):
+                if not (black_bits | white_bits) & bit:
+                    continue
+                if pattern_type == "live_three" and influence_map[row][col] <= 0:
+                    continue
+                if black_bits & bit and forbidden is None:
+                    positions[BLACK].append((row, col, BLACK, pattern_type))
+                if white_bits & bit:
+                    positions[WHITE].append((row, col, WHITE, pattern_type))
+        return positions
+
+    def _view(self, pattern_type):
+        self._refresh_patterns() # 讀取時才重算受上一手影響的點 (沒有待更新的點時不做任何事)
+        if pattern_type not in self._views:
+            self._views[pattern_type] = self._positions_from(self._records, pattern_type)
+        return self._views[pattern_type]
+
+    def analyze_position(self, board, move_count, should_stop=None):
+        """
+        不改變分析器狀態，對任意棋盤做一次完整分析 (背景分析 analysis_worker 使用)。
+        回傳 (positions, influence_map)：positions[pattern_type] 的格式與 live_three_positions 等相同；
+        should_stop() 回傳 True 時放棄並回傳 None。
+        """
+        records = self.scan_all(board, move_count, should_stop)
+        if records is None:
+            return None
+        influence_map = InfluenceMap.from_board(board, self.influence_radius).display
+        positions = {pattern_type: self._positions_from(records, pattern_type, influence_map)
+                     for pattern_type in PATTERN_BITS}
+        return positions, influence_map
+
+    def threat_grids(self, weights=THREAT_WEIGHTS):
+        """
+        analysis_board 的威脅分數格，回傳 (attack, defence)，各為 {player: (size, size) int32 陣列}：
+          attack[p][r, c]  ：p 在 (r, c) 落子形成的最高棋型的進攻分數
+          defence[p][r, c] ：p 在 (r, c) 落子擋住的對手最高棋型的防守分數
+        篩選與棋型位置相同 (黑方禁手點不算黑方棋型，活三只看有影響力的點)。
+        與棋型視圖一起隨局面更新並快取，呼叫端不應修改回傳的陣列。
+        """
+        self._refresh_patterns()
+        key = ("threat_grids", weights)
+        if key not in self._views:
+            self._views[key] = self._threat_grids_from(self._records, weights)
+        return self._views[key]
+
+    def _threat_grids_from(self, records, weights, influence_map=None):
+        if influence_map is None:
+            influence_map = self.influence_map
+        size = self.board_size
+        attack = {player: np.zeros((size, size), dtype=np.int32) for player in (BLACK, WHITE)}
+        defence = {player: np.zeros((size, size), dtype=np.int32) for player in (BLACK, WHITE)}
+        ordered = [(PATTERN_BITS[pattern_type], pattern_type == "live_three", a, d) for pattern_type, a, d in weights]
+        for row, record_row in enumerate(records):
+            for col, (black_bits, white_bits, forbidden) in enumerate(record_row):
+                if forbidden is not None:
+                    black_bits = 0
+                if not black_bits | white_bits:
+                    continue
+                for player, opponent, bits in ((BLACK, WHITE, black_bits), (WHITE, BLACK, white_bits)):
+                    for bit, needs_influence, a, d in ordered:
+                        if bits & bit and not (needs_influence and influence_map[row][col] <= 0):
+                            attack[player][row, col] = a
+                            defence[opponent][row, col] = d
+                            break
+        return attack, defence
+
+    @property
+    def point_records(self):
+        """analysis_board 每個點的 (黑方棋型位元, 白方棋型位元, 黑方禁手原因或 None)"""
+        self._refresh_patterns()
+        return self._records
+
+    # --- 威脅空間搜尋 ---
+    def find_winning_sequence(self, player=None, kind="solve", max_nodes=threat_search.DEFAULT_MAX_NODES,
+                              time_limit=threat_search.DEFAULT_TIME_LIMIT):
+        """
+        在 analysis_board 上搜尋 player (預設為輪到的一方) 的勝利手順，回傳 threat_search.ThreatResult。
+        kind: "vcf" (連續衝四)、"vct" (連續活三 / 衝四) 或 "solve" (先 VCF 再 VCT)。
+        搜尋在棋盤複本上進行，不影響分析狀態。
+        """
+        if player is None:
+            player = self.side_to_move()
+        if self._threat_search is None:
+            self._threat_search = threat_search.ThreatSearch(self.ruleset)
+        searcher = self._threat_search
+        searcher.max_nodes, searcher.time_limit = max_nodes, time_limit
+        search = {"vcf": searcher.vcf, "vct": searcher.vct, "solve": searcher.solve}[kind]
+        result = search(self.analysis_board, player)
+        logger.debug("Threat search %s", result)
+        return result
+
+    # --- 棋型位置 (point_records 的視圖，讀取時更新) ---
+    @property
+    def live_three_positions(self):
+        return self._view("live_three")
+
+    @property
+    def jump_live_three_positions(self):
+        return self._view("jump_live_three")
+
+    @property
+    def sleep_three_positions(self):
+        return self._view("sleep_three")
+
+    @property
+    def four_positions(self):
+        return self._view("four")
+
+    @property
+    def jump_four_positions(self):
+        return self._view("jump_four")
+
+    @property
+    def five_positions(self):
+        return self._view("five")
+
     def update_live_three_positions(self):
-        """更新活三和跳活三的位置"""
-        # --- find_... 方法現在返回字典 ---
-        self.live_three_positions = self.find_live_threes(self.analysis_board)
-        self.jump_live_three_positions = self.find_jump_live_threes(self.analysis_board)
-        logger.debug(f"Updated Live Threes: B:{len(self.live_three_positions[BLACK])}, W:{len(self.live_three_positions[WHITE])}")
-        logger.debug(f"Updated Jump Live Threes: B:{len(self.jump_live_three_positions[BLACK])}, W:{len(self.jump_live_three_positions[WHITE])}")
+        """更新活三和跳活三的位置 (只重算受上一手影響的點)"""
+        self._refresh_patterns()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Updated Live Threes: B:%d, W:%d", len(self.live_three_positions[BLACK]), len(self.live_three_positions[WHITE]))
+            logger.debug("Updated Jump Live Threes: B:%d, W:%d", len(self.jump_live_three_positions[BLACK]), len(self.jump_live_three_positions[WHITE]))
 
 
     def update_live_four_positions(self):
-        """更新連四和跳連四的位置"""
-         # --- find_... 方法現在返回字典 ---
-        self.four_positions = self.find_four_positions(self.analysis_board)
-        self.jump_four_positions = self.find_jump_four_positions(self.analysis_board)
-        self.five_positions = self.find_five_positions(self.analysis_board) # 更新連五位置
-        logger.debug(f"Updated Fours: B:{len(self.four_positions[BLACK])}, W:{len(self.four_positions[WHITE])}")
-        logger.debug(f"Updated Jump Fours: B:{len(self.jump_four_positions[BLACK])}, W:{len(self.jump_four_positions[WHITE])}")
-        logger.debug(f"Updated Fives: B:{len(self.five_positions[BLACK])}, W:{len(self.five_positions[WHITE])}")
-
-
-    # --- 修改 find_live_threes ---
-    def find_live_threes(self, board): 
+        """更新連四和跳連四的位置 (只重算受上一手影響的點)"""
+        self._refresh_patterns()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Updated Fours: B:%d, W:%d", len(self.four_positions[BLACK]), len(self.four_positions[WHITE]))
+            logger.debug("Updated Jump Fours: B:%d, W:%d", len(self.jump_four_positions[BLACK]), len(self.jump_four_positions[WHITE]))
+            logger.debug("Updated Fives: B:%d, W:%d", len(self.five_positions[BLACK]), len(self.five_positions[WHITE]))
+
+    # --- find_... : 對任意棋盤做一次 scan_all 後取出指定棋型 ---
+    # 需要多種棋型時請直接呼叫 scan_all 一次，再以 _positions_from 取出各棋型
+    def find_live_threes(self, board):
         """尋找活三, 過濾黑方禁手"""
-        positions = {BLACK: [], WHITE: []}
-        current_board = board 
-        current_move_count = self.game.move_count # 從 game_ref 獲取當前步數
-
-        for player in [BLACK, WHITE]:
-            player_positions_set = set()
-            for row in range(BOARD_SIZE):
-                for col in range(BOARD_SIZE):
-                    if self.influence_map[row][col] > 0 and current_board[row][col] == EMPTY: # 使用當前棋盤檢查空點
-                        temp_board = self.simulate_move(current_board, row, col, player) # 模擬落子
-                        temp_spot_positions = [] # 收集此點的活三
-
-                        # 檢查活三方向...
-                        self.check_live_three_direction(temp_board, row, col, player, 1, 0, temp_spot_positions, "live_three")
-                        self.check_live_three_direction(temp_board, row, col, player, 0, 1, temp_spot_positions, "live_three")
-                        self.check_live_three_direction(temp_board, row, col, player, 1, 1, temp_spot_positions, "live_three")
-                        self.check_live_three_direction(temp_board, row, col, player, 1, -1, temp_spot_positions, "live_three")
-
-                        if temp_spot_positions:
-                            # --- 在這裡加入禁手過濾 ---
-                            if player == BLACK:
-                                # 檢查 (row, col) 對於黑方是否為禁手
-                                is_valid, reason = rules.is_legal_move(row, col, BLACK, current_move_count, current_board)
-                                if not is_valid:
-                                    # print(f"find_live_threes {row},{col} reason is {reason}")
-                                    continue # 如果是禁手，則不將此點加入活三列表
-
-                            # --- 如果不是黑方禁手，或者玩家是白方 ---
-                            # print(f"find_live_threes add {row},{col} in live_three")
-                            player_positions_set.add((row, col, player, "live_three"))
-                            # ... (可選的 33/34 檢測邏輯) ...
-
-            positions[player] = list(player_positions_set)
-        return positions
+        return self._positions_from(self.scan_all(board), "live_three")
 
     def find_jump_live_threes(self, board):
         """尋找跳活三"""
-        # 使用通用方法，傳遞 check_jump_live_three_direction
-        return self._find_pattern_positions_direction(board, self.check_jump_live_three_direction, "jump_live_three")
+        return self._positions_from(self.scan_all(board), "jump_live_three")
+
+    def find_sleep_threes(self, board):
+        """尋找眠三"""
+        return self._positions_from(self.scan_all(board), "sleep_three")
 
     def find_four_positions(self, board):
-         """尋找連四"""
-         # 使用通用方法，傳遞 check_four_direction
-         return self._find_pattern_positions_direction(board, self.check_four_direction, "four")
+        """尋找連四"""
+        return self._positions_from(self.scan_all(board), "four")
 
     def find_jump_four_positions(self, board):
         """尋找跳連四"""
-        # 使用通用方法，傳遞 check_jump_four_direction
-        return self._find_pattern_positions_direction(board, self.check_jump_four_direction, "jump_four")
+        return self._positions_from(self.scan_all(board), "jump_four")
 
     def find_five_positions(self, board):
         """尋找連五"""
-         # 使用通用方法，傳遞 check_five_direction
-        return self._find_pattern_positions_direction(board, self.check_five_direction, "five")
+        return self._positions_from(self.scan_all(board), "five")
 
-    # --- 修改通用查找方法以返回字典 ---
-    def _find_pattern_positions_direction(self, board, check_func, pattern_type):
-        """尋找指定棋型，需要指定方向的通用方法，返回按玩家區分的字典"""
-        # print(f"_find_pattern_positions_direction...{check_func}111")
-        positions = {BLACK: [], WHITE: []}
-        for player in [BLACK, WHITE]:
-            player_positions_set = set() # 使用 set 去重
-            for row in range(BOARD_SIZE):
-                for col in range(BOARD_SIZE):
-                    # 考慮在有影響力的空點落子
-                    #if self.influence_map[row][col] > 0 and board[row][col] == EMPTY:
-                    if board[row][col] == EMPTY:
-                        temp_board = self.simulate_move(board, row, col, player)
-                        # check_func 會修改 player_positions_set (需要調整 check_func 或這裡的邏輯)
-                        # 更好的方式是 check_func 將結果添加到一個臨時列表，然後在這裡添加到 set
-                        # print(f"_find_pattern_positions_direction...{check_func}")
-                        temp_spot_positions = []
-                        check_func(temp_board, row, col, player, 1, 0, temp_spot_positions, pattern_type)  # 水平
-                        check_func(temp_board, row, col, player, 0, 1, temp_spot_positions, pattern_type)  # 垂直
-                        check_func(temp_board, row, col, player, 1, 1, temp_spot_positions, pattern_type)  # 正斜線
-                        check_func(temp_board, row, col, player, 1, -1, temp_spot_positions, pattern_type)  # 反斜線
-
-                        # 將從這個 (row, col) 點找到的所有 pattern 加入集合
-                        # 注意 check_func 可能會因為不同方向找到同一個模式而多次添加同一個元組，set 會處理
-                        for pos in temp_spot_positions:
-                             # --- 在這裡加入禁手過濾 ---
-                            if player == BLACK:
-                                # 檢查 (row, col) 對於黑方是否為禁手
-                                is_valid, reason = rules.is_legal_move(row, col, BLACK, self.game.move_count, board)
-                                if not is_valid:
-                                    # print(f"{row},{col} reason is {reason}")
-                                    continue # 如果是禁手，則不將此點加入活三列表
-
-                            # --- 如果不是黑方禁手，或者玩家是白方 ---
-                            # print(f"_find_pattern_positions_direction add {row},{col} in {pattern_type}")
-                            player_positions_set.add(pos)
-                            # ... (可選的 33/34 檢測邏輯) ...
-
-            positions[player] = list(player_positions_set) # 轉換回列表
-        return positions
-
-    # --- 棋型檢查 (Check) 方法保持不變 ---
+    # --- 棋型檢查 (Check) 方法 ---
     # 確保 check_..._direction 方法正確地將 (row, col, player, pattern_type) 添加到 result_list
-    # check_..._direction 方法現在不需要返回值，只需要修改傳入的 result_list
+    # 比對由 pattern_matcher 以整數編碼的線完成，(row, col) 視為 player 的棋子 (是否已試下皆可)
     def check_four_direction(self, board, row, col, player, row_dir, col_dir, result_list, pattern_type):
         """檢查指定方向上是否存在連四 (XXXX0 或 0XXXX)"""
-        stones_str = self._get_stones_string(board, row, col, row_dir, col_dir)
-        pattern1 = f'{player}{player}{player}{player}0'
-        pattern2 = f'0{player}{player}{player}{player}'
-
-        # print(f"Player {player} found potential Four at ({row}, {col}) dir ({row_dir},{col_dir})")
         # 找到一個就要添加，因為 AI 可能需要知道所有能形成四的點
-        if pattern1 in stones_str or pattern2 in stones_str:
-            logger.debug(f"Player {player} found potential Four at ({row}, {col}) dir ({row_dir},{col_dir})")
-                               
-            # --- 在這裡加入禁手過濾 ---
-            # 檢查 (row, col) 是否為44禁手
-            is_valid, _ = rules.is_legal_move(row, col, player, self.game.move_count + 1, board)
-            if is_valid:
-                result_list.append((row, col, player, pattern_type))
-
-            # return True # 不需要返回，因為要找所有方向
+        if self._direction_bits(board, row, col, player, row_dir, col_dir) & pattern_matcher.FOUR:
+            logger.debug("Player %s found potential Four at (%d, %d) dir (%d,%d)", player, row, col, row_dir, col_dir)
+            # 44禁手過濾由呼叫端在復原後的棋盤上進行 (此時 (row, col) 已試下，無法再判斷合法性)
+            result_list.append((row, col, player, pattern_type))
 
     def check_jump_four_direction(self, board, row, col, player, row_dir, col_dir, result_list, pattern_type):
         """檢查指定方向上是否存在跳連四 (X0XXX、XXX0X 和 XX0XX)"""
-        stones_str = self._get_stones_string(board, row, col, row_dir, col_dir)
-        pattern1 = f'{player}0{player}{player}{player}'
-        pattern2 = f'{player}{player}{player}0{player}'
-        pattern3 = f'{player}{player}0{player}{player}'
-
-        if pattern1 in stones_str or pattern2 in stones_str or pattern3 in stones_str:
-            logger.debug(f"Player {player} found potential Jump Four at ({row}, {col}) dir ({row_dir},{col_dir})")
-            # --- 在這裡加入禁手過濾 ---
-            # 檢查 (row, col) 是否為44禁手
-            is_valid, _ = rules.is_legal_move(row, col, player, self.game.move_count + 1, board)
-            if is_valid:
-                result_list.append((row, col, player, pattern_type))
-
-        # return found # 不需要返回
+        if self._direction_bits(board, row, col, player, row_dir, col_dir) & pattern_matcher.JUMP_FOUR:
+            logger.debug("Player %s found potential Jump Four at (%d, %d) dir (%d,%d)", player, row, col, row_dir, col_dir)
+            # 44禁手過濾由呼叫端在復原後的棋盤上進行
+            result_list.append((row, col, player, pattern_type))
 
     def check_live_three_direction(self, board, row, col, player, row_dir, col_dir, result_list, pattern_type):
-        """檢查指定方向上是否存在活三 (0XXX0)"""
-        stones_str = self._get_stones_string(board, row, col, row_dir, col_dir, length=7) # 活三檢查通常看7格
-        pattern = f'0{player}{player}{player}0'
-
-        if pattern in stones_str:
-            logger.debug(f"Player {player} found potential Live Three at ({row}, {col}) dir ({row_dir},{col_dir})")
+        """檢查指定方向上是否存在活三 (0XXX0，前後 3 格內)"""
+        if self._direction_bits(board, row, col, player, row_dir, col_dir) & pattern_matcher.LIVE_THREE:
+            logger.debug("Player %s found potential Live Three at (%d, %d) dir (%d,%d)", player, row, col, row_dir, col_dir)
             result_list.append((row, col, player, pattern_type))
-            # return True # 不需要返回
 
     def check_jump_live_three_direction(self, board, row, col, player, row_dir, col_dir, result_list, pattern_type):
-        """檢查指定方向上是否存在跳活三 (0X0XX0 或 0XX0X0)"""
-        stones_str = self._get_stones_string(board, row, col, row_dir, col_dir, length=7) # 跳活三也看7格
-        pattern1 = f'0{player}0{player}{player}0'
-        pattern2 = f'0{player}{player}0{player}0'
-
-        found = False
-        if pattern1 in stones_str or pattern2 in stones_str:
-            logger.debug(f"Player {player} found potential Jump Live Three at ({row}, {col}) dir ({row_dir},{col_dir})")
+        """檢查指定方向上是否存在跳活三 (0X0XX0 或 0XX0X0，前後 3 格內)"""
+        if self._direction_bits(board, row, col, player, row_dir, col_dir) & pattern_matcher.JUMP_LIVE_THREE:
+            logger.debug("Player %s found potential Jump Live Three at (%d, %d) dir (%d,%d)", player, row, col, row_dir, col_dir)
             result_list.append((row, col, player, pattern_type))
-            found = True
-        # return found # 不需要返回
 
-    def check_five_direction(self, board, row, col, player, row_dir, col_dir, result_list, pattern_type):
-        """檢查指定方向上是否存在連五 (XXXXX)"""
-        stones_str = self._get_stones_string(board, row, col, row_dir, col_dir)
-        pattern = f'{player}{player}{player}{player}{player}'
+    def check_sleep_three_direction(self, board, row, col, player, row_dir, col_dir, result_list, pattern_type):
+        """檢查指定方向上是否存在眠三 (一端被擋或中間有兩個空點的三)"""
+        if self._direction_bits(board, row, col, player, row_dir, col_dir) & pattern_matcher.SLEEP_THREE:
+            logger.debug("Player %s found potential Sleep Three at (%d, %d) dir (%d,%d)", player, row, col, row_dir, col_dir)
+            result_list.append((row, col, player, pattern_type))
 
-        if pattern in stones_str:
-            logger.debug(f"Player {player} found potential Five at ({row}, {col}) dir ({row_dir},{col_dir})")
+    def check_five_direction(self, board, row, col, player, row_dir, col_dir, result_list, pattern_type):
+        """檢查指定方向上是否存在連五 (XXXXX；長連是否算勝由 RuleSet 決定)"""
+        if self._direction_bits(board, row, col, player, row_dir, col_dir) & pattern_matcher.FIVE:
+            logger.debug("Player %s found potential Five at (%d, %d) dir (%d,%d)", player, row, col, row_dir, col_dir)
             result_list.append((row, col, player, pattern_type))
-            # return True # 不需要返回
 
     def check_34(self, board, row, col, player):
         """檢查在指定位置下子(已模擬在board中)是否會形成34棋型"""
@@ -306,55 +570,28 @@ class AnalysisHandler:
         return live_three_count > 0 and four_count > 0
 
 
-    # --- 輔助方法保持不變 ---
-    def _get_stones_string(self, board, row, col, row_dir, col_dir, length=11):
-        """獲取指定方向上的棋子字串"""
-        stones = []
-        # 確保中心點是 (row, col) 所在的模擬落子
-        # 因此偏移量應圍繞 index 0
-        center_index_in_string = length // 2
-        start_offset = -center_index_in_string
-        end_offset = length - center_index_in_string
-
-        for i in range(start_offset, end_offset):
-            r, c = row + i * row_dir, col + i * col_dir
-            if is_on_board(r, c):
-                stones.append(str(board[r][c]))
-            else:
-                # 用一個特殊字符表示邊界外，避免與 EMPTY 的 '0' 混淆
-                # 但如果規則認為邊界等於對方棋子，則另當別論
-                # 這裡暫時用 'X' 或其他非 0, 1, 2 的字符
-                stones.append('0') # 'X' for Out of Bounds
-        # 驗證一下生成的字串是否正確反映了中心點
-        # logger.debug(f"String for ({row},{col}) dir({row_dir},{col_dir}): {''.join(stones)}")
-        return ''.join(stones)
+    def _reset_influence(self):
+        """清空影響力地圖 (analysis_board 為空棋盤時使用)。"""
+        self.influence = InfluenceMap(self.board_size, self.influence_radius)
+        # influence_map：空點為周圍棋子數、已佔據的點為 9，供繪圖與活三過濾 (與 influence.display 為同一陣列)
+        self.influence_map = self.influence.display
 
     def update_influence_map(self, player, x, y):
-        # print(f"analysis update_influence_map()")
-        """更新影響力地圖"""
-        # 注意：這個影響力地圖目前沒有區分黑白棋的影響力，
-        # 它只是標記了某個空點周圍有多少棋子。
-        # 如果需要更精細的 AI，可能需要為黑白棋分別計算影響力。
-        # 但對於查找棋型，目前的影響力圖主要是為了縮小搜索範圍，還可以接受。
-
+        """更新影響力地圖：只更新 (x, y) 周圍的方塊，並失效通過 (x, y) 的棋型快取"""
+        # 黑白雙方的影響力分別記錄在 self.influence.player_maps
         self.analysis_board[x][y] = player # 這行應該在 _reconstruct_board 中完成
-        self.influence_map[x][y] = 9 # 被佔據的點影響力設為最大 (或特殊值)
-
-        for r in range(BOARD_SIZE):
-            for c in range(BOARD_SIZE):
-                if self.analysis_board[r][c] == EMPTY:  # 只計算空位
-                    count = 0
-                    # 查看周圍8個鄰居
-                    for i in range(-1, 2):
-                        for j in range(-1, 2):
-                            if i == 0 and j == 0: continue
-                            neighbor_r, neighbor_c = r + i, c + j
-                            if is_on_board(neighbor_r, neighbor_c) and self.analysis_board[neighbor_r][neighbor_c] != EMPTY:
-                                count += 1
-                    self.influence_map[r][c] = count
-                else:  # 非空位 (有棋子)
-                    self.influence_map[r][c] = 9 # 或者 -1 表示不可落子且無影響力值
-
+        self.influence.place(player, x, y)
+        self.position_hash = self.zobrist.toggle(self.position_hash, player, x, y)
+        self.stone_count += 1
+        self._invalidate_lines(x, y)
+
+    def remove_stone(self, player, x, y):
+        """update_influence_map 的反操作 (悔棋或分析模式倒退)。"""
+        self.analysis_board[x][y] = EMPTY
+        self.influence.remove(player, x, y)
+        self.position_hash = self.zobrist.toggle(self.position_hash, player, x, y)
+        self.stone_count -= 1
+        self._invalidate_lines(x, y)
 
     # --- 修改 getter 方法以接受 player 參數 ---
     def get_live_three_positions(self, player):
@@ -377,8 +614,6 @@ class AnalysisHandler:
         """獲取指定玩家的連五位置"""
         return self.five_positions.get(player, [])
 
-    def simulate_move(self, board, row, col, player):
-        """模擬在指定位置下子，並返回新的棋盤狀態"""
-        new_board = [r[:] for r in board]  # 複製棋盤
-        new_board[row][col] = player
-        return new_board
\ No newline at end of file
+    def get_sleep_three_positions(self, player):
+        """獲取指定玩家的眠三位置"""
+        return self.sleep_three_positions.get(player, [])
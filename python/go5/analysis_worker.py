@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+背景分析 (AnalysisWorker)。
+
+畫面迴圈每一幀都要畫棋型覆蓋層，但不應等待分析完成。AnalysisWorker 在背景執行緒中
+對提交的局面做一次完整分析 (AnalysisHandler.analyze_position)，結果以局面版本標記：
+  - submit(board, move_count, version)：複製棋盤並取代尚未開始的工作，回傳後立即返回；
+  - 較新的局面提交後，正在執行的舊工作會在下一列掃描前放棄 (scan_all 的 should_stop)；
+  - latest()：最近一次「完成」的結果，畫面一律畫這一份，永遠不會等待。
+
+使用執行緒而非行程：分析只讀取棋盤複本與共用的 RuleSet 表格，不需要跨行程複製查表；
+主迴圈大部分時間在 clock.tick 等待，分析在這段時間內執行。
+"""
+import threading
+import time
+
+import profiling
+from analysis import AnalysisHandler
+
+
+class AnalysisResult:
+    """一次背景分析的結果。"""
+
+    def __init__(self, version, positions, influence_map, elapsed):
+        self.version = version             # submit 時給的局面版本
+        self.positions = positions         # {pattern_type: {player: [(row, col, player, type), ...]}}
+        self.influence_map = influence_map # 與 AnalysisHandler.influence_map 相同格式
+        self.elapsed = elapsed             # 分析耗時 (秒)
+
+    def get_positions(self, pattern_type):
+        return self.positions.get(pattern_type, {})
+
+
+class AnalysisWorker:
+    """在背景執行緒中分析最新局面；舊的工作會被新的取代或取消。"""
+
+    def __init__(self, ruleset=None):
+        self._handler = AnalysisHandler(None, ruleset) # 只使用 analyze_position，不保存遊戲狀態
+        self._condition = threading.Condition()
+        self._pending = None       # (version, board, move_count)，尚未開始的最新工作
+        self._submitted = None     # 最近一次提交的版本
+        self._latest = None        # 最近一次完成的 AnalysisResult
+        self._thread = None
+        self._running = False
+
+    # --- 執行緒控制 ---
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="AnalysisWorker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        with self._condition:
+            self._running = False
+            self._pending = None
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- 工作提交 / 結果 ---
+    def submit(self, board, move_count, version):
+        """提交局面 (棋盤會被複製)，取代尚未開始的工作。"""
+        if profiling.ENABLED:
+            profiling.count("board_copy")
+        job = (version, [row[:] for row in board], move_count)
+        with self._condition:
+            self._pending = job
+            self._submitted = version
+            self._condition.notify_all()
+
+    def latest(self):
+        """最近一次完成的分析結果 (尚無結果時為 None)。"""
+        return self._latest
+
+    def wait_for(self, version, timeout=None):
+        """等待 version 的結果完成 (測試與離線使用)，逾時回傳 None。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._latest is None or self._latest.version != version:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self._latest
+
+    def _is_stale(self, version):
+        return not self._running or self._submitted != version
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                version, board, move_count = self._pending
+                self._pending = None
+
+            start = time.perf_counter()
+            analysis = self._handler.analyze_position(board, move_count,
+                                                      should_stop=lambda: self._is_stale(version))
+            if analysis is None:
+                continue # 已有較新的局面，放棄
+            positions, influence_map = analysis
+            result = AnalysisResult(version, positions, influence_map, time.perf_counter() - start)
+            with self._condition:
+                if not self._is_stale(version):
+                    self._latest = result
+                    self._condition.notify_all()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+棋譜批次分析 (不需要 pygame 視窗)。
+
+分析一個目錄中所有 game_io.save_game_data 存下的棋譜 (*.json)，以行程池平行處理，
+每一手輸出一列：
+  - 落子前雙方 (own = 下這一手的一方, opp = 對手) 各棋型的點數 (AnalysisHandler 的棋型位置)
+  - 落子前黑方禁手點的數量，以及這一手是否下在禁手點 (forbidden_hit)
+  - 對手有成五點時，這一手是否擋在其中 (forced_block)
+  - 這一手是否獲勝
+  - --vcf 時，落子前下這一手的一方是否有 VCF (found / none / timeout)
+結果寫成單一 CSV，每盤棋分析完就立即寫出 (依完成順序)，最後回報 games/sec。
+
+    python batch_analyze.py saves/ --output analysis.csv --workers 4 --vcf
+"""
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+from config import EMPTY, BLACK, WHITE
+import ruleset as ruleset_module
+import threat_search
+from analysis import AnalysisHandler, PATTERN_BITS
+
+PATTERN_TYPES = tuple(PATTERN_BITS)
+DEFAULT_VCF_TIME = 0.2 # 每一手 VCF 搜尋的時間上限 (秒)
+
+COLUMNS = (["game", "move", "player", "row", "col"]
+           + [f"{side}_{pattern_type}" for side in ("own", "opp") for pattern_type in PATTERN_TYPES]
+           + ["forbidden_points", "forbidden_hit", "forced_block", "win", "vcf"])
+
+
+def _point_set(positions, player):
+    return {(r, c) for r, c, _, _ in positions.get(player, [])}
+
+
+def analyze_moves(move_log, ruleset, game_name="", vcf_time=None):
+    """
+    逐手重播 move_log 並回傳每一手的分析列 (dict，鍵為 COLUMNS)。
+    vcf_time 為 None 時不做 VCF 搜尋。遇到不合法的棋步 (界外或重複) 時停止。
+    """
+    handler = AnalysisHandler(None, ruleset)
+    searcher = threat_search.ThreatSearch(ruleset, time_limit=vcf_time) if vcf_time else None
+    board = handler.analysis_board
+    rows = []
+    for i, data in enumerate(move_log):
+        r, c, player = data.get('row', -1), data.get('col', -1), data.get('player', 0)
+        if player not in (BLACK, WHITE) or not ruleset.is_on_board(r, c) or board[r][c] != EMPTY:
+            break
+        opponent = WHITE if player == BLACK else BLACK
+        row = {"game": game_name, "move": i + 1, "player": player, "row": r, "col": c}
+        for pattern_type in PATTERN_TYPES:
+            positions = getattr(handler, f"{pattern_type}_positions")
+            row[f"own_{pattern_type}"] = len(positions[player])
+            row[f"opp_{pattern_type}"] = len(positions[opponent])
+
+        records = handler.point_records
+        row["forbidden_points"] = sum(1 for record_row in records for record in record_row if record[2] is not None)
+        row["forbidden_hit"] = int(player == BLACK and records[r][c][2] is not None)
+        opp_fives = _point_set(handler.five_positions, opponent)
+        row["forced_block"] = int(bool(opp_fives) and (r, c) in opp_fives)
+        row["win"] = int(ruleset.check_win_condition_at(r, c, player, board))
+        if searcher is not None:
+            result = searcher.vcf(board, player)
+            row["vcf"] = "found" if result.found else "none" if result.complete else "timeout"
+        else:
+            row["vcf"] = ""
+        rows.append(row)
+
+        handler.update_influence_map(player, r, c)
+        if row["win"]:
+            break
+    return rows
+
+
+def _load_move_log(path):
+    """讀取 game_io 存檔格式的棋譜 (不匯入 game_io，避免載入開局庫)。"""
+    import json
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get("move_log", [])
+
+
+def _analyze_file(job):
+    """行程池工作：回傳 (路徑, 分析列, 錯誤訊息或 None)。"""
+    path, rule_name, board_size, vcf_time = job
+    try:
+        ruleset = ruleset_module.get_ruleset(rule_name, board_size)
+        rows = analyze_moves(_load_move_log(path), ruleset, os.path.basename(path), vcf_time)
+        return path, rows, None
+    except Exception as e:
+        return path, [], f"{type(e).__name__}: {e}"
+
+
+def find_games(paths):
+    """目錄展開為其中的 *.json (依名稱排序)，檔案原樣保留。"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.json"))))
+        else:
+            files.append(path)
+    return files
+
+
+def run(files, output, rule_name="renju", board_size=15, workers=None, vcf_time=None, log=sys.stdout):
+    """分析 files 並把結果寫入 output (CSV)，回傳統計 dict。"""
+    jobs = [(path, rule_name, board_size, vcf_time) for path in files]
+    workers = workers or os.cpu_count() or 1
+    games = moves = 0
+    errors = []
+    start = time.perf_counter()
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+            results = pool.imap_unordered(_analyze_file, jobs)
+        else:
+            pool = None
+            results = map(_analyze_file, jobs)
+        try:
+            for path, rows, error in results:
+                if error:
+                    errors.append((path, error))
+                    print(f"Error analysing {path}: {error}", file=log)
+                    continue
+                writer.writerows(rows)
+                f.flush() # 每盤棋完成就寫出
+                games += 1
+                moves += len(rows)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "games": games,
+        "moves": moves,
+        "errors": errors,
+        "workers": workers,
+        "elapsed": elapsed,
+        "games_per_sec": games / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批次分析 go5 棋譜存檔")
+    parser.add_argument("paths", nargs="+", help="棋譜 JSON 檔案或包含 *.json 的目錄")
+    parser.add_argument("--output", default="analysis.csv", help="輸出 CSV 路徑")
+    parser.add_argument("--workers", type=int, default=None, help="行程數 (預設為 CPU 核心數)")
+    parser.add_argument("--rules", default="renju", choices=sorted(ruleset_module.VARIANTS))
+    parser.add_argument("--board-size", type=int, default=15)
+    parser.add_argument("--vcf", action="store_true", help="每一手都做 VCF 搜尋")
+    parser.add_argument("--vcf-time", type=float, default=DEFAULT_VCF_TIME, help="每一手 VCF 的時間上限 (秒)")
+    args = parser.parse_args(argv)
+
+    files = find_games(args.paths)
+    if not files:
+        parser.error("no game records found")
+    stats = run(files, args.output, args.rules, args.board_size, args.workers,
+                args.vcf_time if args.vcf else None)
+    print(f"{stats['games']} games, {stats['moves']} moves in {stats['elapsed']:.2f}s "
+          f"({stats['games_per_sec']:.2f} games/sec, {stats['workers']} workers) -> {args.output}")
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
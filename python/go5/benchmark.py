@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+go5 規則與分析熱點的效能基準 (benchmark)。
+
+局面語料 (corpus)：
+  - test_game_logic.py 中的棋譜序列，每個前綴都是一個局面
+  - 以固定亂數種子生成的中盤局面 (雙方輪流在既有棋子旁合法落子)
+每個局面都是一串 (row, col) 棋步，以 RenjuGame.make_move 重播得到棋盤、分析器與棋譜。
+
+量測的函式：
+  rules.is_legal_move / rules.check_forbidden_move_at / line_table.black_forbidden_reason /
+  strict_rules.forbidden_reason (每個空點一次；後兩者為簡化與嚴格禁手判斷的對照)、AnalysisHandler.update_live_three_positions / update_live_four_positions
+  (每個局面一次，包含失效最後一手所在的線，即每一步實際的分析成本)
+  與 AIPlayer.find_best_ai_move (每個局面一次)。
+
+每個函式輸出 ops/sec 與 p50 / p99 延遲 (微秒)，結果寫成 JSON。
+指定 --baseline 時與舊結果比較，任一 (或 --fail-on 指定的) 函式的 ops/sec
+下降超過 --threshold 就以結束碼 1 結束，可直接用於 CI。
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json --threshold 0.25 --fail-on rules.is_legal_move
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+
+from config import EMPTY, BLACK, WHITE
+import line_table
+import rules
+import strict_rules
+import ruleset as ruleset_module
+
+# --- 語料 ---
+
+# 與 test_game_logic.py 相同的棋譜，座標為 (row, col)
+KIFU_SEQUENCES = {
+    "kifu_basic": [(7, 7), (6, 8), (7, 9), (5, 8), (8, 8), (5, 9), (10, 7)],
+    "three_three": [(7, 7), (0, 0), (2, 1), (1, 0), (2, 3), (7, 0), (1, 2), (3, 0), (3, 2), (4, 0)],
+    "black_win": [(7, 7), (8, 0), (1, 1), (8, 1), (1, 2), (8, 2), (1, 3), (8, 3), (1, 4), (9, 0), (1, 5)],
+    "white_win": [(7, 7), (1, 1), (8, 0), (1, 2), (8, 1), (1, 3), (8, 2), (1, 4), (8, 3), (1, 5)],
+}
+
+DEFAULT_SEED = 20240501
+DEFAULT_RANDOM_GAMES = 12
+
+
+def _random_game(rng, ruleset, length):
+    """雙方輪流在既有棋子旁隨機合法落子，遇到勝負即停止。"""
+    board = ruleset.new_board()
+    moves = [(ruleset.center, ruleset.center)]
+    board[ruleset.center][ruleset.center] = BLACK
+    player = WHITE
+    while len(moves) < length:
+        legal, _ = ruleset.legal_move_mask(board, player, len(moves))
+        candidates = sorted({(nr, nc) for r, c in moves for nr, nc in ruleset.neighbors[r][c]
+                             if legal[nr, nc]})
+        if not candidates:
+            break
+        r, c = rng.choice(candidates)
+        board[r][c] = player
+        if ruleset.check_win_condition_at(r, c, player, board):
+            board[r][c] = EMPTY
+            break
+        moves.append((r, c))
+        player = WHITE if player == BLACK else BLACK
+    return moves
+
+
+def build_corpus(seed=DEFAULT_SEED, random_games=DEFAULT_RANDOM_GAMES, ruleset=None):
+    """回傳 [(名稱, 棋步序列), ...]：棋譜的每個前綴加上隨機中盤局面。"""
+    ruleset = ruleset if ruleset is not None else ruleset_module.default_ruleset()
+    corpus = []
+    for name, moves in KIFU_SEQUENCES.items():
+        for n in range(1, len(moves)):  # 最後一步前的所有局面 (最後一步可能結束對局)
+            corpus.append((f"{name}[{n}]", moves[:n]))
+    rng = random.Random(seed)
+    for i in range(random_games):
+        corpus.append((f"random[{i}]", _random_game(rng, ruleset, rng.randint(20, 60))))
+    return corpus
+
+
+def replay(moves, ruleset=None):
+    """以 RenjuGame.make_move 重播棋步，回傳遊戲物件 (除錯輸出會被丟棄)。"""
+    from game_logic import RenjuGame
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = RenjuGame(black_player_type="human", white_player_type="human", ruleset=ruleset)
+        for r, c in moves:
+            if not game.make_move(r, c):
+                raise ValueError(f"Illegal corpus move ({r},{c}) after {game.move_count} moves")
+    return game
+
+
+# --- 量測 ---
+
+def _percentile(sorted_samples, q):
+    idx = min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))
+    return sorted_samples[idx]
+
+
+def summarize(samples_ns):
+    """samples_ns: 每次呼叫的耗時 (奈秒)，回傳 ops/sec 與 p50 / p99 (微秒)。"""
+    ordered = sorted(samples_ns)
+    total = sum(ordered)
+    return {
+        "ops": len(ordered),
+        "ops_per_sec": round(len(ordered) * 1e9 / total, 2) if total else 0.0,
+        "p50_us": round(_percentile(ordered, 0.50) / 1000, 3),
+        "p99_us": round(_percentile(ordered, 0.99) / 1000, 3),
+    }
+
+
+def _empty_points(board):
+    return [(r, c) for r, row in enumerate(board) for c, cell in enumerate(row) if cell == EMPTY]
+
+
+def bench_is_legal_move(game):
+    board, player, move_count = game.board, game.current_player, game.move_count
+    samples = []
+    for r, c in _empty_points(board):
+        t0 = time.perf_counter_ns()
+        rules.is_legal_move(r, c, player, move_count, board)
+        samples.append(time.perf_counter_ns() - t0)
+    return samples
+
+
+def bench_check_forbidden_move_at(game):
+    board = game.board
+    samples = []
+    for r, c in _empty_points(board):
+        with rules.trial_move(board, r, c, BLACK):  # check_forbidden_move_at 假設棋子已落下
+            t0 = time.perf_counter_ns()
+            rules.check_forbidden_move_at(r, c, board)
+            samples.append(time.perf_counter_ns() - t0)
+    return samples
+
+
+def bench_line_table_forbidden_reason(game):
+    """簡化規則的查表禁手判斷 (RuleSet("renju") 使用)，作為嚴格規則的比較基準。"""
+    board = game.board
+    samples = []
+    for r, c in _empty_points(board):
+        t0 = time.perf_counter_ns()
+        line_table.black_forbidden_reason(board, r, c)
+        samples.append(time.perf_counter_ns() - t0)
+    return samples
+
+
+def bench_strict_forbidden_reason(game):
+    board = game.board
+    samples = []
+    for r, c in _empty_points(board):
+        t0 = time.perf_counter_ns()
+        strict_rules.forbidden_reason(board, r, c)
+        samples.append(time.perf_counter_ns() - t0)
+    return samples
+
+
+def _replay_last_move(game):
+    """讓分析器回到剛下完最後一手、棋型尚未更新的狀態 (失效上一手通過的四條線)。"""
+    if game.last_move is not None:
+        game.analysis_handler._invalidate_lines(*game.last_move)
+
+
+def bench_update_live_three_positions(game):
+    game.analysis_handler.cache.clear()  # 量測未命中局面快取時的成本
+    t0 = time.perf_counter_ns()
+    _replay_last_move(game)
+    game.analysis_handler.update_live_three_positions()
+    return [time.perf_counter_ns() - t0]
+
+
+def bench_update_live_four_positions(game):
+    game.analysis_handler.cache.clear()
+    t0 = time.perf_counter_ns()
+    _replay_last_move(game)
+    game.analysis_handler.update_live_four_positions()
+    return [time.perf_counter_ns() - t0]
+
+
+def bench_find_best_ai_move(game):
+    game.analysis_handler.update_live_three_positions()
+    game.analysis_handler.update_live_four_positions()
+    random.seed(0)  # AI 在同分著法之間隨機選擇
+    t0 = time.perf_counter_ns()
+    game.ai.find_best_ai_move(game.board, game.move_log, game.move_count, game.current_player, game.analysis_handler)
+    return [time.perf_counter_ns() - t0]
+
+
+BENCHMARKS = {
+    "rules.is_legal_move": bench_is_legal_move,
+    "rules.check_forbidden_move_at": bench_check_forbidden_move_at,
+    "line_table.black_forbidden_reason": bench_line_table_forbidden_reason,
+    "strict_rules.forbidden_reason": bench_strict_forbidden_reason,
+    "AnalysisHandler.update_live_three_positions": bench_update_live_three_positions,
+    "AnalysisHandler.update_live_four_positions": bench_update_live_four_positions,
+    "AIPlayer.find_best_ai_move": bench_find_best_ai_move,
+}
+
+
+def run(names=None, seed=DEFAULT_SEED, random_games=DEFAULT_RANDOM_GAMES, repeat=3, corpus=None):
+    """執行基準並回傳可寫成 JSON 的結果字典 (corpus 未提供時以 build_corpus 生成)。"""
+    names = list(names) if names else list(BENCHMARKS)
+    if corpus is None:
+        corpus = build_corpus(seed, random_games)
+    games = [replay(moves) for _, moves in corpus]
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):  # 分析與 AI 模組的除錯輸出
+        for name in names:
+            func = BENCHMARKS[name]
+            samples = []
+            for _ in range(repeat):
+                for game in games:
+                    samples.extend(func(game))
+            results[name] = summarize(samples)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": rules.BACKEND,
+            "seed": seed,
+            "positions": len(corpus),
+            "repeat": repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold, fail_on=None):
+    """
+    回傳退步清單 [(名稱, 基準 ops/sec, 目前 ops/sec), ...]。
+    只檢查 fail_on 指定的函式 (未指定時檢查兩者都有的全部函式)。
+    """
+    names = fail_on or [n for n in current["results"] if n in baseline["results"]]
+    regressions = []
+    for name in names:
+        if name not in current["results"] or name not in baseline["results"]:
+            continue
+        base = baseline["results"][name]["ops_per_sec"]
+        now = current["results"][name]["ops_per_sec"]
+        if base > 0 and (base - now) / base > threshold:
+            regressions.append((name, base, now))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="go5 規則與分析效能基準")
+    parser.add_argument("--output", default="benchmark_results.json", help="結果 JSON 路徑")
+    parser.add_argument("--baseline", help="用來比較的舊結果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="容許的 ops/sec 下降比例")
+    parser.add_argument("--fail-on", action="append", choices=sorted(BENCHMARKS),
+                        help="只在這些函式退步時失敗 (可重複指定)")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="只執行指定的函式")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--random-games", type=int, default=DEFAULT_RANDOM_GAMES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    report = run(args.only, args.seed, args.random_games, args.repeat)
+    print(f"{'function':<46}{'ops/sec':>14}{'p50 us':>12}{'p99 us':>12}")
+    for name, res in report["results"].items():
+        print(f"{name:<46}{res['ops_per_sec']:>14.1f}{res['p50_us']:>12.1f}{res['p99_us']:>12.1f}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.fail_on)
+        for name, base, now in regressions:
+            print(f"REGRESSION {name}: {base:.1f} -> {now:.1f} ops/sec (> {args.threshold:.0%} slower)")
+        if regressions:
+            return 1
+        print(f"No regression beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
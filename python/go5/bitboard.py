@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+位元棋盤 (Bitboard) 規則引擎。
+
+每位玩家在四個方向 (橫、直、兩條斜線) 上的每一條線都以一個整數遮罩表示，
+第 pos 格對應位元 (pos + 1)；位元 0 永遠保留為「邊界」哨兵，
+讓 '非己方' 的側翼檢查在線段起點也成立。
+
+五連、恰好四、活三與長連的判斷都變成 shift-and-mask 運算：
+把每個模式字元對應的遮罩右移後做 AND，再限制起點必須讓落子點落在模式的棋子上。
+
+rules.is_legal_move 會自動選用此引擎 (參見 rules.BACKEND)。
+線的數量與每個點所在的線 (_LINE_COUNTS / _CELL_KEYS) 在匯入時依 config.BOARD_SIZE
+(GO5_BOARD_SIZE) 預先計算，因此一個行程只支援一種大小；其他大小請使用 ruleset.RuleSet。
+"""
+from config import BOARD_SIZE, EMPTY, BLACK, WHITE, DIRECTIONS
+
+WINDOW_RADIUS = 5  # 所有模式 (含側翼) 都落在落子點前後 5 格之內
+_WINDOW_CENTER_BIT = WINDOW_RADIUS + 1
+_WINDOW_MASK = (1 << (2 * WINDOW_RADIUS + 1)) - 1
+
+# --- 模式定義 ---
+# 'X' = 己方棋子, '_' = 空點, 'n' = 非己方 (空點、對方或邊界)
+_PATTERNS_FIVE_EXACT = ("nXXXXXn",)
+_PATTERNS_FIVE_OR_MORE = ("XXXXX",)
+_PATTERNS_OVERLINE = ("XXXXXX",)
+_PATTERNS_EXACT_FOUR = ("nXXXXn", "nX_XXXn", "nXX_XXn", "nXXX_Xn")
+_PATTERNS_OPEN_THREE = ("_XXX_", "_X_XX_", "_XX_X_")
+
+
+def compile_patterns(patterns):
+    """將模式字串轉成 (位移清單, 棋子索引) 以加速比對。"""
+    compiled = []
+    for pattern in patterns:
+        own = tuple(j for j, ch in enumerate(pattern) if ch == 'X')
+        empty = tuple(j for j, ch in enumerate(pattern) if ch == '_')
+        not_own = tuple(j for j, ch in enumerate(pattern) if ch == 'n')
+        compiled.append((own, empty, not_own))
+    return tuple(compiled)
+
+
+FIVE_EXACT = compile_patterns(_PATTERNS_FIVE_EXACT)
+FIVE_OR_MORE = compile_patterns(_PATTERNS_FIVE_OR_MORE)
+OVERLINE = compile_patterns(_PATTERNS_OVERLINE)
+EXACT_FOUR = compile_patterns(_PATTERNS_EXACT_FOUR)
+OPEN_THREE = compile_patterns(_PATTERNS_OPEN_THREE)
+
+
+def match_line(own, empty, p, compiled_patterns):
+    """
+    檢查一條線 (own / empty 遮罩) 上是否存在包含位元 p 的任一模式。
+    p 必須是己方棋子 (已放入 own 遮罩)。
+    """
+    not_own = ~own
+    for own_idx, empty_idx, not_own_idx in compiled_patterns:
+        hits = -1
+        for j in own_idx:
+            hits &= own >> j
+        for j in empty_idx:
+            hits &= empty >> j
+        for j in not_own_idx:
+            hits &= not_own >> j
+        if not hits:
+            continue
+        # 起點 s 必須使落子點是模式中的某一顆己方棋子: s = p - k
+        starts = 0
+        for k in own_idx:
+            if k <= p:
+                starts |= 1 << (p - k)
+        if hits & starts:
+            return True
+    return False
+
+
+def _is_win(lines, player):
+    """lines: [(own, empty, p), ...]；黑棋只能恰好五連，白棋五連或以上。"""
+    patterns = FIVE_EXACT if player == BLACK else FIVE_OR_MORE
+    for own, empty, p in lines:
+        if match_line(own, empty, p, patterns):
+            return True
+    return False
+
+
+def _forbidden_reason(lines):
+    """與 rules.check_forbidden_move_at 相同的判斷順序：長連 -> 四四 -> 三三。"""
+    for own, empty, p in lines:
+        if match_line(own, empty, p, OVERLINE):
+            return "長連"
+
+    fours_count = 0
+    open_threes_count = 0
+    for own, empty, p in lines:
+        if match_line(own, empty, p, EXACT_FOUR):
+            fours_count += 1
+        if match_line(own, empty, p, OPEN_THREE):
+            open_threes_count += 1
+
+    if fours_count >= 2:
+        return "四四"
+    if open_threes_count >= 2:
+        return "三三"
+    return None
+
+
+def _evaluate(lines, player, r, c, move_count, occupied):
+    """is_legal_move 的共用流程 (邊界與佔用已由呼叫端檢查)。"""
+    if occupied:
+        return False, "Occupied or Off-board"
+
+    if player == BLACK and move_count == 0:
+        center = BOARD_SIZE // 2
+        if (r, c) != (center, center):
+            return False, f"First move must be Tengen ({center},{center})"
+        return True, None
+
+    if _is_win(lines, player):
+        return True, None
+
+    if player == BLACK:
+        reason = _forbidden_reason(lines)
+        if reason:
+            return False, reason
+    return True, None
+
+
+# --- 直接讀取 list 棋盤的視窗版本 ---
+
+def lines_from_board(board, r, c, player):
+    """
+    從 list 棋盤取出通過 (r, c) 的四條 11 格視窗，並模擬在 (r, c) 放下 player。
+    視窗之外一律視為邊界，因為所有規則模式都在前後 5 格之內。
+    """
+    size = len(board)
+    center_bit = 1 << _WINDOW_CENTER_BIT
+    lines = []
+    for dr, dc in DIRECTIONS:
+        own = 0
+        empty = 0
+        bit = 1 << 1
+        for i in range(-WINDOW_RADIUS, WINDOW_RADIUS + 1):
+            cr, cc = r + i * dr, c + i * dc
+            if 0 <= cr < size and 0 <= cc < size:
+                cell = board[cr][cc]
+                if cell == player:
+                    own |= bit
+                elif cell == EMPTY:
+                    empty |= bit
+            bit <<= 1
+        lines.append((own | center_bit, empty & ~center_bit, _WINDOW_CENTER_BIT))
+    return lines
+
+
+def check_win_condition_at(r, c, player, board):
+    """check_win_condition_at 的位元版本 (board 可為 list 或 BitBoard)。"""
+    if isinstance(board, BitBoard):
+        return board.check_win_condition_at(r, c, player)
+    return _is_win(lines_from_board(board, r, c, player), player)
+
+
+def is_legal_move(r, c, player, move_count, board):
+    """is_legal_move 的位元版本，回傳值與 rules.is_legal_move 完全相同。"""
+    if isinstance(board, BitBoard):
+        return board.is_legal_move(r, c, player, move_count)
+    if not (0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE):
+        return False, "Occupied or Off-board"
+    if board[r][c] != EMPTY:
+        return False, "Occupied or Off-board"
+    return _evaluate(lines_from_board(board, r, c, player), player, r, c, move_count, False)
+
+
+# --- 完整位元棋盤 ---
+
+def _line_key(direction_idx, r, c):
+    """回傳 (線編號, 位元位置)。沿著方向前進一步，位元位置加一。"""
+    if direction_idx == 0:    # 橫 (0, 1)
+        return r, c + 1
+    if direction_idx == 1:    # 直 (1, 0)
+        return c, r + 1
+    if direction_idx == 2:    # 斜 (1, 1)
+        return r - c + BOARD_SIZE - 1, r + 1
+    return r + c, r + 1       # 反斜 (1, -1)
+
+
+_LINE_COUNTS = (BOARD_SIZE, BOARD_SIZE, 2 * BOARD_SIZE - 1, 2 * BOARD_SIZE - 1)
+# _CELL_KEYS[r][c] = ((line, bit), ...) 依 DIRECTIONS 順序
+_CELL_KEYS = [[tuple(_line_key(d, r, c) for d in range(len(DIRECTIONS)))
+               for c in range(BOARD_SIZE)] for r in range(BOARD_SIZE)]
+_VALID = [[0] * n for n in _LINE_COUNTS]
+for _r in range(BOARD_SIZE):
+    for _c in range(BOARD_SIZE):
+        for _d, (_line, _bit) in enumerate(_CELL_KEYS[_r][_c]):
+            _VALID[_d][_line] |= 1 << _bit
+
+
+class BitBoard:
+    """以每條線一個整數遮罩表示的棋盤。"""
+
+    def __init__(self):
+        self.masks = {
+            BLACK: [[0] * n for n in _LINE_COUNTS],
+            WHITE: [[0] * n for n in _LINE_COUNTS],
+        }
+
+    @classmethod
+    def from_board(cls, board):
+        """由 list 棋盤建立 BitBoard。"""
+        bb = cls()
+        for r in range(BOARD_SIZE):
+            row = board[r]
+            for c in range(BOARD_SIZE):
+                if row[c] != EMPTY:
+                    bb.place(r, c, row[c])
+        return bb
+
+    def place(self, r, c, player):
+        masks = self.masks[player]
+        for d, (line, bit) in enumerate(_CELL_KEYS[r][c]):
+            masks[d][line] |= 1 << bit
+
+    def remove(self, r, c, player):
+        masks = self.masks[player]
+        for d, (line, bit) in enumerate(_CELL_KEYS[r][c]):
+            masks[d][line] &= ~(1 << bit)
+
+    def get(self, r, c):
+        """回傳 (r, c) 的 EMPTY / BLACK / WHITE。"""
+        bit = 1 << (c + 1)
+        if self.masks[BLACK][0][r] & bit:
+            return BLACK
+        if self.masks[WHITE][0][r] & bit:
+            return WHITE
+        return EMPTY
+
+    def lines_at(self, r, c, player):
+        """回傳模擬在 (r, c) 放下 player 後，通過該點的四條 (own, empty, p)。"""
+        own_masks = self.masks[player]
+        opp_masks = self.masks[WHITE if player == BLACK else BLACK]
+        lines = []
+        for d, (line, bit) in enumerate(_CELL_KEYS[r][c]):
+            stone = 1 << bit
+            own = own_masks[d][line] | stone
+            empty = _VALID[d][line] & ~(own | opp_masks[d][line])
+            lines.append((own, empty, bit))
+        return lines
+
+    def windows_at(self, r, c, player):
+        """
+        回傳通過 (r, c) 的四條 11 格視窗 (own, opp, edge)，位元 0..10 對應偏移 -5..+5。
+        供 line_table 以查表方式分類。
+        """
+        own_masks = self.masks[player]
+        opp_masks = self.masks[WHITE if player == BLACK else BLACK]
+        windows = []
+        for d, (line, bit) in enumerate(_CELL_KEYS[r][c]):
+            shift = bit - WINDOW_RADIUS
+            own, opp, valid = own_masks[d][line], opp_masks[d][line], _VALID[d][line]
+            if shift >= 0:
+                own, opp, valid = own >> shift, opp >> shift, valid >> shift
+            else:
+                own, opp, valid = own << -shift, opp << -shift, valid << -shift
+            windows.append((own & _WINDOW_MASK, opp & _WINDOW_MASK, ~valid & _WINDOW_MASK))
+        return windows
+
+    def check_win_condition_at(self, r, c, player):
+        return _is_win(self.lines_at(r, c, player), player)
+
+    def check_forbidden_move_at(self, r, c):
+        return _forbidden_reason(self.lines_at(r, c, BLACK))
+
+    def is_legal_move(self, r, c, player, move_count):
+        if not (0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE):
+            return False, "Occupied or Off-board"
+        occupied = self.get(r, c) != EMPTY
+        lines = () if occupied else self.lines_at(r, c, player)
+        return _evaluate(lines, player, r, c, move_count, occupied)
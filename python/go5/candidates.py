@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+候選點集合 (CandidateSet)。
+
+候選點是離任一棋子 radius 格 (切比雪夫距離，預設 2，即 5x5 方塊) 以內的空點。
+每個點記錄方塊內的棋子數 (near)：落子或提子只需要更新以該點為中心的方塊，
+因此維護成本是 O(radius ** 2)，不必每次掃描整個棋盤。
+
+點以 r * size + c 編號 (indices)，搜尋直接使用編號；其他呼叫端以 (row, col) 迭代。
+RenjuGame 隨落子 / 悔棋維護一份，AIPlayer 的啟發式與 AlphaBetaSearch 都從這裡取候選點。
+"""
+from config import EMPTY
+
+DEFAULT_RADIUS = 2
+
+_blocks = {}
+
+
+def get_blocks(size, radius=DEFAULT_RADIUS):
+    """blocks[i]：點 i 周圍 radius 方塊內其他點的編號 (依棋盤大小與半徑共用)。"""
+    key = (size, radius)
+    if key not in _blocks:
+        _blocks[key] = [tuple(rr * size + cc
+                              for rr in range(max(0, r - radius), min(size, r + radius + 1))
+                              for cc in range(max(0, c - radius), min(size, c + radius + 1))
+                              if (rr, cc) != (r, c))
+                        for r in range(size) for c in range(size)]
+    return _blocks[key]
+
+
+class CandidateSet:
+    """離棋子 radius 格以內的空點，隨 place / remove 增量更新。"""
+
+    def __init__(self, size, radius=DEFAULT_RADIUS):
+        self.size = size
+        self.radius = radius
+        self.blocks = get_blocks(size, radius)
+        self.near = [0] * (size * size)          # 方塊內的棋子數
+        self.occupied = [False] * (size * size)
+        self.indices = set()                     # 候選點編號
+
+    @classmethod
+    def from_board(cls, board, radius=DEFAULT_RADIUS):
+        candidates = cls(len(board), radius)
+        for r, row in enumerate(board):
+            for c, cell in enumerate(row):
+                if cell != EMPTY:
+                    candidates.place(r, c)
+        return candidates
+
+    def copy(self):
+        other = CandidateSet.__new__(CandidateSet)
+        other.size, other.radius, other.blocks = self.size, self.radius, self.blocks
+        other.near = self.near[:]
+        other.occupied = self.occupied[:]
+        other.indices = set(self.indices)
+        return other
+
+    def place(self, r, c):
+        """(r, c) 落子。"""
+        i = r * self.size + c
+        near, occupied, indices = self.near, self.occupied, self.indices
+        occupied[i] = True
+        indices.discard(i)
+        for q in self.blocks[i]:
+            near[q] += 1
+            if near[q] == 1 and not occupied[q]:
+                indices.add(q)
+
+    def remove(self, r, c):
+        """(r, c) 提子 (悔棋或搜尋撤銷)。"""
+        i = r * self.size + c
+        near, occupied, indices = self.near, self.occupied, self.indices
+        occupied[i] = False
+        for q in self.blocks[i]:
+            near[q] -= 1
+            if not near[q]:
+                indices.discard(q)
+        if near[i]:
+            indices.add(i)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __contains__(self, point):
+        r, c = point
+        return r * self.size + c in self.indices
+
+    def __iter__(self):
+        size = self.size
+        for i in self.indices:
+            yield divmod(i, size)
+
+    def ordered(self, key):
+        """依 key((row, col)) 由大到小排序的候選點。"""
+        return sorted(self, key=key, reverse=True)
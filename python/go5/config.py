@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 import pygame
 from enum import Enum, auto
 
@@ -12,7 +13,9 @@ class GameState(Enum):
     ANALYSIS = auto()
 
 # --- Constants ---
-BOARD_SIZE = 15
+# 棋盤大小：環境變數 GO5_BOARD_SIZE (預設 15，python main.py --size 19 會設定它)。
+# 畫面版面、bitboard 的預先計算表與 rules 的預設規則都以此為準；RuleSet 則可同時使用多種大小。
+BOARD_SIZE = int(os.environ.get("GO5_BOARD_SIZE", "15") or 15)
 SQUARE_SIZE = 40
 MARGIN = 30
 GRID_WIDTH = (BOARD_SIZE - 1) * SQUARE_SIZE
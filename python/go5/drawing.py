@@ -8,6 +8,7 @@ from config import (BOARD_SIZE, SQUARE_SIZE, MARGIN, GRID_WIDTH, GRID_HEIGHT,
                     MOVE_LIST_HIGHLIGHT_COLOR, EMPTY, BLACK, WHITE, GameState,
                     INFO_PANEL_RECT, ANALYSIS_PANEL_RECT,MARKER_COLOR_CURRENT_PLAYER,MARKER_COLOR_OPPONENT,WINNING_MOVE_HIGHLIGHT_COLOR)
 from utils import format_time
+import profiling
 
 def draw_grid(screen):
     """繪製 Renju 棋盤格線和星位點。"""
@@ -28,7 +29,9 @@ def draw_grid(screen):
             pygame.draw.line(screen, LINE_COLOR, start_pos_h, end_pos_h)
 
         # 繪製星位點 (天元和角落星位)
-        star_points_rc = [(3, 3), (3, 11), (11, 3), (11, 11), (7, 7)]  # (row, col) 索引
+        edge = 3 if BOARD_SIZE >= 13 else 2
+        far, center = BOARD_SIZE - 1 - edge, BOARD_SIZE // 2
+        star_points_rc = [(edge, edge), (edge, far), (far, edge), (far, far), (center, center)]  # (row, col) 索引
         star_radius = 5
         for r, c in star_points_rc:
             center_x = MARGIN + c * SQUARE_SIZE
@@ -453,6 +456,14 @@ def draw_analysis_panel(screen, game, font_small, font_medium):
                 title_surf = font_medium.render("五子棋", True, INFO_TEXT_COLOR)  # 範例：在面板中央顯示遊戲標題
                 title_rect = title_surf.get_rect(center=panel_rect.center)
                 screen.blit(title_surf, title_rect)
+                if profiling.ENABLED:  # --profile：在標題下方列出計數與計時
+                    line_y = title_rect.bottom + 20
+                    for line in profiling.summary_lines():
+                        if line_y + font_small.get_linesize() > panel_rect.bottom:
+                            break
+                        line_surf = font_small.render(line, True, INFO_TEXT_COLOR)
+                        screen.blit(line_surf, (panel_rect.left + 5, line_y))
+                        line_y += font_small.get_linesize()
             except Exception as e:
                 print(f"渲染錯誤：分析面板佔位符內容 - {e}")
 
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+黑方禁手點地圖 (ForbiddenMap)。
+
+一個點的三三、四四、長連狀態只取決於通過它的四條線上前後 5 格的內容，
+因此每次落子後只需要重新評估新棋子四條線上距離 5 格以內的點 (最多 40 個)，
+不必掃描整個棋盤。查詢 (r, c) 是否為禁手及原因是 O(1)。
+
+嚴格連珠 (RuleSet.strict，strict_rules) 的三三會遞迴檢查延伸點是否為禁手，
+結果還取決於延伸點 (以及更深的延伸點) 的四條線。評估時記錄每個點讀取過的延伸點，
+並維護反向索引 (延伸點 -> 依賴它的點)：落子後重新評估的點 = 四條線上 5 格內的點，
+加上依賴這些點的點。只有簡化規則已判定三三的點才會有延伸點，其餘與簡化規則相同。
+"""
+from config import EMPTY, DIRECTIONS
+import line_table
+
+AFFECT_RADIUS = line_table.WINDOW_RADIUS
+
+
+class ForbiddenMap:
+    """
+    由 AnalysisHandler 維護的黑方禁手地圖 (遊戲中唯一的一份)，board 為分析使用的同一個 list 棋盤。
+    ruleset 提供禁手判斷 (RuleSet.forbidden_reason)；未提供時使用 line_table 的連珠規則。
+    """
+
+    def __init__(self, board, ruleset=None):
+        self.board = board
+        self.size = len(board)
+        self._reason_at = ruleset.forbidden_reason if ruleset is not None else line_table.black_forbidden_reason
+        self._strict = ruleset is not None and ruleset.strict # 需要追蹤延伸點的依賴
+        self.reasons = [[None for _ in range(self.size)] for _ in range(self.size)]
+        self._depends = {}  # 嚴格連珠：點 -> 評估時讀取過的其他點 (延伸點)
+        self._watchers = {} # 反向索引：點 -> 依賴它的點
+        self.rebuild()
+
+    def rebuild(self):
+        """重新評估整個棋盤 (初始化或棋盤被直接修改後使用)。"""
+        for r in range(self.size):
+            for c in range(self.size):
+                self._evaluate(r, c)
+
+    def _evaluate(self, r, c):
+        if self.board[r][c] != EMPTY:
+            self.reasons[r][c] = None
+            if self._strict:
+                self._set_depends((r, c), ())
+        elif self._strict:
+            visited = set()
+            self.reasons[r][c] = self._reason_at(self.board, r, c, visited)
+            visited.discard((r, c))
+            self._set_depends((r, c), visited)
+        else:
+            self.reasons[r][c] = self._reason_at(self.board, r, c)
+
+    def _set_depends(self, point, depends):
+        for other in self._depends.pop(point, ()):
+            watchers = self._watchers[other]
+            watchers.discard(point)
+            if not watchers:
+                del self._watchers[other]
+        if depends:
+            self._depends[point] = frozenset(depends)
+            for other in depends:
+                self._watchers.setdefault(other, set()).add(point)
+
+    def _near(self, r, c):
+        """(r, c) 與四條線上 AFFECT_RADIUS 以內的點。"""
+        points = [(r, c)]
+        for dr, dc in DIRECTIONS:
+            for k in range(1, AFFECT_RADIUS + 1):
+                for sign in (1, -1):
+                    nr, nc = r + sign * k * dr, c + sign * k * dc
+                    if 0 <= nr < self.size and 0 <= nc < self.size:
+                        points.append((nr, nc))
+        return points
+
+    def update(self, r, c):
+        """(r, c) 剛落子 (或提子) 後，只重新評估受影響的點；回傳禁手狀態改變的點。"""
+        return self.update_points(((r, c),))
+
+    def update_points(self, points):
+        """多個點落子 / 提子後一次更新 (每個受影響的點只評估一次)；回傳禁手狀態改變的點。"""
+        affected = set()
+        for r, c in points:
+            near = self._near(r, c)
+            affected.update(near)
+            if self._strict:
+                for point in near:
+                    affected.update(self._watchers.get(point, ()))
+        changed = set()
+        for r, c in affected:
+            before = self.reasons[r][c]
+            self._evaluate(r, c)
+            if self.reasons[r][c] != before:
+                changed.add((r, c))
+        return changed
+
+    def state(self):
+        """目前狀態的複本 (AnalysisHandler 的關鍵幀)。"""
+        return [row[:] for row in self.reasons], dict(self._depends)
+
+    def restore(self, state):
+        """還原 state() 的結果 (board 必須已還原成同一個局面)。"""
+        reasons, depends = state
+        self.reasons = [row[:] for row in reasons]
+        self._depends = dict(depends)
+        self._watchers = {}
+        for point, others in self._depends.items():
+            for other in others:
+                self._watchers.setdefault(other, set()).add(point)
+
+    def is_forbidden(self, r, c):
+        """黑方在 (r, c) 落子是否為禁手。"""
+        return self.reasons[r][c] is not None
+
+    def reason(self, r, c):
+        """禁手原因 ("長連" / "四四" / "三三")，非禁手時為 None。"""
+        return self.reasons[r][c]
+
+    def forbidden_points(self):
+        """回傳目前所有禁手點 [(r, c, reason), ...]。"""
+        return [(r, c, self.reasons[r][c])
+                for r in range(self.size) for c in range(self.size)
+                if self.reasons[r][c] is not None]
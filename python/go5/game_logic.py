@@ -1,20 +1,27 @@
 # -*- coding: utf-8 -*-
 import time
 import random
-from config import (GameState, BOARD_SIZE, EMPTY, BLACK, WHITE, DEFAULT_TIME_LIMIT)
+import itertools
+from config import (GameState, EMPTY, BLACK, WHITE, DEFAULT_TIME_LIMIT)
 # --- 導入拆分後的模塊 ---
-import rules
+import ruleset as ruleset_module  # 棋規變體 (棋盤大小、勝利條件、禁手)
 import ai_player  # Handles find_best_move and learn_from_loss
 import game_io  # Handles save/load game and book I/O
 from analysis import AnalysisHandler
+from candidates import CandidateSet
+
+# 局面版本：棋盤 (或分析模式顯示的棋盤) 每次改變都取新值，重新開局也不會重複
+_position_versions = itertools.count(1)
 
 class RenjuGame:
     """處理 Renju 遊戲的核心邏輯、狀態和規則，委託具體實現給其他模塊。"""
 
-    def __init__(self, black_player_type="human", white_player_type="ai"):
-        """初始化遊戲。"""
+    def __init__(self, black_player_type="human", white_player_type="ai", ruleset=None):
+        """初始化遊戲。ruleset 為 ruleset.RuleSet，預設為 15x15 連珠。"""
         # 注意：OPENING_BOOK 由 game_io 在加載時處理，這裡不需要 global
-        self.board = [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        self.ruleset = ruleset if ruleset is not None else ruleset_module.default_ruleset()
+        self.board_size = self.ruleset.board_size
+        self.board = self.ruleset.new_board()
         self.current_player = BLACK
         self.game_state = GameState.PLAYING
         self.last_move = None
@@ -27,7 +34,10 @@ class RenjuGame:
         self.accumulated_pause_time = 0.0
         self.player_types = {BLACK: black_player_type, WHITE: white_player_type}
         self.ai_thinking = False
-        self.analysis_handler = AnalysisHandler(self)
+        self.ai = ai_player.AIPlayer(self.ruleset)
+        self.analysis_handler = AnalysisHandler(self, self.ruleset)
+        self.candidates = CandidateSet(self.board_size)  # 棋子周圍的空點，AI 的候選著法
+        self.position_version = next(_position_versions)  # 背景分析 (AnalysisWorker) 的結果以此標記
         self._update_status_message()
 
     def _update_status_message(self):
@@ -35,7 +45,7 @@ class RenjuGame:
         if self.game_state == GameState.PLAYING:
             player_name = "黑方" if self.current_player == BLACK else "白方"
             player_type_str = "(H)" if self.player_types[self.current_player] == "human" else "(AI)"
-            if self.move_count == 0 and self.current_player == BLACK:
+            if self.move_count == 0 and self.current_player == BLACK and self.ruleset.tengen:
                 self.status_message = f"{player_name}{player_type_str} 回合 (請下天元)"
             else:
                 self.status_message = f"{player_name}{player_type_str} 回合"
@@ -54,9 +64,10 @@ class RenjuGame:
         # Analysis message handled by AnalysisHandler
 
     def restart_game(self):
+        self.ai.cancel_pondering()
         black_player_type = self.player_types[BLACK]
         white_player_type = self.player_types[WHITE]
-        self.__init__(black_player_type=black_player_type, white_player_type=white_player_type)
+        self.__init__(black_player_type=black_player_type, white_player_type=white_player_type, ruleset=self.ruleset)
 
     def pause_game(self):
         if self.game_state == GameState.PLAYING:
@@ -99,10 +110,10 @@ class RenjuGame:
             print(f"Timeout! Player {loser} ({l_type}) lost.")
             self._update_status_message()  # Update status based on new game state
 
-            if self.player_types[loser] == "ai":
+            if ai_player.is_ai_type(self.player_types[loser]):
                 print(f"AI {loser} lost by timeout. Learning...")
                 # --- 調用 ai_player 模塊的學習函數 ---
-                ai_player.ai_player.learn_from_ai_loss(self.move_log, self.player_types)
+                self.ai.learn_from_ai_loss(self.move_log, self.player_types)
                 # --- 結束調用 ---
 
     def make_move(self, r, c):
@@ -112,16 +123,14 @@ class RenjuGame:
             return False
 
         player = self.current_player
-        print(f"[GAME DEBUG] make_move({r},{c}), player={player}, move_count={self.move_count}") #<-- 添加
-        # --- 使用 rules 模塊驗證 ---
-        valid, reason = rules.is_legal_move(r, c, player, self.move_count, self.board)
-        print(f"[GAME DEBUG] rules.is_legal_move returned: valid={valid}, reason='{reason}'") #<-- 添加
+        # --- 使用 RuleSet 驗證 ---
+        valid, reason = self.ruleset.is_legal_move(r, c, player, self.move_count, self.board)
         if not valid:
-            print(f"[GAME DEBUG] Move determined invalid. Returning False.") #<-- 添加
             player_name = "黑方" if player == BLACK else "白方"
             player_type_str = "(H)" if self.player_types[player] == "human" else "(AI)"
-            if reason == "First move must be Tengen (7,7)":
-                self.status_message = f"{player_name}{player_type_str} 請下天元 (7, 7)"
+            if reason == self.ruleset.tengen_reason:
+                center = self.ruleset.center
+                self.status_message = f"{player_name}{player_type_str} 請下天元 ({center}, {center})"
             elif reason == "Occupied or Off-board":
                 self.status_message = f"{player_name}{player_type_str} 無效位置!"
             else:
@@ -142,12 +151,14 @@ class RenjuGame:
         }
         self.move_log.append(log)
         self.accumulated_pause_time = 0.0
+        self.position_version = next(_position_versions)
 
         # 更新影響力地圖 (新增)
         self.analysis_handler.update_influence_map(player, r, c)  # 更新周圍點位
+        self.candidates.place(r, c)
 
-        # Check win/draw using rules module
-        if rules.check_win_condition_at(r, c, player, self.board):
+        # Check win/draw using the rule set
+        if self.ruleset.check_win_condition_at(r, c, player, self.board):
             self.game_state = GameState.BLACK_WINS if player == BLACK else GameState.WHITE_WINS
             loser = WHITE if player == BLACK else BLACK
             player_name = "黑方" if player == BLACK else "白方"
@@ -155,24 +166,43 @@ class RenjuGame:
             print(f"Win for {player_name}{player_type_str} at ({r},{c})")
             self._update_status_message()
 
-            if self.player_types[loser] == "ai":
+            if ai_player.is_ai_type(self.player_types[loser]):
                 print(f"AI {loser} lost. Learning...")
                 # --- 調用 ai_player 模塊的學習函數 ---
-                ai_player.ai_player.learn_from_ai_loss(self.move_log, self.player_types)
+                self.ai.learn_from_ai_loss(self.move_log, self.player_types)
                 # --- 結束調用 ---
             return True
 
-        if self.move_count == BOARD_SIZE * BOARD_SIZE:
+        if self.move_count == self.board_size * self.board_size:
             self.game_state = GameState.DRAW
             print("Draw game.")
             self._update_status_message()
             return True
 
         self.switch_player()
-        # 在移動後更新活三和跳活三的位置（遊戲進行中）
-        self.analysis_handler.update_live_three_positions()
-        # print(f"update_live_four_positions...")
-        self.analysis_handler.update_live_four_positions()
+        self._start_pondering()
+        # 棋型位置在讀取時才更新 (AnalysisHandler 的 live_three_positions 等)，
+        # 畫面上的覆蓋層由 AnalysisWorker 在背景計算，不在這裡同步計算
+        return True
+
+    def undo_move(self):
+        """悔棋：撤銷最後一手 (遊戲中或剛結束時)，回到該玩家的回合。成功時回傳 True。"""
+        if self.game_state in (GameState.ANALYSIS, GameState.PAUSED) or not self.move_log:
+            return False
+        self.ai.cancel_pondering()
+        data = self.move_log.pop()
+        r, c, player = data["row"], data["col"], data["player"]
+        self.board[r][c] = EMPTY
+        self.move_count -= 1
+        self.last_move = (self.move_log[-1]["row"], self.move_log[-1]["col"]) if self.move_log else None
+        self.analysis_handler.remove_stone(player, r, c)
+        self.candidates.remove(r, c)
+        self.position_version = next(_position_versions)
+        self.game_state = GameState.PLAYING
+        self.current_player = player
+        self.last_update_time = time.time()
+        self.current_move_start_time = self.last_update_time
+        self._update_status_message()
         return True
 
     def switch_player(self):
@@ -184,15 +214,34 @@ class RenjuGame:
     # --- AI move ---
     def request_ai_move(self):
         """請求 AI 計算下一步著法。"""
-        if self.game_state != GameState.PLAYING or self.player_types[self.current_player] != "ai":
+        player_type = self.player_types[self.current_player]
+        if self.game_state != GameState.PLAYING or not ai_player.is_ai_type(player_type):
             return None, False
 
-        # 調用 ai_player 模塊的函數
-        move, used_book = ai_player.ai_player.find_best_ai_move(  # 使用 ai_player 實例
-            self.board, self.move_log, self.move_count, self.current_player, self.analysis_handler  # 傳入 self.analysis_handler
+        # 人類已下子：停止背景思考 (命中時直接使用或沿用結果)
+        pondered = self.ai.stop_pondering(self.board)
+        # 調用本局的 AIPlayer 實例
+        self.ai.last_search = None
+        move, used_book = self.ai.find_best_ai_move(
+            self.board, self.move_log, self.move_count, self.current_player, self.analysis_handler,  # 傳入 self.analysis_handler
+            engine=ai_player.engine_for(player_type), time_left=self.timers[self.current_player],
+            candidates=self.candidates
         )
+        result = self.ai.last_search
+        if result is not None:
+            print(result.summary())
+        if pondered:
+            print(self.ai.ponderer.stats.summary())
         return move, used_book
 
+    def _start_pondering(self):
+        """輪到人類、對手是 AI 時，讓 AI 在背景思考人類可能的應手。"""
+        ai_side = WHITE if self.current_player == BLACK else BLACK
+        ai_type = self.player_types[ai_side]
+        if self.player_types[self.current_player] == "human" and ai_player.is_ai_type(ai_type):
+            self.ai.start_pondering(self.board, ai_side, self.move_count, ai_player.engine_for(ai_type),
+                                    self.timers[ai_side], self.candidates)
+
     # --- Save/Load ---
     def save_game(self, filename=None):
         """保存遊戲狀態。"""
@@ -206,13 +255,15 @@ class RenjuGame:
         # game_io 負責重新加載開局庫
         move_log_loaded, types_loaded, msg = game_io.load_game_data(fname)
         if move_log_loaded is not None:
+            self.ai.cancel_pondering()
             # Re-initialize the current game object with loaded data
-            self.__init__(black_player_type=types_loaded[BLACK], white_player_type=types_loaded[WHITE])
+            self.__init__(black_player_type=types_loaded[BLACK], white_player_type=types_loaded[WHITE], ruleset=self.ruleset)
             self.move_log = move_log_loaded
             self.game_state = GameState.ANALYSIS
             # Reset analysis state via handler
             self.analysis_handler.analysis_step = -1
             self.analysis_handler._reconstruct_board(self.analysis_handler.analysis_step)
+            self.position_version = next(_position_versions)
             # Update status message based on loaded mode
             p1 = "(H)" if self.player_types[BLACK] == "human" else "(AI)"
             p2 = "(H)" if self.player_types[WHITE] == "human" else "(AI)"
@@ -228,10 +279,16 @@ class RenjuGame:
             return False
 
     # --- Analysis Navigation ---
+    @property
+    def analysis_step(self):
+        """分析模式目前顯示到的手數索引 (-1 為空棋盤)，供著法列表高亮使用。"""
+        return self.analysis_handler.analysis_step
+
     def analysis_navigate(self, direction):
         """委託給 AnalysisHandler 處理。"""
         if self.game_state == GameState.ANALYSIS:
             self.analysis_handler.navigate(direction)  # navigate 內部會更新 status_message
+            self.position_version = next(_position_versions)
 
     # --- Getters for Drawing ---
     def get_board_to_draw(self):
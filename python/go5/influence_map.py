@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+影響力地圖 (InfluenceMap)。
+
+以 NumPy 陣列分別記錄黑方與白方的影響力：每個點為其 radius 範圍 (預設 3x3) 內該玩家的棋子數，
+combined 為雙方相加。落子 (place) 或提子 (remove) 只需要對以該點為中心的
+(2 * radius + 1) 方塊做一次切片加減，不必重算整個棋盤。
+
+display 是畫面與棋型過濾使用的地圖：空點為 combined，已佔據的點為 OCCUPIED_INFLUENCE，
+與原本 AnalysisHandler.influence_map 的內容相同 (radius 為 1 時)。
+"""
+import numpy as np
+from config import EMPTY, BLACK, WHITE
+
+OCCUPIED_INFLUENCE = 9 # 被佔據的點在 display 中的值
+
+
+class InfluenceMap:
+    """每位玩家一張影響力陣列加上合計陣列，以落子點周圍的方塊增量更新。"""
+
+    def __init__(self, size, radius=1):
+        self.size = size
+        self.radius = radius
+        self.player_maps = {
+            BLACK: np.zeros((size, size), dtype=np.int16),
+            WHITE: np.zeros((size, size), dtype=np.int16),
+        }
+        self.combined = np.zeros((size, size), dtype=np.int16)
+        self.occupied = np.zeros((size, size), dtype=bool)
+        self.display = np.zeros((size, size), dtype=np.int16)
+
+    @classmethod
+    def from_board(cls, board, radius=1):
+        """由現有棋盤建立影響力地圖。"""
+        influence = cls(len(board), radius)
+        for r, row in enumerate(board):
+            for c, cell in enumerate(row):
+                if cell != EMPTY:
+                    influence.place(cell, r, c)
+        return influence
+
+    def _block(self, r, c):
+        k = self.radius
+        return slice(max(0, r - k), min(self.size, r + k + 1)), slice(max(0, c - k), min(self.size, c + k + 1))
+
+    def _apply(self, player, r, c, delta):
+        block = self._block(r, c)
+        self.player_maps[player][block] += delta
+        self.combined[block] += delta
+        self.occupied[r, c] = delta > 0
+        self.display[block] = np.where(self.occupied[block], OCCUPIED_INFLUENCE, self.combined[block])
+
+    def place(self, player, r, c):
+        """player 在 (r, c) 落子。"""
+        self._apply(player, r, c, 1)
+
+    def remove(self, player, r, c):
+        """移除 (r, c) 上 player 的棋子 (悔棋或分析模式倒退)。"""
+        self._apply(player, r, c, -1)
+
+    def copy(self):
+        """獨立的複本 (分析模式的關鍵幀使用)。"""
+        other = InfluenceMap.__new__(InfluenceMap)
+        other.size, other.radius = self.size, self.radius
+        other.player_maps = {player: values.copy() for player, values in self.player_maps.items()}
+        other.combined = self.combined.copy()
+        other.occupied = self.occupied.copy()
+        other.display = self.display.copy()
+        return other
+
+    def influence(self, r, c, player=None):
+        """(r, c) 的影響力：player 為 None 時為雙方合計。"""
+        values = self.combined if player is None else self.player_maps[player]
+        return int(values[r, c])
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+多行程平行 alpha-beta 搜尋 (Lazy SMP)。
+
+workers 個行程 (本行程 + workers - 1 個輔助行程) 同時以 search.AlphaBetaSearch
+搜尋同一個局面，共用一個放在 multiprocessing.shared_memory 的置換表：
+  - 輔助行程的迭代加深錯開深度 (奇數號從第 2 層開始)，先搜完的結果經由置換表
+    讓其他行程剪枝更多、著法排序更好；
+  - 置換表的項目以 key ^ data 驗證，不加鎖：同時寫入造成的不完整項目只會查不到；
+  - 共用記憶體最後一個位元組是停止旗標：主行程搜尋結束 (時間到或證明勝負)，或任一行程
+    完成 max_depth 時設定，其他行程在下一次檢查時停止；
+  - 回傳所有行程中完成深度最深的結果 (深度相同時以主行程為準)，節點數為所有行程合計。
+
+輔助行程放在共用的行程池中 (程式結束時關閉)，每個行程保留自己的搜尋器並連接到同一個置換表。
+行程池以 spawn 啟動，由 start_pool() 在主執行緒建立 (AIPlayer 建立時)。
+多核心上的加速尚未驗證：單核心上 4 個行程搜尋到第 4 層反而比 1 個行程慢 (約 0.07s -> 0.22s)。
+
+    python lazy_smp.py --workers 1 2 4 --depth 6
+"""
+import argparse
+import atexit
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import profiling
+import ruleset as ruleset_module
+import search
+import transposition
+
+# 預設行程數：環境變數 GO5_SEARCH_THREADS (預設 1，即不平行)
+ENV_VAR = "GO5_SEARCH_THREADS"
+DEFAULT_WORKERS = max(1, int(os.environ.get(ENV_VAR, "1") or 1))
+POOL_CONTEXT = "spawn" # 遊戲行程有背景執行緒 (分析、背景思考)，不能 fork
+HELPER_TIME_FACTOR = 2 # 輔助行程的時間上限 (倍數)；通常在此之前就被主行程停止
+
+
+class SharedSearch(search.AlphaBetaSearch):
+    """連接共用置換表與停止旗標的搜尋器 (主行程與輔助行程都使用)。"""
+
+    def __init__(self, ruleset, tt, stop, main=True):
+        super().__init__(ruleset, tt=tt)
+        self.stop = stop # 長度 1 的 uint8 陣列 (共用記憶體)
+        self.main = main
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes & 255 == 0 and (self.stop[0] or time.perf_counter() > self.deadline):
+            raise search.SearchTimeout()
+
+    def search(self, board, player, move_count, time_limit=search.DEFAULT_TIME_LIMIT, max_depth=None,
+               candidates=None, min_depth=1):
+        result = super().search(board, player, move_count, time_limit, max_depth, candidates, min_depth)
+        target = self.max_depth if max_depth is None else max_depth
+        if self.main or result.depth >= target or abs(result.score) >= search.WIN_SCORE - search.MAX_PLY:
+            self.stop[0] = 1
+        return result
+
+
+class LazySMPSearch:
+    """Lazy SMP 搜尋器；介面與 AlphaBetaSearch.search 相同。"""
+
+    def __init__(self, ruleset, workers=DEFAULT_WORKERS, tt_mb=transposition.DEFAULT_SIZE_MB):
+        self.ruleset = ruleset
+        self.workers = max(1, workers)
+        table_bytes = transposition.buffer_size(tt_mb)
+        self.shm = shared_memory.SharedMemory(create=True, size=table_bytes + 1)
+        self.tt_mb = tt_mb
+        self.tt = transposition.TranspositionTable(tt_mb, buffer=self.shm.buf)
+        self.tt.clear()
+        self.stop = np.ndarray((1,), dtype=np.uint8, buffer=self.shm.buf, offset=table_bytes)
+        self.searcher = SharedSearch(ruleset, self.tt, self.stop)
+        _open_searches.append(self)
+
+    @profiling.timed("lazy_smp_search")
+    def search(self, board, player, move_count, time_limit=search.DEFAULT_TIME_LIMIT, max_depth=None,
+               candidates=None):
+        """同時在 workers 個行程搜尋，回傳最深的 search.SearchResult。"""
+        start = time.perf_counter()
+        self.stop[0] = 0
+        pending = None
+        if self.workers > 1:
+            # 主行程的 new_search() 會把世代加一，輔助行程以相同的起點得到相同的世代
+            jobs = [(self.ruleset.name, self.ruleset.board_size, self.shm.name, self.tt_mb, self.tt.generation,
+                     board, player, move_count, time_limit * HELPER_TIME_FACTOR, max_depth, 1 + i % 2)
+                    for i in range(1, self.workers)]
+            pending = _get_pool(self.workers - 1).map_async(_helper_search, jobs)
+        results = [self.searcher.search(board, player, move_count, time_limit, max_depth, candidates)]
+        if pending is not None:
+            results.extend(pending.get())
+        best = max(results, key=lambda result: result.depth) # 深度相同時為第一個 (主行程)
+        return search.SearchResult(best.move, best.score, best.depth, sum(result.nodes for result in results),
+                                   time.perf_counter() - start, results[0].tt_hit_rate, self.tt.fill(),
+                                   self.workers)
+
+    def predicted_moves(self, board, player, limit=3, candidates=None):
+        return self.searcher.predicted_moves(board, player, limit, candidates)
+
+    def cancel(self):
+        """停止進行中的搜尋 (主行程停止後會設定停止旗標，輔助行程跟著停止)。"""
+        self.searcher.cancel()
+
+    def close(self):
+        """釋放共用記憶體 (之後不能再搜尋)。"""
+        if self.shm is None:
+            return
+        self.searcher = self.tt = self.stop = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+        if self in _open_searches:
+            _open_searches.remove(self)
+
+
+_open_searches = []
+_shared_searches = {}
+
+
+def get_search(ruleset, workers=DEFAULT_WORKERS, tt_mb=transposition.DEFAULT_SIZE_MB):
+    """每個 (規則, 行程數, 置換表大小) 共用的 LazySMPSearch (重新開始的棋局沿用，不重複配置共用記憶體)。"""
+    key = (ruleset.name, ruleset.board_size, workers, tt_mb)
+    searcher = _shared_searches.get(key)
+    if searcher is None or searcher.shm is None:
+        searcher = _shared_searches[key] = LazySMPSearch(ruleset, workers, tt_mb)
+    return searcher
+
+
+# --- 輔助行程 ---
+_pool = None
+_pool_size = 0
+_helpers = {} # 輔助行程內：(規則, 大小) -> (共用記憶體名稱, SharedMemory, SharedSearch)
+
+
+def start_pool(size):
+    """
+    建立 size 個輔助行程的行程池；已有相同大小的行程池時不做任何事。
+    必須在主執行緒呼叫 (AIPlayer 建立時)，背景思考的執行緒只使用已建立的行程池。
+    行程以 spawn 啟動，不會複製遊戲行程中其他執行緒持有的鎖。
+    """
+    global _pool, _pool_size
+    if _pool is not None and _pool_size == size:
+        return _pool
+    if threading.current_thread() is not threading.main_thread():
+        raise RuntimeError("lazy_smp.start_pool() must be called from the main thread")
+    if _pool is None:
+        atexit.register(shutdown)
+    else:
+        _pool.terminate()
+    _pool = multiprocessing.get_context(POOL_CONTEXT).Pool(size)
+    _pool_size = size
+    return _pool
+
+
+def _get_pool(size):
+    return _pool if _pool is not None and _pool_size == size else start_pool(size)
+
+
+def shutdown():
+    """關閉行程池並釋放所有共用記憶體 (程式結束時自動呼叫)。"""
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+    for searcher in list(_open_searches):
+        searcher.close()
+
+
+def _attach(rule_name, board_size, shm_name, tt_mb):
+    """輔助行程內連接到主行程的置換表 (名稱改變時重新連接)。"""
+    key = (rule_name, board_size)
+    entry = _helpers.get(key)
+    if entry is not None and entry[0] == shm_name:
+        return entry[2]
+    if entry is not None:
+        entry[2].tt = entry[2].stop = None
+        entry[1].close()
+    shm = shared_memory.SharedMemory(name=shm_name) # 由主行程負責釋放 (close + unlink)
+    tt = transposition.TranspositionTable(tt_mb, buffer=shm.buf)
+    stop = np.ndarray((1,), dtype=np.uint8, buffer=shm.buf, offset=transposition.buffer_size(tt_mb))
+    searcher = SharedSearch(ruleset_module.get_ruleset(rule_name, board_size), tt, stop, main=False)
+    _helpers[key] = (shm_name, shm, searcher)
+    return searcher
+
+
+def _helper_search(job):
+    (rule_name, board_size, shm_name, tt_mb, generation,
+     board, player, move_count, time_limit, max_depth, min_depth) = job
+    searcher = _attach(rule_name, board_size, shm_name, tt_mb)
+    searcher.tt.generation = generation
+    return searcher.search(board, player, move_count, time_limit, max_depth, min_depth=min_depth)
+
+
+def main(argv=None):
+    import benchmark
+    parser = argparse.ArgumentParser(description="Lazy SMP：各行程數搜尋到指定深度所需的時間")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="要比較的行程數")
+    parser.add_argument("--depth", type=int, default=6, help="搜尋深度")
+    parser.add_argument("--positions", type=int, default=4, help="使用的局面數")
+    parser.add_argument("--moves", type=int, default=16, help="每個局面的手數 (隨機棋譜的前幾手)")
+    parser.add_argument("--tt-mb", type=float, default=transposition.DEFAULT_SIZE_MB)
+    args = parser.parse_args(argv)
+
+    corpus = [moves[:args.moves] for name, moves in benchmark.build_corpus() if name.startswith("random")]
+    games = [benchmark.replay(moves) for moves in corpus[:args.positions]]
+    baseline = None
+    for workers in args.workers:
+        elapsed = nodes = 0
+        if workers > 1:
+            start_pool(workers - 1) # 行程啟動的時間不計入
+        for game in games:
+            searcher = LazySMPSearch(game.ruleset, workers, args.tt_mb)
+            result = searcher.search(game.board, game.current_player, game.move_count, time_limit=3600,
+                                     max_depth=args.depth)
+            searcher.close()
+            elapsed += result.elapsed
+            nodes += result.nodes
+        baseline = baseline or elapsed
+        print(f"{workers} workers: depth {args.depth} in {elapsed / len(games):.2f}s per position "
+              f"(speedup {baseline / elapsed:.2f}x, {nodes / elapsed:.0f} nodes/sec)")
+    shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
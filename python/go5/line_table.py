@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+連珠棋型查表 (line-window lookup table)。
+
+以落子點為中心、沿一個方向取 11 格視窗，每格以 base-4 編碼：
+    0 = 空點, 1 = 己方, 2 = 對方, 3 = 邊界
+中心格固定為 (模擬落下的) 己方棋子，因此只編碼其餘 10 格，共 4**10 種代碼。
+
+表格的每個代碼對應一個位元旗標 (五連、恰好四、活四、活三、跳活三、長連)，
+全部以中心棋子為準。表格只生成一次並快取到磁碟 (CACHE_FILE)，
+之後禁手與棋型判斷只需要每個點四次查表。
+"""
+import os
+import itertools
+import tempfile
+from config import BOARD_SIZE, EMPTY, BLACK, WHITE, DIRECTIONS
+import bitboard
+
+# --- 視窗格子編碼 ---
+CELL_EMPTY = 0
+CELL_OWN = 1
+CELL_OPP = 2
+CELL_EDGE = 3
+
+WINDOW_RADIUS = bitboard.WINDOW_RADIUS
+TABLE_SIZE = 4 ** (2 * WINDOW_RADIUS)
+# 代碼中第 i 個 base-4 位數對應的偏移 (跳過中心 0)
+_OFFSETS = tuple(i for i in range(-WINDOW_RADIUS, WINDOW_RADIUS + 1) if i != 0)
+
+# --- 旗標 (以中心棋子為準) ---
+FIVE = 0x01           # 恰好五連
+OVERLINE = 0x02       # 六連或以上 (長連)
+EXACT_FOUR = 0x04     # 恰好四 (連四、跳四，即 rules 的四四判斷)
+STRAIGHT_FOUR = 0x08  # 活四 _XXXX_
+OPEN_THREE = 0x10     # 連活三 _XXX_
+JUMP_THREE = 0x20     # 跳活三 _X_XX_ / _XX_X_
+ANY_THREE = OPEN_THREE | JUMP_THREE
+
+_FLAG_PATTERNS = (
+    (FIVE, bitboard.FIVE_EXACT),
+    (OVERLINE, bitboard.OVERLINE),
+    (EXACT_FOUR, bitboard.EXACT_FOUR),
+    (STRAIGHT_FOUR, bitboard.compile_patterns(("_XXXX_",))),
+    (OPEN_THREE, bitboard.compile_patterns(("_XXX_",))),
+    (JUMP_THREE, bitboard.compile_patterns(("_X_XX_", "_XX_X_"))),
+)
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "line_table.bin")
+_CACHE_MAGIC = b"RJLT1\n"  # 模式或編碼變更時請更新版本號，舊快取會自動重建
+
+_table = None
+
+
+# --- 表格生成 ---
+
+def classify_window(cells):
+    """cells: 11 格 (含中心) 的編碼序列，回傳中心棋子的旗標。"""
+    own = 0
+    empty = 0
+    for i, cell in enumerate(cells):
+        if cell == CELL_OWN:
+            own |= 1 << (i + 1)
+        elif cell == CELL_EMPTY:
+            empty |= 1 << (i + 1)
+    p = WINDOW_RADIUS + 1
+    flags = 0
+    for flag, patterns in _FLAG_PATTERNS:
+        if bitboard.match_line(own, empty, p, patterns):
+            flags |= flag
+    return flags
+
+
+def _side_options(edge_first):
+    """一側 5 格所有可能的內容；邊界只能從視窗外側連續出現。"""
+    options = []
+    for edges in range(WINDOW_RADIUS + 1):
+        for rest in itertools.product((CELL_EMPTY, CELL_OWN, CELL_OPP), repeat=WINDOW_RADIUS - edges):
+            if edge_first:
+                options.append((CELL_EDGE,) * edges + rest)
+            else:
+                options.append(rest + (CELL_EDGE,) * edges)
+    return options
+
+
+def _side_code(cells, first_digit):
+    return sum(cell << (2 * (first_digit + i)) for i, cell in enumerate(cells))
+
+
+def iter_windows():
+    """列舉實際可能出現的視窗，產生 (代碼, 11 格的編碼序列)。"""
+    lefts = [(side, _side_code(side, 0)) for side in _side_options(edge_first=True)]
+    rights = [(side, _side_code(side, WINDOW_RADIUS)) for side in _side_options(edge_first=False)]
+    for left, left_code in lefts:
+        for right, right_code in rights:
+            yield left_code | right_code, left + (CELL_OWN,) + right
+
+
+def build_table():
+    """生成完整表格 (只列舉實際可能出現的視窗，其餘代碼為 0)。"""
+    table = bytearray(TABLE_SIZE)
+    for code, cells in iter_windows():
+        table[code] = classify_window(cells)
+    return bytes(table)
+
+
+def _load_cache(path, magic=_CACHE_MAGIC):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:len(magic)] != magic or len(data) != len(magic) + TABLE_SIZE:
+        return None
+    return data[len(magic):]
+
+
+def _save_cache(path, table, magic=_CACHE_MAGIC):
+    # 每個寫入者使用自己的暫存檔，同時生成表格的行程不會互相覆蓋，os.replace 保證讀到完整的檔案
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)),
+                                         prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                         delete=False) as f:
+            tmp_path = f.name
+            f.write(magic)
+            f.write(table)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warn: Could not write line table cache {path}: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_table():
+    """回傳查表 (第一次呼叫時從磁碟載入，或生成後寫入快取)。"""
+    global _table
+    if _table is None:
+        table = _load_cache(CACHE_FILE)
+        if table is None:
+            table = build_table()
+            _save_cache(CACHE_FILE, table)
+        _table = table
+    return _table
+
+
+# --- 代碼計算 ---
+
+# _SPREAD[x]: 把 10 位元遮罩 x 的每個位元放到對應的 base-4 位數 (值為 1)
+_SPREAD = [sum(1 << (2 * i) for i in range(2 * WINDOW_RADIUS) if x >> i & 1)
+           for x in range(1 << (2 * WINDOW_RADIUS))]
+_LOW_MASK = (1 << WINDOW_RADIUS) - 1
+
+
+def _drop_center(window):
+    """11 位元視窗去掉中心位元，變成 10 位元。"""
+    return (window & _LOW_MASK) | ((window >> (WINDOW_RADIUS + 1)) << WINDOW_RADIUS)
+
+
+def window_code(board, r, c, player, direction):
+    """list 棋盤上 (r, c) 沿 direction 的視窗代碼 (以 player 為己方，棋盤大小取自 board)。"""
+    dr, dc = direction
+    size = len(board)
+    code = 0
+    shift = 0
+    for i in _OFFSETS:
+        cr, cc = r + i * dr, c + i * dc
+        if 0 <= cr < size and 0 <= cc < size:
+            cell = board[cr][cc]
+            if cell == player:
+                code |= CELL_OWN << shift
+            elif cell != EMPTY:
+                code |= CELL_OPP << shift
+        else:
+            code |= CELL_EDGE << shift
+        shift += 2
+    return code
+
+
+def window_codes(board, r, c, player):
+    """回傳 (r, c) 四個方向 (DIRECTIONS 順序) 的視窗代碼，board 可為 list 或 BitBoard。"""
+    if isinstance(board, bitboard.BitBoard):
+        return [_SPREAD[_drop_center(own)] + 2 * _SPREAD[_drop_center(opp)] + 3 * _SPREAD[_drop_center(edge)]
+                for own, opp, edge in board.windows_at(r, c, player)]
+    return [window_code(board, r, c, player, direction) for direction in DIRECTIONS]
+
+
+def decode(code):
+    """把代碼還原成 11 格 (含中心己方棋子) 的編碼序列。"""
+    cells = [(code >> (2 * i)) & 3 for i in range(2 * WINDOW_RADIUS)]
+    return tuple(cells[:WINDOW_RADIUS]) + (CELL_OWN,) + tuple(cells[WINDOW_RADIUS:])
+
+
+def line_flags(board, r, c, player):
+    """回傳在 (r, c) 放下 player 後四個方向 (DIRECTIONS 順序) 的旗標。"""
+    table = get_table()
+    return [table[code] for code in window_codes(board, r, c, player)]
+
+
+# --- 規則判斷 ---
+
+def _is_win(flags, player):
+    mask = FIVE if player == BLACK else FIVE | OVERLINE
+    return any(f & mask for f in flags)
+
+
+def _forbidden_reason(flags):
+    """判斷順序與 rules.check_forbidden_move_at 相同：長連 -> 四四 -> 三三。"""
+    if any(f & OVERLINE for f in flags):
+        return "長連"
+    if sum(1 for f in flags if f & EXACT_FOUR) >= 2:
+        return "四四"
+    if sum(1 for f in flags if f & ANY_THREE) >= 2:
+        return "三三"
+    return None
+
+
+def check_win_condition_at(r, c, player, board):
+    """查表版本的 check_win_condition_at。"""
+    return _is_win(line_flags(board, r, c, player), player)
+
+
+def check_forbidden_move_at(r, c, board):
+    """查表版本的 check_forbidden_move_at (黑棋)。"""
+    return _forbidden_reason(line_flags(board, r, c, BLACK))
+
+
+def black_forbidden_reason(board, r, c):
+    """
+    黑棋在空點 (r, c) 落子是否為禁手：回傳 "長連" / "四四" / "三三" 或 None。
+    與 is_legal_move 相同，能形成五連的點不算禁手。
+    """
+    flags = line_flags(board, r, c, BLACK)
+    if _is_win(flags, BLACK):
+        return None
+    return _forbidden_reason(flags)
+
+
+def is_legal_move(r, c, player, move_count, board):
+    """
+    查表版本的 is_legal_move，回傳值與 rules.is_legal_move 相同。
+    棋盤大小取自 board (BitBoard 固定為 BOARD_SIZE)。
+    """
+    is_bitboard = isinstance(board, bitboard.BitBoard)
+    size = BOARD_SIZE if is_bitboard else len(board)
+    if not (0 <= r < size and 0 <= c < size):
+        return False, "Occupied or Off-board"
+    cell = board.get(r, c) if is_bitboard else board[r][c]
+    if cell != EMPTY:
+        return False, "Occupied or Off-board"
+
+    if player == BLACK and move_count == 0:
+        center = size // 2
+        if (r, c) != (center, center):
+            return False, f"First move must be Tengen ({center},{center})"
+        return True, None
+
+    flags = line_flags(board, r, c, player)
+    if _is_win(flags, player):
+        return True, None
+    if player == BLACK:
+        reason = _forbidden_reason(flags)
+        if reason:
+            return False, reason
+    return True, None
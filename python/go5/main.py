@@ -3,10 +3,24 @@ import pygame
 import sys
 import os
 import time
+import logging
+import profiling
+# 效能計數 (python main.py --profile 或 GO5_PROFILE=1)，必須在匯入遊戲模組之前開啟
+if "--profile" in sys.argv[1:]:
+    profiling.enable()
+# alpha-beta 搜尋的行程數 (python main.py --threads 4 或 GO5_SEARCH_THREADS=4)，同樣須在匯入 ai_player 之前設定
+if "--threads" in sys.argv[1:-1]:
+    os.environ["GO5_SEARCH_THREADS"] = sys.argv[sys.argv.index("--threads") + 1]
+# 棋盤大小 (python main.py --size 19 或 GO5_BOARD_SIZE=19)，畫面版面在匯入 config 時計算
+if "--size" in sys.argv[1:-1]:
+    os.environ["GO5_BOARD_SIZE"] = sys.argv[sys.argv.index("--size") + 1]
 from config import (WIDTH, HEIGHT, GameState, BLACK, WHITE, BOARD_COLOR,
-                    BOARD_AREA_WIDTH, BOARD_AREA_HEIGHT)
+                    BOARD_AREA_WIDTH, BOARD_AREA_HEIGHT, BOARD_SIZE)
+import ruleset as ruleset_module
 from utils import get_board_coords
 from game_logic import RenjuGame
+from ai_player import is_ai_type
+from analysis_worker import AnalysisWorker
 from drawing import (draw_grid, draw_stones, draw_hover_preview,
                      draw_info_panel, draw_analysis_panel, draw_live_threes, 
                      draw_jump_live_threes, draw_live_fours, draw_jump_fours, draw_live_fives, draw_winning_move_highlight, draw_influence_map) # 导入 draw_influence_map
@@ -52,21 +66,41 @@ def select_game_mode():
     print("  1. 人類 vs 人類 (Human vs Human)")
     print("  2. 人類 (黑) vs AI (白)")
     print("  3. AI (黑) vs 人類 (白)")
-    print("  4. AI vs AI"); print("="*30)
+    print("  4. AI vs AI")
+    print("  5. 人類 (黑) vs AI 搜尋 (白)")
+    print("  6. AI 搜尋 (黑) vs 人類 (白)")
+    print("  7. 人類 (黑) vs AI MCTS (白)")
+    print("  8. AI MCTS (黑) vs 人類 (白)"); print("="*30)
     while True:
         try:
-            choice = input("請輸入選項 (1-4): "); choice_num = int(choice)
-            if 1 <= choice_num <= 4:
+            choice = input("請輸入選項 (1-8): "); choice_num = int(choice)
+            if 1 <= choice_num <= 8:
                 if choice_num == 1: return "human", "human", "人類 vs 人類"
                 elif choice_num == 2: return "human", "ai", "人類 (黑) vs AI (白)"
                 elif choice_num == 3: return "ai", "human", "AI (黑) vs 人類 (白)"
                 elif choice_num == 4: return "ai", "ai", "AI vs AI"
+                elif choice_num == 5: return "human", "ai-ab", "人類 (黑) vs AI 搜尋 (白)"
+                elif choice_num == 6: return "ai-ab", "human", "AI 搜尋 (黑) vs 人類 (白)"
+                elif choice_num == 7: return "human", "ai-mcts", "人類 (黑) vs AI MCTS (白)"
+                elif choice_num == 8: return "ai-mcts", "human", "AI MCTS (黑) vs 人類 (白)"
             else: print("無效選項，請重新輸入。")
-        except ValueError: print("輸入無效，請輸入數字 1-4。")
+        except ValueError: print("輸入無效，請輸入數字 1-8。")
         except EOFError: print("\n輸入終止。使用默認模式 (Human vs AI)。"); return "human", "ai", "人類 (黑) vs AI (白)"
 
 
+def select_ruleset():
+    """棋規變體 (python main.py --rules freestyle)，預設為連珠；棋盤大小為 BOARD_SIZE。"""
+    if "--rules" in sys.argv[1:-1]:
+        name = sys.argv[sys.argv.index("--rules") + 1]
+        if name not in ruleset_module.VARIANTS:
+            print(f"未知的棋規 {name}，可用: {', '.join(sorted(ruleset_module.VARIANTS))}")
+            sys.exit(2)
+        return ruleset_module.get_ruleset(name, BOARD_SIZE)
+    return ruleset_module.default_ruleset()
+
+
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     player1_type, player2_type, mode_description = select_game_mode()
     print(f"\n已選擇模式: {mode_description}\n正在啟動遊戲...")
     pygame.init()
@@ -82,10 +116,13 @@ def main():
         if not font_small or not font_medium or not influence_font: raise RuntimeError("無法載入必要的字體。")
     except Exception as e: print(f"嚴重錯誤：字體載入失敗 - {e}"); pygame.quit(); sys.exit()
 
-    game = RenjuGame(black_player_type=player1_type, white_player_type=player2_type)
+    game = RenjuGame(black_player_type=player1_type, white_player_type=player2_type, ruleset=select_ruleset())
     info_panel_buttons = {}; analysis_nav_buttons = {}
     running = True; hover_coords = None; ai_move_delay_timer = None
     should_show_thinking_overlay = False
+    # 棋型覆蓋層在背景計算，畫面只畫最近一次完成的結果
+    analysis_worker = AnalysisWorker(game.ruleset); analysis_worker.start()
+    submitted_version = None
 
     while running:
         mouse_pos = pygame.mouse.get_pos()
@@ -125,6 +162,10 @@ def main():
                     elif game.game_state==GameState.PLAYING and event.key==pygame.K_p: game.pause_game()
                     elif game.game_state==GameState.PAUSED and event.key==pygame.K_p: game.resume_game()
                     elif event.key == pygame.K_r: game.restart_game()
+                    elif event.key == pygame.K_u: # 悔棋：退回到人類的回合
+                        if game.undo_move() and is_ai_type(game.player_types[game.current_player]) \
+                                and game.player_types[WHITE if game.current_player == BLACK else BLACK] == "human":
+                            game.undo_move()
         except Exception as e: print(f"事件處理期間出錯: {e}")
 
         # --- Game Logic Update (Timer) ---
@@ -133,9 +174,9 @@ def main():
 
         # --- AI Action Logic ---
         is_ai_turn_now = (game.game_state == GameState.PLAYING and
-                          game.player_types[game.current_player] == "ai" and
+                          is_ai_type(game.player_types[game.current_player]) and
                           not game.ai_thinking) # Check game's thinking flag
-        ai_vs_ai_mode = (player1_type == "ai" and player2_type == "ai")
+        ai_vs_ai_mode = (is_ai_type(player1_type) and is_ai_type(player2_type))
         allow_ai_move_now = False
 
         if is_ai_turn_now:
@@ -185,12 +226,23 @@ def main():
              finally:
                  game.ai_thinking = False # <-- 重置標誌在 finally 中
         
-        influence_map = game.analysis_handler.influence_map # 获取 influence_map
-        live_three_positions = game.get_live_three_positions(game.current_player)
-        jump_live_three_positions = game.get_jump_live_three_positions(game.current_player)
-        live_four_positions = game.get_live_four_positions(game.current_player)
-        jump_four_positions = game.get_jump_four_positions(game.current_player)
-        five_positions = game.get_five_positions(game.current_player)
+        # --- 背景分析：局面改變時提交，不等待結果 ---
+        if game.position_version != submitted_version:
+            analysis_moves = game.analysis_step + 1 if game.game_state == GameState.ANALYSIS else game.move_count
+            analysis_worker.submit(game.get_board_to_draw(), analysis_moves, game.position_version)
+            submitted_version = game.position_version
+        analysis_result = analysis_worker.latest()
+        if analysis_result is not None:
+            influence_map = analysis_result.influence_map
+            live_three_positions = analysis_result.get_positions("live_three")
+            jump_live_three_positions = analysis_result.get_positions("jump_live_three")
+            live_four_positions = analysis_result.get_positions("four")
+            jump_four_positions = analysis_result.get_positions("jump_four")
+            five_positions = analysis_result.get_positions("five")
+        else:
+            influence_map = game.analysis_handler.influence_map
+            live_three_positions = jump_live_three_positions = live_four_positions = {}
+            jump_four_positions = five_positions = {}
 
         # 提取當前玩家的致勝點列表
         # winning_moves_list = five_positions.get(current_player, [])
@@ -226,6 +278,8 @@ def main():
 
         clock.tick(30)
 
+    game.ai.cancel_pondering()
+    analysis_worker.stop()
     pygame.quit(); sys.exit()
 
 if __name__ == "__main__": main()
\ No newline at end of file
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+蒙地卡羅樹搜尋 (MCTSSearch)。
+
+UCT：從根節點依 UCB1 選擇子節點，展開一個新著法，從新節點模擬 (rollout) 到終局或
+ROLLOUT_DEPTH 手，再把結果 (勝 1 / 和 0.5 / 負 0) 沿路徑傳回。
+局面狀態、威脅判斷與著法產生沿用 search.AlphaBetaSearch (點旗標隨落子增量更新)：
+  - 樹中節點的子著法 = AlphaBetaSearch 的威脅排序著法 (最多 branch_limit 手)；
+  - 模擬時：有成五點就獲勝，對手有成五點就擋 (擋不住為負)，否則從點分數
+    (雙方在該點的四 / 活三等旗標) 最高的 ROLLOUT_WIDTH 手中隨機選一手；
+  - 模擬到 ROLLOUT_DEPTH 手仍未分勝負時，以局面評估換算成 0..1 的分數。
+
+樹在兩次搜尋之間保留：下一次搜尋時，若新局面是樹中某個節點 (只多了樹中走過的棋子)，
+就從那個節點繼續，之前的模擬次數不會浪費。
+
+workers > 1 時以行程池做根平行化 (root parallelisation)，預設為 1 (須明確開啟)：每個行程保有自己的樹，
+時間切成 SLICE_TIME 秒的時間片，每個時間片結束時合併各行程根節點子著法的訪問次數與勝場，
+最後選擇合併後訪問次數最多的著法。行程池以 spawn 啟動，由 start_pool() 在主執行緒建立
+(AIPlayer 建立時)。多核心上的加速尚未驗證；單核心上多個行程只會互相搶時間。
+
+    python mcts.py --workers 1 2 4 --time 2
+"""
+import argparse
+import atexit
+import heapq
+import math
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+
+from config import EMPTY, BLACK, WHITE
+import profiling
+import ruleset as ruleset_module
+import search
+
+DEFAULT_TIME_LIMIT = 1.0 # 秒
+BRANCH_LIMIT = 10 # 每個節點最多展開的著法
+EXPLORATION = 0.7 # UCB1 的探索常數
+ROLLOUT_DEPTH = 30 # 模擬的最大手數
+ROLLOUT_WIDTH = 3 # 模擬時從點分數最高的幾手中隨機選擇
+ROLLOUT_SCALE = 300.0 # 未分勝負時，局面評估換算成勝率的尺度
+SLICE_TIME = 0.25 # 根平行化的時間片 (秒)
+# 預設行程數：環境變數 GO5_MCTS_WORKERS (預設 1，即在本行程搜尋；根平行化須明確開啟)
+ENV_VAR = "GO5_MCTS_WORKERS"
+DEFAULT_WORKERS = max(1, int(os.environ.get(ENV_VAR, "1") or 1))
+POOL_CONTEXT = "spawn" # 遊戲行程有背景執行緒 (分析、背景思考)，不能 fork
+
+
+class Node:
+    """樹節點；wins 以 player (下 move 的一方) 為準。"""
+    __slots__ = ("move", "player", "children", "untried", "visits", "wins", "terminal")
+
+    def __init__(self, move, player):
+        self.move = move         # 點編號 (根節點為 None)
+        self.player = player     # 下 move 的一方 (根節點為輪到的一方的對手)
+        self.children = []
+        self.untried = None      # 尚未展開的著法 (第一次經過時產生)
+        self.visits = 0
+        self.wins = 0.0
+        self.terminal = None     # 已知的結果 (以 player 為準)，未知為 None
+
+
+class MCTSResult:
+    """一次 MCTS 搜尋的結果。"""
+
+    def __init__(self, move, win_rate, playouts, elapsed, workers=1, reused=0, visits=0):
+        self.move = move         # (row, col)，沒有著法時為 None
+        self.win_rate = win_rate # 搜尋方選擇 move 的勝率估計
+        self.playouts = playouts # 這次搜尋的模擬次數 (所有行程合計)
+        self.elapsed = elapsed   # 秒
+        self.workers = workers
+        self.reused = reused     # 沿用的樹在搜尋開始時已有的模擬次數
+        self.visits = visits     # move 的訪問次數
+
+    @property
+    def playouts_per_sec(self):
+        return self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return (f"MCTS: {self.playouts} playouts, {self.playouts_per_sec:.0f} playouts/s "
+                f"({self.workers} workers), win rate {self.win_rate:.0%}, reused {self.reused}")
+
+    def __repr__(self):
+        return (f"MCTSResult(move={self.move}, win_rate={self.win_rate:.3f}, playouts={self.playouts}, "
+                f"pps={self.playouts_per_sec:.0f}, workers={self.workers})")
+
+
+class MCTSSearch(search.AlphaBetaSearch):
+    """對單一 RuleSet 的 MCTS 搜尋器 (保留樹以便下一次搜尋沿用)。"""
+
+    def __init__(self, ruleset, workers=1, branch_limit=BRANCH_LIMIT, exploration=EXPLORATION, seed=None):
+        super().__init__(ruleset, branch_limit=branch_limit)
+        self.workers = max(1, workers)
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.root = None
+        self.root_board = None # 樹根的棋盤 (判斷新局面能否沿用樹)
+        self.merged_stats = {} # 根平行化：最近一次搜尋合併的根節點統計
+        self.deadline = 0.0
+
+    # --- 對外介面 ---
+    @profiling.timed("mcts_search")
+    def search(self, board, player, move_count, time_limit=DEFAULT_TIME_LIMIT, candidates=None):
+        """
+        搜尋 player 在 board 上的最佳著法，回傳 MCTSResult。
+        candidates: 與 board 一致的 CandidateSet，搜尋使用其複本；None 時由 board 建立。
+        """
+        start = time.perf_counter()
+        self._setup(board, player, candidates)
+        if move_count == 0 or not self.cands:
+            center = (self.ruleset.center, self.ruleset.center)
+            move = center if board[center[0]][center[1]] == EMPTY else None
+            return MCTSResult(move, 0.5, 0, 0.0, self.workers)
+        own_win, _ = self._threats(player)
+        if own_win is not None:
+            return MCTSResult(self.points[own_win], 1.0, 0, time.perf_counter() - start, self.workers)
+        self.deadline = start + time_limit
+        if self.workers > 1:
+            return self._parallel_search(board, player, move_count)
+
+        self.root = self._reuse_root(board, player) or Node(None, WHITE if player == BLACK else BLACK)
+        self.root_board = [row[:] for row in board]
+        reused = self.root.visits
+        playouts = self.run(self.deadline)
+        return self._result(self.root_stats(), self.proven_move(), playouts, start, reused=reused)
+
+    def _result(self, stats, proven, playouts, start, workers=1, reused=0):
+        """依根節點子著法的統計選擇著法 (已證明獲勝的著法優先，其次是訪問次數最多的著法)。"""
+        elapsed = time.perf_counter() - start
+        if proven is not None:
+            visits = stats.get(proven, (0, 0.0))[0]
+            return MCTSResult(self.points[proven], 1.0, playouts, elapsed, workers, reused, visits)
+        if not stats:
+            return MCTSResult(None, 0.0, playouts, elapsed, workers, reused)
+        best = max(stats, key=lambda q: stats[q][0])
+        visits, wins = stats[best]
+        return MCTSResult(self.points[best], wins / visits if visits else 0.5, playouts, elapsed,
+                          workers, reused, visits)
+
+    def run(self, deadline):
+        """在 deadline 之前 (或 cancel() 之前) 重複模擬 (樹根須已設定)，回傳模擬次數。"""
+        self.deadline = deadline
+        playouts = 0
+        root = self.root
+        while True:
+            self._playout()
+            playouts += 1
+            if root.terminal is not None or time.perf_counter() > self.deadline:
+                break
+        return playouts
+
+    def proven_move(self):
+        """根節點已證明獲勝的子著法 (點編號)，沒有時回傳 None。"""
+        if self.root is None:
+            return None
+        for child in self.root.children:
+            if child.terminal == 1.0:
+                return child.move
+        return None
+
+    def root_stats(self):
+        """根節點每個子著法的 (訪問次數, 勝場)，以點編號為鍵 (根平行化時為最近一次搜尋合併的結果)。"""
+        if self.workers > 1:
+            return self.merged_stats
+        if self.root is None:
+            return {}
+        return {child.move: (child.visits, child.wins) for child in self.root.children}
+
+    # --- 樹 ---
+    def _reuse_root(self, board, player):
+        """新局面在樹中對應的節點 (只多了樹中走過的棋子)，沒有時回傳 None。"""
+        if self.root is None or len(self.root_board) != len(board):
+            return None
+        added = {}
+        for i, (r, c) in enumerate(self.points):
+            old, new = self.root_board[r][c], board[r][c]
+            if old != new:
+                if old != EMPTY:
+                    return None # 悔棋或另一盤棋
+                added[i] = new
+        node = self.root
+        while added:
+            for child in node.children:
+                if added.get(child.move) == child.player:
+                    break
+            else:
+                return None
+            del added[child.move]
+            node = child
+        return node if node.player != player else None
+
+    def _expand_moves(self, node):
+        """第一次經過 node 時產生子著法 (或判定終局)。"""
+        side = self.side
+        own_win, opp_wins = self._threats(side)
+        if own_win is not None:
+            node.terminal = 0.0 # 輪到的一方下一手成五
+            node.untried = []
+            return
+        moves = self._ordered_moves(side, opp_wins)
+        if not moves:
+            node.terminal = 1.0 if opp_wins else 0.5 # 擋不住 (黑方的擋點是禁手) 或沒有空點
+        node.untried = moves
+
+    def _select(self, node):
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        best, best_value = None, -1.0
+        for child in node.children:
+            value = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def _playout(self):
+        """一次選擇、展開、模擬與回傳。"""
+        node = self.root
+        path = [node]
+        made = []
+        while node.terminal is None:
+            if node.untried is None:
+                self._expand_moves(node)
+                if node.terminal is not None:
+                    break
+            if node.untried:
+                m = node.untried.pop(0)
+                player = self.side
+                self._make(m, player)
+                made.append((m, player))
+                node = Node(m, player)
+                path[-1].children.append(node)
+                path.append(node)
+                break
+            node = self._select(node)
+            self._make(node.move, node.player)
+            made.append((node.move, node.player))
+            path.append(node)
+
+        value = node.terminal if node.terminal is not None else self._rollout(node.player)
+        for n in reversed(path):
+            n.visits += 1
+            n.wins += value
+            value = 1.0 - value
+        for m, player in reversed(made):
+            self._unmake(m, player)
+        # 子節點全部已知時，父節點的結果也已知 (輪到的一方選最好的)
+        if len(path) > 1 and path[-1].terminal is not None:
+            parent = path[-2]
+            if path[-1].terminal == 1.0:
+                parent.terminal = 0.0
+            elif not parent.untried and all(child.terminal is not None for child in parent.children):
+                parent.terminal = 1.0 - max(child.terminal for child in parent.children)
+
+    def _rollout(self, player):
+        """從目前局面模擬，回傳以 player (剛下完的一方) 為準的結果。"""
+        side = self.side
+        made = []
+        rng = self.rng
+        result = None
+        for _ in range(ROLLOUT_DEPTH):
+            own_win, opp_wins = self._threats(side)
+            if own_win is not None:
+                result = 1.0 if side == player else 0.0
+                break
+            if opp_wins:
+                moves = [q for q in opp_wins if self._legal(q, side)][:1]
+                if not moves:
+                    result = 0.0 if side == player else 1.0
+                    break
+            else:
+                moves = self._rollout_moves(side)
+                if not moves:
+                    result = 0.5
+                    break
+            m = rng.choice(moves)
+            self._make(m, side)
+            made.append((m, side))
+            side = self.side
+        if result is None:
+            result = 1.0 / (1.0 + math.exp(-self._evaluate(player) / ROLLOUT_SCALE))
+        for m, mover in reversed(made):
+            self._unmake(m, mover)
+        return result
+
+    def _rollout_moves(self, player):
+        """點分數最高的 ROLLOUT_WIDTH 個合法點。"""
+        opponent = WHITE if player == BLACK else BLACK
+        own_scores, opp_scores = self.point_scores[player], self.point_scores[opponent]
+        near = self.candidates.near
+        best = heapq.nlargest(ROLLOUT_WIDTH * 2, self.cands, key=lambda q: (own_scores[q] + opp_scores[q], near[q]))
+        return [q for q in best if self._legal(q, player)][:ROLLOUT_WIDTH]
+
+    # --- 根平行化 ---
+    def _parallel_search(self, board, player, move_count):
+        start = time.perf_counter()
+        pool = _get_pool(self.workers)
+        merged = {}
+        playouts = 0
+        proven = None
+        while proven is None:
+            slice_time = min(SLICE_TIME, max(0.0, self.deadline - time.perf_counter()))
+            jobs = [(self.ruleset.name, self.size, board, player, move_count, slice_time,
+                     self.rng.randrange(1 << 30)) for _ in range(self.workers)]
+            for stats, count, worker_proven in pool.map(_worker_slice, jobs):
+                playouts += count
+                proven = proven if worker_proven is None else worker_proven
+                for q, (visits, wins) in stats.items():
+                    total = merged.get(q, (0, 0.0))
+                    merged[q] = (total[0] + visits, total[1] + wins)
+            if time.perf_counter() >= self.deadline - SLICE_TIME / 10:
+                break
+        self.merged_stats = merged
+        return self._result(merged, proven, playouts, start, self.workers)
+
+
+# --- 行程池 (每個行程保有自己的搜尋器與樹) ---
+_pool = None
+_pool_workers = 0
+_worker_searchers = {}
+
+
+def start_pool(workers):
+    """
+    建立共用的行程池 (所有 MCTSSearch 共用，程式結束時關閉)；已有相同大小的行程池時不做任何事。
+    必須在主執行緒呼叫 (AIPlayer 建立時)，背景思考的執行緒只使用已建立的行程池。
+    行程以 spawn 啟動，不會複製遊戲行程中其他執行緒持有的鎖。
+    """
+    global _pool, _pool_workers
+    if _pool is not None and _pool_workers == workers:
+        return _pool
+    if threading.current_thread() is not threading.main_thread():
+        raise RuntimeError("mcts.start_pool() must be called from the main thread")
+    if _pool is None:
+        atexit.register(shutdown_pool)
+    else:
+        _pool.terminate()
+    _pool = multiprocessing.get_context(POOL_CONTEXT).Pool(workers)
+    _pool_workers = workers
+    return _pool
+
+
+def _get_pool(workers):
+    return _pool if _pool is not None and _pool_workers == workers else start_pool(workers)
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+
+
+def _worker_slice(job):
+    """
+    行程池工作：搜尋一個時間片，回傳 (這個時間片內根節點子著法增加的 (訪問次數, 勝場),
+    模擬次數, 已證明獲勝的著法或 None)。
+    """
+    rule_name, board_size, board, player, move_count, time_limit, seed = job
+    key = (rule_name, board_size)
+    searcher = _worker_searchers.get(key)
+    if searcher is None:
+        searcher = _worker_searchers[key] = MCTSSearch(ruleset_module.get_ruleset(rule_name, board_size))
+    searcher.rng.seed(seed)
+    node = searcher._reuse_root(board, player)
+    before = {child.move: (child.visits, child.wins) for child in node.children} if node is not None else {}
+    result = searcher.search(board, player, move_count, time_limit)
+    delta = {}
+    for q, (visits, wins) in searcher.root_stats().items():
+        old = before.get(q, (0, 0.0))
+        if visits > old[0]:
+            delta[q] = (visits - old[0], wins - old[1])
+    return delta, result.playouts, searcher.proven_move()
+
+
+def main(argv=None):
+    import benchmark
+    parser = argparse.ArgumentParser(description="MCTS 的每秒模擬次數 (依行程數)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="要比較的行程數")
+    parser.add_argument("--time", type=float, default=2.0, help="每個局面的搜尋時間 (秒)")
+    parser.add_argument("--positions", type=int, default=3, help="使用的局面數")
+    parser.add_argument("--moves", type=int, default=16, help="每個局面的手數 (隨機棋譜的前幾手)")
+    args = parser.parse_args(argv)
+
+    corpus = [moves[:args.moves] for name, moves in benchmark.build_corpus() if name.startswith("random")]
+    corpus = corpus[:args.positions]
+    games = [benchmark.replay(moves) for moves in corpus]
+    for workers in args.workers:
+        playouts = elapsed = 0
+        if workers > 1:
+            start_pool(workers) # 行程啟動的時間不計入
+        for game in games:
+            searcher = MCTSSearch(game.ruleset, workers=workers)
+            result = searcher.search(game.board, game.current_player, game.move_count, args.time)
+            playouts += result.playouts
+            elapsed += result.elapsed
+        print(f"{workers} workers: {playouts} playouts in {elapsed:.2f}s ({playouts / elapsed:.0f} playouts/sec)")
+    shutdown_pool()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
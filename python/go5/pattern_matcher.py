@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+分析用的整數編碼棋型比對器 (取代 AnalysisHandler._get_stones_string 的字串比對)。
+
+一條線以落子點為中心取 11 格，編碼與 line_table 相同 (base-4：0 空點、1 己方、2 對方、3 界外，
+中心格固定為己方)，因此一次走訪就能同時得到黑方與白方的代碼 (line_codes)。
+classify(code) 回傳該視窗內所有棋型的位元組合：所有可能出現的視窗預先分類成
+與 line_table 相同的平坦表格 (每個代碼一個位元組，4**10 = 1 MB)，只生成一次並快取到磁碟
+(CACHE_FILE)，之後每條線只需要一次查表，記憶體用量固定 (每個行程一份 1 MB)。
+
+棋型與原本 check_..._direction 的字串比對相同：模式可以出現在視窗中的任何位置，
+活三 / 跳活三只看前後 3 格 (7 格)，其餘看前後 5 格；舊字串把界外寫成 '0'，
+因此舊棋型中的 '0' 同時接受空點與界外。眠三是新增的棋型，界外視為阻擋。
+"""
+import os
+
+from config import EMPTY, BLACK, WHITE
+import line_table
+
+# --- 棋型位元 ---
+LIVE_THREE = 0x01
+JUMP_LIVE_THREE = 0x02
+FOUR = 0x04
+JUMP_FOUR = 0x08
+FIVE = 0x10
+SLEEP_THREE = 0x20
+
+PATTERN_BITS = {
+    "live_three": LIVE_THREE,
+    "jump_live_three": JUMP_LIVE_THREE,
+    "four": FOUR,
+    "jump_four": JUMP_FOUR,
+    "five": FIVE,
+    "sleep_three": SLEEP_THREE,
+}
+
+# --- 模式定義 ---
+# 'X' = 己方, '0' = 空點或界外 (舊字串比對的 '0'), '_' = 空點, 'B' = 對方或界外
+_CHAR_CELLS = {
+    'X': (line_table.CELL_OWN,),
+    '0': (line_table.CELL_EMPTY, line_table.CELL_EDGE),
+    '_': (line_table.CELL_EMPTY,),
+    'B': (line_table.CELL_OPP, line_table.CELL_EDGE),
+}
+
+# (位元, 前後半徑, 模式)
+_PATTERNS = (
+    (FIVE, 5, ("XXXXX",)),
+    (FOUR, 5, ("XXXX0", "0XXXX")),
+    (JUMP_FOUR, 5, ("X0XXX", "XXX0X", "XX0XX")),
+    (LIVE_THREE, 3, ("0XXX0",)),
+    (JUMP_LIVE_THREE, 3, ("0X0XX0", "0XX0X0")),
+    (SLEEP_THREE, 5, ("BXXX__", "__XXXB", "BXX_X_", "_X_XXB", "BX_XX_", "_XX_XB",
+                      "X__XX", "XX__X", "X_X_X", "B_XXX_B")),
+)
+
+
+def _compile(radius, patterns):
+    """把模式轉成 (起點清單, 每格可接受的編碼集合)。"""
+    center = line_table.WINDOW_RADIUS
+    lo, hi = center - radius, center + radius + 1
+    compiled = []
+    for pattern in patterns:
+        cells = tuple(frozenset(_CHAR_CELLS[ch]) for ch in pattern)
+        compiled.append((range(lo, hi - len(pattern) + 1), cells))
+    return tuple(compiled)
+
+
+_COMPILED = tuple((bit, _compile(radius, patterns)) for bit, radius, patterns in _PATTERNS)
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pattern_table.bin")
+_CACHE_MAGIC = b"RJPM1\n"  # 模式變更時請更新版本號，舊快取會自動重建
+
+_table = None
+
+
+def _matches(cells, compiled_patterns):
+    for starts, pattern in compiled_patterns:
+        for s in starts:
+            for i, allowed in enumerate(pattern):
+                if cells[s + i] not in allowed:
+                    break
+            else:
+                return True
+    return False
+
+
+def classify_cells(cells):
+    """11 格 (含中心己方棋子) 的編碼序列中出現的棋型位元。"""
+    bits = 0
+    for bit, compiled_patterns in _COMPILED:
+        if _matches(cells, compiled_patterns):
+            bits |= bit
+    return bits
+
+
+def build_table():
+    """生成完整表格 (只列舉實際可能出現的視窗，其餘代碼為 0)。"""
+    table = bytearray(line_table.TABLE_SIZE)
+    for code, cells in line_table.iter_windows():
+        table[code] = classify_cells(cells)
+    return bytes(table)
+
+
+def get_table():
+    """回傳棋型表 (第一次呼叫時從磁碟載入，或生成後寫入快取)。"""
+    global _table
+    if _table is None:
+        table = line_table._load_cache(CACHE_FILE, _CACHE_MAGIC)
+        if table is None:
+            table = build_table()
+            line_table._save_cache(CACHE_FILE, table, _CACHE_MAGIC)
+        _table = table
+    return _table
+
+
+def classify(code):
+    """回傳 line_table 視窗代碼 (中心為己方棋子) 中出現的棋型位元。"""
+    return (_table or get_table())[code]
+
+
+def line_codes(board, window):
+    """
+    走訪一次 RuleSet 的預先計算視窗 (edge_code, cells)，
+    回傳 (黑方代碼, 白方代碼)，兩者都以中心為己方棋子。
+    """
+    edge_code, cells = window
+    code_black = code_white = edge_code
+    for r, c, shift in cells:
+        cell = board[r][c]
+        if cell == EMPTY:
+            continue
+        if cell == BLACK:
+            code_black |= line_table.CELL_OWN << shift
+            code_white |= line_table.CELL_OPP << shift
+        else:
+            code_black |= line_table.CELL_OPP << shift
+            code_white |= line_table.CELL_OWN << shift
+    return code_black, code_white
+
+
+def classify_line(board, window):
+    """回傳 {BLACK: 位元, WHITE: 位元}：兩位玩家分別在中心落子後該線上的棋型。"""
+    code_black, code_white = line_codes(board, window)
+    return {BLACK: classify(code_black), WHITE: classify(code_white)}
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+背景思考 (Ponderer)：人類思考時 AI 不閒著。
+
+AI 下完一手、輪到人類時，在背景執行緒中搜尋人類最可能的應手：
+  - alpha-beta (AlphaBetaSearch / LazySMPSearch)：依 predicted_moves 取人類最可能的幾手
+    (置換表中的最佳著法在前)，逐一搜尋「人類下了這一手之後」AI 的最佳著法，每一手的時間
+    與 AI 正式思考時相同。完成的結果保存起來，置換表也會留下這些局面的結果；
+  - MCTS：直接從輪到人類的局面搜尋，人類下子後 MCTSSearch 會沿用對應的子樹。
+人類下子後 finish(board)：
+  - 命中 (人類下在預想的應手)：alpha-beta 已完成的結果直接使用，不必再搜尋；
+    MCTS 沿用子樹，並以子樹分到的思考時間縮短這一手的搜尋；
+  - 未命中：停止背景搜尋 (搜尋器的 cancel()，在下一次檢查時間時結束)。
+PonderStats 記錄命中率與節省的時間。
+
+搜尋器同一時間只能有一個搜尋：AIPlayer 在正式搜尋前一定先呼叫 finish() 或 cancel()。
+"""
+import threading
+import time
+
+from config import BLACK, WHITE
+
+PONDER_REPLIES = 3 # alpha-beta 預想的人類應手數
+MAX_TREE_TIME = 60.0 # MCTS 背景思考的時間上限 (秒)，避免樹無限制變大
+JOIN_INTERVAL = 0.05 # 停止時等待執行緒結束的間隔 (秒)
+
+
+class PonderStats:
+    """背景思考的統計 (一盤棋)。"""
+
+    def __init__(self):
+        self.ponders = 0      # 人類下子時背景思考中 (或已完成) 的次數
+        self.hits = 0         # 人類下在預想的應手
+        self.instant = 0      # 命中且直接使用背景搜尋的結果
+        self.time_saved = 0.0 # 命中時省下的思考時間 (秒)
+        self.ponder_time = 0.0 # 背景思考的總時間 (秒)
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.ponders if self.ponders else 0.0
+
+    def summary(self):
+        return (f"Ponder: {self.hits}/{self.ponders} hits ({self.hit_rate:.0%}), {self.instant} instant, "
+                f"saved {self.time_saved:.1f}s of {self.ponder_time:.1f}s pondering")
+
+
+class Ponderer:
+    """在背景執行緒中為一個 AIPlayer 的搜尋器思考。"""
+
+    def __init__(self, replies=PONDER_REPLIES):
+        self.replies = replies
+        self.stats = PonderStats()
+        self._thread = None
+        self._stop = threading.Event()
+        self._searcher = None
+        self._board = None     # 開始思考時的棋盤 (輪到人類)
+        self._player = None    # 人類
+        self._tree = False
+        self._predicted = []   # alpha-beta：預想的人類應手 (依可能性排序)
+        self._results = {}     # alpha-beta：人類應手 -> 完成的 search.SearchResult
+        self._tree_result = None # MCTS：背景搜尋的 mcts.MCTSResult
+        self._time_limit = 0.0
+        self._start_time = self._end_time = 0.0
+
+    @property
+    def active(self):
+        return self._thread is not None
+
+    def start(self, searcher, board, ai_player, move_count, time_limit, candidates=None, tree=False):
+        """
+        AI (ai_player) 剛下完、輪到人類時開始背景思考 (棋盤與候選點會被複製)。
+        time_limit: 每個預想應手的搜尋時間 (alpha-beta)；tree=True 時為 MCTS 模式。
+        """
+        self.cancel()
+        self._searcher = searcher
+        self._board = [row[:] for row in board]
+        self._player = WHITE if ai_player == BLACK else BLACK
+        self._tree = tree
+        self._predicted = []
+        self._results = {}
+        self._tree_result = None
+        self._stop.clear()
+        self._time_limit = time_limit
+        self._start_time, self._end_time = time.perf_counter(), None
+        candidates = candidates.copy() if candidates is not None else None
+        self._thread = threading.Thread(target=self._run, name="Ponderer", daemon=True,
+                                        args=(searcher, self._board, ai_player, move_count, time_limit, candidates))
+        self._thread.start()
+
+    def _run(self, searcher, board, ai_player, move_count, time_limit, candidates):
+        try:
+            self._ponder(searcher, board, ai_player, move_count, time_limit, candidates)
+        finally:
+            self._end_time = time.perf_counter()
+
+    def _ponder(self, searcher, board, ai_player, move_count, time_limit, candidates):
+        human = self._player
+        if self._tree:
+            self._tree_result = searcher.search(board, human, move_count, MAX_TREE_TIME, candidates=candidates)
+            return
+        self._predicted = searcher.predicted_moves(board, human, self.replies, candidates)
+        for r, c in self._predicted:
+            if self._stop.is_set():
+                return
+            next_board = [row[:] for row in board]
+            next_board[r][c] = human
+            next_candidates = None
+            if candidates is not None:
+                next_candidates = candidates.copy()
+                next_candidates.place(r, c)
+            result = searcher.search(next_board, ai_player, move_count + 1, time_limit, candidates=next_candidates)
+            if self._stop.is_set():
+                return # 中途停止的結果不完整 (置換表中的部分仍然有用)
+            self._results[(r, c)] = result
+
+    def _join(self):
+        """停止背景搜尋並等待執行緒結束，回傳實際思考的秒數。"""
+        if self._thread is None:
+            return 0.0
+        self._stop.set()
+        while self._thread.is_alive():
+            self._searcher.cancel() # 搜尋可能剛開始 (重設了期限)，重複取消直到結束
+            self._thread.join(JOIN_INTERVAL)
+        self._thread = None
+        return self._end_time - self._start_time
+
+    def cancel(self):
+        """停止背景思考並丟棄結果 (悔棋、重新開始等)。"""
+        self._join()
+        self._results = {}
+        self._searcher = None
+
+    def finish(self, board):
+        """
+        人類已下子 (board 為目前的棋盤)：停止背景思考並更新統計。
+        回傳 (命中且已完成的 search.SearchResult 或 None, 節省的秒數)。
+        """
+        if self._thread is None and self._searcher is None:
+            return None, 0.0
+        elapsed = self._join()
+        searcher, self._searcher = self._searcher, None
+        added = [(r, c) for r, row in enumerate(board) for c, cell in enumerate(row)
+                 if cell != self._board[r][c]]
+        if len(added) != 1 or board[added[0][0]][added[0][1]] != self._player:
+            return None, 0.0 # 不是人類的一手 (例如載入棋譜)
+        move = added[0]
+        stats = self.stats
+        stats.ponders += 1
+        stats.ponder_time += elapsed
+        result, saved = None, 0.0
+        if self._tree:
+            # 沒有模擬 (例如人類有成五點) 時樹沒有更新
+            root_stats = searcher.root_stats() if self._tree_result and self._tree_result.playouts else {}
+            visits = root_stats.get(move[0] * searcher.size + move[1], (0, 0.0))[0]
+            total = sum(v for v, _ in root_stats.values())
+            if visits:
+                stats.hits += 1
+                saved = min(self._time_limit, elapsed * visits / total)
+        elif move in self._predicted:
+            stats.hits += 1
+            result = self._results.get(move)
+            if result is not None:
+                stats.instant += 1
+                saved = min(self._time_limit, result.elapsed)
+        stats.time_saved += saved
+        self._results = {}
+        return result, saved
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+以局面雜湊為鍵的 LRU 快取 (PositionCache)。
+
+AnalysisHandler 以 (Zobrist 雜湊, 輪到誰下) 為鍵，保存一個局面完整的棋型與禁手結果。
+分析模式來回瀏覽、重新開局或 AI 對 AI 重複出現的局面只需要一次查表。
+容量有上限，超過時移除最久未使用的項目；hits / misses 記錄命中情況。
+"""
+from collections import OrderedDict
+
+DEFAULT_CAPACITY = 4096
+
+
+class PositionCache:
+    """容量有上限的 LRU 快取。"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """回傳 key 的值並標記為最近使用，不存在時為 None。"""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        """{'size', 'capacity', 'hits', 'misses', 'hit_rate'}"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_shared = {}
+
+
+def shared_cache(*key):
+    """依 key (例如棋規名稱、棋盤大小) 回傳共用的 PositionCache，重新開局的遊戲會重複使用。"""
+    if key not in _shared:
+        _shared[key] = PositionCache()
+    return _shared[key]
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+熱點路徑的計數器與計時器 (預設關閉)。
+
+以環境變數 GO5_PROFILE=1 (或 main.py --profile) 開啟：
+  - @timed(name)：計時函式的呼叫次數、總時間與最長時間；
+  - count(name)：單純的計數器 (例如棋盤複製)，呼叫端以 `if profiling.ENABLED:` 包住。
+關閉時 timed 直接回傳原函式，count 不會被呼叫，因此沒有任何額外的函式呼叫或格式化成本。
+timed 在「裝飾時」決定是否包裝，所以 enable() 必須在匯入被計時的模組之前呼叫
+(環境變數在本模組匯入時就會讀取)。
+
+開啟後會在程式結束時把 report() 印到 stderr，分析面板也會顯示 summary_lines()。
+"""
+import atexit
+import functools
+import os
+import sys
+import time
+
+ENV_VAR = "GO5_PROFILE"
+ENABLED = os.environ.get(ENV_VAR, "") not in ("", "0")
+
+_counters = {}  # name -> 次數
+_timers = {}    # name -> [呼叫次數, 總秒數, 最長秒數]
+_registered = False
+
+
+def enable():
+    """開啟計數 (須在匯入 ruleset / analysis / ai_player 之前)，並在結束時印出報告。"""
+    global ENABLED, _registered
+    ENABLED = True
+    if not _registered:
+        atexit.register(report)
+        _registered = True
+
+
+def timed(name):
+    """計時裝飾器；未開啟時回傳原函式 (零成本)。"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                entry = _timers.get(name)
+                if entry is None:
+                    _timers[name] = [1, elapsed, elapsed]
+                else:
+                    entry[0] += 1
+                    entry[1] += elapsed
+                    if elapsed > entry[2]:
+                        entry[2] = elapsed
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """計數器加 n (呼叫端應先檢查 ENABLED)。"""
+    _counters[name] = _counters.get(name, 0) + n
+
+
+def reset():
+    _counters.clear()
+    _timers.clear()
+
+
+def snapshot():
+    """回傳 {"counters": {...}, "timers": {name: (calls, total, max)}} 的複本。"""
+    return {
+        "counters": dict(_counters),
+        "timers": {name: tuple(entry) for name, entry in _timers.items()},
+    }
+
+
+def summary_lines():
+    """報告的每一行 (依總時間排序的計時器，接著是計數器)。"""
+    lines = []
+    for name, (calls, total, longest) in sorted(_timers.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name}: {calls} calls, {total * 1000:.1f}ms total, "
+                     f"{total / calls * 1000:.3f}ms avg, {longest * 1000:.2f}ms max")
+    for name, value in sorted(_counters.items()):
+        lines.append(f"{name}: {value}")
+    return lines
+
+
+def report(file=None):
+    """把目前的計數印出 (file 預設為 stderr)。"""
+    file = sys.stderr if file is None else file
+    lines = summary_lines()
+    if not lines:
+        return
+    print("--- go5 profile ---", file=file)
+    for line in lines:
+        print("  " + line, file=file)
+
+
+if ENABLED:
+    enable()
@@ -1,19 +1,66 @@
 # -*- coding: utf-8 -*-
-import copy # 為了 temp_board，雖然這裡可能不需要深拷貝
+from contextlib import contextmanager
+import numpy as np
+import bitboard
+import line_table
+import strict_rules
+
+from config import BOARD_SIZE # 預設規則的棋盤大小 (GO5_BOARD_SIZE)
 
 # Assume these are defined elsewhere or replace with actual values/imports
-BOARD_SIZE = 15
 EMPTY = 0
 BLACK = 1
 WHITE = 2
 EDGE = -1
 DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)] # Horizontal, Vertical, Diag /, Diag \
 
+# 規則引擎後端: "table" 使用 line_table.py 的視窗查表 (每點四次查表)，
+# "bitboard" 使用 bitboard.py 的 shift-and-mask 判斷，
+# "list" 使用下方逐格走訪的原始實作 (傳入 bitboard.BitBoard 時改用位元版本)。
+BACKEND = "table"
+
+# 嚴格連珠規則: True 時禁手由 strict_rules.py 判斷 (三必須能成為真活四，且延伸點本身不是禁手)
+STRICT_RENJU = False
+
 # Assume is_on_board is defined (e.g., from utils.py)
 def is_on_board(r, c):
     """Checks if coordinates are within the board bounds."""
     return 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE
 
+# --- 落子 / 復原 (make / unmake) ---
+# 直接在棋盤上試下，取代每次 copy.deepcopy(board)。
+
+def place_stone(board, r, c, player):
+    """在 board 上放下 player 的棋子，回傳 undo_stone 需要的原值。"""
+    if isinstance(board, bitboard.BitBoard):
+        board.place(r, c, player)
+        return EMPTY
+    previous = board[r][c]
+    board[r][c] = player
+    return previous
+
+def undo_stone(board, r, c, player, previous=EMPTY):
+    """復原 place_stone 的落子。"""
+    if isinstance(board, bitboard.BitBoard):
+        board.remove(r, c, player)
+    else:
+        board[r][c] = previous
+
+@contextmanager
+def trial_move(board, r, c, player):
+    """
+    在 board (list 或 BitBoard) 上暫時落子，離開 with 區塊時一定復原，
+    即使區塊內發生例外也一樣。
+
+        with rules.trial_move(board, r, c, player):
+            ... 在同一個 board 上檢查 ...
+    """
+    previous = place_stone(board, r, c, player)
+    try:
+        yield board
+    finally:
+        undo_stone(board, r, c, player, previous)
+
 # --- Rule Checking Functions ---
 
 def count_line(r, c, player, board):
@@ -60,6 +107,10 @@ def count_line(r, c, player, board):
 def check_win_condition_at(r, c, player, board):
     """檢查在 (r, c) 落子是否為 'player' 帶來勝利。
        (保持原樣, 注意黑棋只能恰好5子)"""
+    if BACKEND == "table":
+        return line_table.check_win_condition_at(r, c, player, board)
+    if BACKEND == "bitboard" or isinstance(board, bitboard.BitBoard):
+        return bitboard.check_win_condition_at(r, c, player, board)
     lines_info = count_line(r, c, player, board)
     for direction, (count, _) in lines_info.items():
         # Standard rule: White wins with 5 or more, Black wins *only* with exactly 5
@@ -284,7 +335,16 @@ def is_legal_move(r, c, player, move_count, board):
     # print(f"rules is_legal_move({r},{c})")
     """
     綜合檢查落子是否合法 (邊界, 佔用, 天元規則, 禁手)。
+    依 BACKEND 選擇查表、位元引擎或逐格走訪的實作，三者結果相同。
+    STRICT_RENJU 為 True 時改用嚴格規則。
     """
+    if STRICT_RENJU:
+        return strict_rules.is_legal_move(r, c, player, move_count, board)
+    if BACKEND == "table":
+        return line_table.is_legal_move(r, c, player, move_count, board)
+    if BACKEND == "bitboard" or isinstance(board, bitboard.BitBoard):
+        return bitboard.is_legal_move(r, c, player, move_count, board)
+
     # 1. 檢查邊界
     if not is_on_board(r, c):
         return False, "Occupied or Off-board" # 或者 "Off-board"
@@ -298,30 +358,24 @@ def is_legal_move(r, c, player, move_count, board):
     if player == BLACK and move_count == 0:
         center = BOARD_SIZE // 2
         if (r, c) != (center, center):
-            return False, f"First move must be Tengen ({center},{center})"
+            return False, tengen_text(BOARD_SIZE)
         # 如果是天元，不需要再檢查禁手和勝利，直接返回 True
         # （因為不可能在第一步形成禁手或勝利）
         # print(f"center pos")
         return True, None # 天元總是合法的 (如果界內且未佔用)
 
     # --- 只有在非第一步天元，且未佔用時，才需要模擬和檢查後續 ---
-    # --- Create a temporary board copy to simulate the move ---
-    # temp_board = [row[:] for row in board] # 淺拷貝通常足夠
-    # 或者使用深拷貝確保完全獨立（如果後續檢查會修改列表內部結構）
-    temp_board = copy.deepcopy(board)
-
+    # 4. Simulate the move on the live board (restored when the with-block exits)
+    with trial_move(board, r, c, player):
+        # 5. Check for win condition first (Winning move overrides forbidden moves)
+        if check_win_condition_at(r, c, player, board):
+            # print(f"win pos")
+            return True, None # Winning move is always legal
 
-    # 4. Simulate the move on the temporary board
-    temp_board[r][c] = player
+        # 6. If not a winning move, check for forbidden moves (only for Black)
+        forbidden_reason = check_forbidden_move_at(r, c, board) if player == BLACK else None
 
-    # 5. Check for win condition first (Winning move overrides forbidden moves)
-    if check_win_condition_at(r, c, player, temp_board):
-        # print(f"win pos")
-        return True, None # Winning move is always legal
-
-    # 6. If not a winning move, check for forbidden moves (only for Black)
     if player == BLACK:
-        forbidden_reason = check_forbidden_move_at(r, c, temp_board)
         if forbidden_reason:
             # print(f"{r},{c} is {forbidden_reason}")
             return False, forbidden_reason # Return the specific reason
@@ -333,6 +387,121 @@ def is_legal_move(r, c, player, move_count, board):
         # print(f"{r},{c} is legal")
         return True, None
 
+# --- 整盘合法點遮罩 (legal_move_mask) ---
+# 一次計算全部 225 個點的合法性，取代逐點呼叫 is_legal_move。
+
+# 禁手/不合法原因代碼 (int8)，與 is_legal_move 的原因字串對應
+REASON_LEGAL = 0
+REASON_OCCUPIED = 1
+REASON_TENGEN = 2
+REASON_OVERLINE = 3
+REASON_DOUBLE_FOUR = 4
+REASON_DOUBLE_THREE = 5
+
+
+def tengen_text(board_size):
+    """天元規則的原因字串 (天元座標依棋盤大小而定)。"""
+    center = board_size // 2
+    return f"First move must be Tengen ({center},{center})"
+
+
+REASON_TEXT = {
+    REASON_LEGAL: None,
+    REASON_OCCUPIED: "Occupied or Off-board",
+    REASON_TENGEN: tengen_text(BOARD_SIZE),
+    REASON_OVERLINE: "長連",
+    REASON_DOUBLE_FOUR: "四四",
+    REASON_DOUBLE_THREE: "三三",
+}
+
+
+def reason_text(code, board_size=BOARD_SIZE):
+    """把 REASON_* 代碼轉成 is_legal_move 的原因字串 (天元規則的座標依 board_size)。"""
+    if code == REASON_TENGEN:
+        return tengen_text(board_size)
+    return REASON_TEXT[code]
+
+
+_PAD = bitboard.WINDOW_RADIUS
+_SHIFT_INDEX = {} # 棋盤大小 -> 索引陣列
+
+def _shift_index(size=BOARD_SIZE):
+    """
+    回傳 (2*_PAD+1, 4, N, N) 的索引陣列 (N = size)：
+    index[k + _PAD, d, r, c] 是 (r, c) 沿 DIRECTIONS[d] 偏移 k 格後，在補邊棋盤上的平坦索引。
+    """
+    if size not in _SHIFT_INDEX:
+        width = size + 2 * _PAD
+        rows, cols = np.indices((size, size))
+        offsets = np.arange(-_PAD, _PAD + 1)
+        index = np.empty((len(offsets), len(DIRECTIONS), size, size), dtype=np.intp)
+        for d, (dr, dc) in enumerate(DIRECTIONS):
+            for i, k in enumerate(offsets):
+                index[i, d] = (rows + _PAD + k * dr) * width + (cols + _PAD + k * dc)
+        _SHIFT_INDEX[size] = index
+    return _SHIFT_INDEX[size]
+
+def _board_array(board):
+    """把 list / numpy / BitBoard 棋盤轉成 int8 陣列。"""
+    if isinstance(board, bitboard.BitBoard):
+        return np.array([[board.get(r, c) for c in range(BOARD_SIZE)] for r in range(BOARD_SIZE)], dtype=np.int8)
+    return np.asarray(board, dtype=np.int8)
+
+def _pattern_map(own_s, empty_s, compiled_patterns):
+    """
+    對每個空點 q (視為已落下己方棋子) 與每個方向，判斷是否形成包含 q 的任一模式。
+    以沿方向的滑動視窗和 (sliding-window sum) 計算己方棋子數，回傳 (4, N, N) 布林陣列。
+    """
+    found = np.zeros(own_s.shape[1:], dtype=bool)
+    for own_idx, empty_idx, not_own_idx in compiled_patterns:
+        for kq in own_idx:
+            stones = [j - kq + _PAD for j in own_idx if j != kq]
+            hit = own_s[stones].sum(axis=0, dtype=np.int8) == len(stones)
+            if empty_idx:
+                hit &= empty_s[[j - kq + _PAD for j in empty_idx]].all(axis=0)
+            if not_own_idx:
+                hit &= ~own_s[[j - kq + _PAD for j in not_own_idx]].any(axis=0)
+            found |= hit
+    return found
+
+def legal_move_mask(board, player, move_count, tengen=True):
+    """
+    回傳 (legal, reasons)：
+      legal   -- (N, N) bool 陣列，True 表示 player 可在該點落子
+      reasons -- (N, N) int8 陣列，REASON_* 代碼 (合法點為 REASON_LEGAL)
+    結果與逐點呼叫 is_legal_move 相同，但以整盤陣列運算完成。
+    N 取自 board 本身，因此也適用於其他大小的棋盤；tengen=False 時不檢查天元開局。
+    """
+    cells = _board_array(board)
+    empty = cells == EMPTY
+    reasons = np.where(empty, REASON_LEGAL, REASON_OCCUPIED).astype(np.int8)
+
+    if tengen and player == BLACK and move_count == 0:
+        center = cells.shape[0] // 2
+        not_center = np.ones_like(empty)
+        not_center[center, center] = False
+        reasons[empty & not_center] = REASON_TENGEN
+        return reasons == REASON_LEGAL, reasons
+    if player != BLACK:
+        return empty, reasons # White has no forbidden moves
+
+    # 補邊後取出所有偏移視圖: own_s / empty_s 形狀為 (11, 4, N, N)，邊界既非己方也非空點
+    index = _shift_index(cells.shape[0])
+    own_s = np.pad(cells == player, _PAD).ravel()[index]
+    empty_s = np.pad(empty, _PAD).ravel()[index]
+
+    win = _pattern_map(own_s, empty_s, bitboard.FIVE_EXACT).any(axis=0)
+    overline = _pattern_map(own_s, empty_s, bitboard.OVERLINE).any(axis=0)
+    fours = _pattern_map(own_s, empty_s, bitboard.EXACT_FOUR).sum(axis=0)
+    threes = _pattern_map(own_s, empty_s, bitboard.OPEN_THREE).sum(axis=0)
+
+    candidates = empty & ~win # 勝利點優先於禁手
+    # 依 check_forbidden_move_at 的優先順序填入：長連 > 四四 > 三三
+    reasons[candidates & (threes >= 2)] = REASON_DOUBLE_THREE
+    reasons[candidates & (fours >= 2)] = REASON_DOUBLE_FOUR
+    reasons[candidates & overline] = REASON_OVERLINE
+    return reasons == REASON_LEGAL, reasons
+
 # Example usage (conceptual)
 # board = [[EMPTY] * BOARD_SIZE for _ in range(BOARD_SIZE)]
 # move_count = 0
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+棋規變體 (RuleSet)。
+
+一個 RuleSet 描述棋盤大小、勝利條件與禁手規則：
+  - freestyle    : 自由五子棋，五連或以上即勝，無禁手
+  - standard     : 標準五子棋，雙方都必須恰好五連 (長連不算勝)，無禁手
+  - renju        : 連珠，黑方恰好五連且有三三 / 四四 / 長連禁手，第一手必須天元
+  - renju_strict : 連珠，禁手以 strict_rules 判斷
+每種變體都可搭配任意棋盤大小 (例如 other/gomokuOK.py 的 19x19)。
+
+建立 RuleSet 時一次預先計算：
+  - 線索引：每個點四個方向 11 格視窗內的棋盤座標，以及視窗超出棋盤部分的固定代碼
+  - 鄰點表：每個點的八個鄰點
+  - 棋型表：共用 line_table 的 4**10 查表，再依變體決定每位玩家的勝利旗標
+之後的勝負、禁手與合法性判斷只需要查表，不再做邊界檢查。
+RenjuGame、AnalysisHandler 與 AIPlayer 都接受 RuleSet (預設為 default_ruleset())。
+"""
+import numpy as np
+from config import EMPTY, BLACK, WHITE, DIRECTIONS
+import line_table
+import strict_rules
+import rules
+import profiling
+
+OCCUPIED_REASON = "Occupied or Off-board"
+
+# 禁手原因字串 -> rules.REASON_* 代碼
+_REASON_CODES = {
+    "長連": rules.REASON_OVERLINE,
+    "四四": rules.REASON_DOUBLE_FOUR,
+    "三三": rules.REASON_DOUBLE_THREE,
+}
+
+
+class RuleSet:
+    """單一棋規變體與其預先計算的表格。"""
+
+    def __init__(self, name, board_size=15, black_exact_five=True, white_exact_five=False,
+                 forbidden=True, strict=False, tengen=True):
+        self.name = name
+        self.board_size = board_size
+        self.center = board_size // 2
+        self.directions = tuple(DIRECTIONS)
+        self.forbidden = forbidden  # 黑方是否有禁手
+        self.strict = strict        # 禁手是否使用 strict_rules
+        self.tengen = tengen        # 黑方第一手是否必須下天元
+        self.tengen_reason = rules.tengen_text(board_size)
+
+        # --- 棋型表 ---
+        self.table = line_table.get_table()
+        exact = line_table.FIVE
+        five_or_more = line_table.FIVE | line_table.OVERLINE
+        self.win_masks = {
+            BLACK: exact if black_exact_five else five_or_more,
+            WHITE: exact if white_exact_five else five_or_more,
+        }
+
+        # --- 線索引與鄰點表 ---
+        size = board_size
+        self.windows = [[self._build_windows(r, c) for c in range(size)] for r in range(size)]
+        self.neighbors = [[tuple((r + dr, c + dc)
+                                 for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                                 if (dr or dc) and self.is_on_board(r + dr, c + dc))
+                           for c in range(size)] for r in range(size)]
+
+    def __repr__(self):
+        return f"RuleSet({self.name!r}, {self.board_size}x{self.board_size})"
+
+    def _build_windows(self, r, c):
+        """
+        (r, c) 四個方向的視窗：[(edge_code, ((row, col, shift), ...)), ...]
+        edge_code 是視窗中界外格的固定代碼，其餘格子在查詢時讀取棋盤。
+        """
+        windows = []
+        for dr, dc in self.directions:
+            edge_code = 0
+            cells = []
+            shift = 0
+            for i in line_table._OFFSETS:
+                cr, cc = r + i * dr, c + i * dc
+                if self.is_on_board(cr, cc):
+                    cells.append((cr, cc, shift))
+                else:
+                    edge_code |= line_table.CELL_EDGE << shift
+                shift += 2
+            windows.append((edge_code, tuple(cells)))
+        return tuple(windows)
+
+    # --- 棋盤 ---
+
+    def new_board(self):
+        return [[EMPTY for _ in range(self.board_size)] for _ in range(self.board_size)]
+
+    def is_on_board(self, r, c):
+        return 0 <= r < self.board_size and 0 <= c < self.board_size
+
+    # --- 查表 ---
+
+    @staticmethod
+    def _window_code(board, window, player):
+        edge_code, cells = window
+        code = edge_code
+        for cr, cc, shift in cells:
+            cell = board[cr][cc]
+            if cell == player:
+                code |= line_table.CELL_OWN << shift
+            elif cell != EMPTY:
+                code |= line_table.CELL_OPP << shift
+        return code
+
+    def window_codes(self, board, r, c, player):
+        """(r, c) 四個方向 (DIRECTIONS 順序) 的 line_table 視窗代碼，board 為 list 棋盤。"""
+        return [self._window_code(board, window, player) for window in self.windows[r][c]]
+
+    def line_flags(self, board, r, c, player):
+        """在 (r, c) 放下 player 後四個方向的 line_table 旗標。"""
+        table = self.table
+        return [table[code] for code in self.window_codes(board, r, c, player)]
+
+    # --- 規則判斷 ---
+
+    def _is_win(self, flags, player):
+        mask = self.win_masks[player]
+        return any(f & mask for f in flags)
+
+    def check_win_condition_at(self, r, c, player, board):
+        """(r, c) 的 player 棋子 (已落下或模擬落下) 是否構成此變體的勝利。"""
+        return self._is_win(self.line_flags(board, r, c, player), player)
+
+    def check_win_in_direction(self, r, c, player, board, direction):
+        """只看 direction 這一條線：(r, c) 的 player 棋子是否構成勝利。"""
+        window = self.windows[r][c][self.directions.index(direction)]
+        return bool(self.table[self._window_code(board, window, player)] & self.win_masks[player])
+
+    def forbidden_reason(self, board, r, c, visited=None):
+        """
+        黑方在空點 (r, c) 的禁手原因，非禁手 (含可勝利的點) 或無禁手變體為 None。
+        visited：嚴格連珠時收集遞迴讀取過的點 (見 strict_rules.forbidden_reason)。
+        """
+        if not self.forbidden:
+            return None
+        flags = self.line_flags(board, r, c, BLACK)
+        if self._is_win(flags, BLACK):
+            return None
+        if self.strict:
+            return strict_rules.forbidden_reason(board, r, c, window_codes=self.window_codes, visited=visited)
+        return line_table._forbidden_reason(flags)
+
+    @profiling.timed("legality")
+    def is_legal_move(self, r, c, player, move_count, board):
+        """回傳 (合法與否, 原因)，格式與 rules.is_legal_move 相同。"""
+        if not self.is_on_board(r, c) or board[r][c] != EMPTY:
+            return False, OCCUPIED_REASON
+
+        if self.tengen and player == BLACK and move_count == 0:
+            if (r, c) != (self.center, self.center):
+                return False, self.tengen_reason
+            return True, None
+
+        if player == BLACK:
+            reason = self.forbidden_reason(board, r, c)
+            if reason:
+                return False, reason
+        return True, None
+
+    @profiling.timed("legality_mask")
+    def legal_move_mask(self, board, player, move_count):
+        """整盤合法點遮罩，回傳 (legal, reasons)，代碼與 rules.legal_move_mask 相同。"""
+        if self.forbidden and not self.strict:
+            return rules.legal_move_mask(board, player, move_count, tengen=self.tengen)
+
+        cells = np.asarray(board, dtype=np.int8)
+        empty = cells == EMPTY
+        reasons = np.where(empty, rules.REASON_LEGAL, rules.REASON_OCCUPIED).astype(np.int8)
+        if self.tengen and player == BLACK and move_count == 0:
+            reasons[empty] = rules.REASON_TENGEN
+            if empty[self.center, self.center]:
+                reasons[self.center, self.center] = rules.REASON_LEGAL
+        elif self.forbidden and player == BLACK:
+            for r, c in zip(*np.nonzero(empty)):
+                reason = self.forbidden_reason(board, int(r), int(c))
+                if reason:
+                    reasons[r, c] = _REASON_CODES[reason]
+        return reasons == rules.REASON_LEGAL, reasons
+
+    def reason_text(self, code):
+        """把 REASON_* 代碼轉成 is_legal_move 的原因字串。"""
+        return rules.reason_text(code, self.board_size)
+
+
+# --- 變體 ---
+
+def freestyle(board_size=15):
+    return RuleSet("freestyle", board_size, black_exact_five=False, forbidden=False, tengen=False)
+
+
+def standard(board_size=15):
+    return RuleSet("standard", board_size, black_exact_five=True, white_exact_five=True,
+                   forbidden=False, tengen=False)
+
+
+def renju(board_size=15, strict=False):
+    return RuleSet("renju_strict" if strict else "renju", board_size, strict=strict)
+
+
+VARIANTS = {
+    "freestyle": freestyle,
+    "standard": standard,
+    "renju": renju,
+    "renju_strict": lambda board_size=15: renju(board_size, strict=True),
+}
+
+_instances = {}
+
+
+def get_ruleset(name="renju", board_size=15):
+    """回傳 (name, board_size) 的 RuleSet；同一變體只建立一次，表格由所有使用者共用。"""
+    key = (name, board_size)
+    if key not in _instances:
+        if name not in VARIANTS:
+            raise ValueError(f"Unknown rule variant: {name}")
+        _instances[key] = VARIANTS[name](board_size)
+    return _instances[key]
+
+
+def default_ruleset():
+    """預設棋規：BOARD_SIZE (預設 15x15) 連珠 (rules.STRICT_RENJU 為 True 時使用嚴格禁手)。"""
+    return get_ruleset("renju_strict" if rules.STRICT_RENJU else "renju", rules.BOARD_SIZE)
@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""
+Alpha-beta 搜尋 (AlphaBetaSearch)。
+
+negamax + alpha-beta，迭代加深 (每一層以上一層的最佳著法排在最前面)，
+第二層起使用以上一層分數為中心的 aspiration window，失敗時以完整視窗重搜。
+
+候選點取自 candidates.CandidateSet (離任一棋子 2 格以內的空點)，並以威脅產生：
+  - 自己有成五點：直接獲勝；
+  - 對手有成五點：只能擋 (黑方的擋點是禁手即輸)；
+  - 對手能形成活四 (活三的威脅)：只考慮擋活三的點 (對手的四 / 活四點) 與自己的衝四；
+  - 其他情況：依點分數 (雙方在該點的四 / 活三等旗標) 排序，最多 BRANCH_LIMIT 手。
+葉節點若對手有成五點會延伸一層 (只搜尋擋點)，避免在被迫應手前停下來評估。
+
+點旗標 (每個空點、每位玩家、每個方向的 line_table 旗標) 與局面評估 (每條線上
+5 格視窗的棋子數) 都隨落子增量更新：落子只會改變通過它的四條線。
+搜尋受時間限制；時間用完時回傳最後一個完整深度的最佳著法。
+
+提供 transposition.TranspositionTable 時，每個內部節點先查表 (深度足夠時直接使用界限)，
+並把表中的最佳著法排在最前面；搜尋結束後把結果存回表中。勝負分數以「距離目前節點的手數」保存。
+"""
+import time
+
+from config import EMPTY, BLACK, WHITE
+from candidates import CandidateSet
+import line_table
+import profiling
+import transposition
+import zobrist
+
+WIN_SCORE = 1000000 # 勝利分數 (減去手數，越快獲勝分數越高)
+INFINITY = WIN_SCORE + 1
+MAX_DEPTH = 12
+MAX_PLY = 32 # 含延伸的最大手數
+BRANCH_LIMIT = 12 # 每個節點最多展開的著法
+ASPIRATION_WINDOW = 300
+DEFAULT_TIME_LIMIT = 1.0 # 秒
+
+# --- 點分數：單一方向的旗標 ---
+SCORE_FIVE = 100000
+SCORE_OPEN_FOUR = 10000
+SCORE_FOUR = 1000
+SCORE_THREE = 300
+
+# --- 局面評估：5 格視窗中只有一方的 n 顆棋子 ---
+WINDOW_VALUES = (0, 1, 10, 80, 600, 0) # 五連由搜尋直接判斷
+LINE_CACHE_LIMIT = 200000
+
+FOUR_FLAGS = line_table.EXACT_FOUR | line_table.STRAIGHT_FOUR
+# 黑方只有在形成三、四或長連時才可能是禁手
+FORBIDDEN_FLAGS = line_table.ANY_THREE | FOUR_FLAGS | line_table.OVERLINE
+
+_line_cache = {}
+
+
+class SearchTimeout(Exception):
+    """時間用完 (只在搜尋內部使用)。"""
+
+
+class SearchResult:
+    """一次搜尋的結果。"""
+
+    def __init__(self, move, score, depth, nodes, elapsed, tt_hit_rate=0.0, tt_fill=0.0, workers=1):
+        self.move = move       # (row, col)，沒有著法時為 None
+        self.score = score     # 以搜尋方為準的分數
+        self.depth = depth     # 最後一個完整搜尋的深度
+        self.nodes = nodes
+        self.elapsed = elapsed # 秒
+        self.tt_hit_rate = tt_hit_rate # 這次搜尋的置換表命中率
+        self.tt_fill = tt_fill         # 搜尋結束時置換表的使用比例
+        self.workers = workers         # 平行搜尋的行程數 (nodes 為所有行程合計)
+
+    @property
+    def nodes_per_sec(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        workers = f" ({self.workers} workers)" if self.workers > 1 else ""
+        return (f"Search: depth {self.depth}, {self.nodes} nodes, {self.nodes_per_sec:.0f} nodes/s{workers}, "
+                f"score {self.score}, TT hit {self.tt_hit_rate:.0%} fill {self.tt_fill:.1%}")
+
+    def __repr__(self):
+        return (f"SearchResult(move={self.move}, score={self.score}, depth={self.depth}, "
+                f"nodes={self.nodes}, nps={self.nodes_per_sec:.0f})")
+
+
+def _line_value(cells):
+    """一條線 (棋子值的 tuple) 對黑方與白方的評估值。"""
+    value = _line_cache.get(cells)
+    if value is None:
+        b = w = 0
+        for i in range(len(cells) - 4):
+            window = cells[i:i + 5]
+            nb, nw = window.count(BLACK), window.count(WHITE)
+            if not nw:
+                b += WINDOW_VALUES[nb]
+            elif not nb:
+                w += WINDOW_VALUES[nw]
+        if len(_line_cache) >= LINE_CACHE_LIMIT:
+            _line_cache.clear()
+        value = _line_cache[cells] = (b, w)
+    return value
+
+
+def _score_to_tt(score, ply):
+    """勝負分數改成以目前節點為準 (同一局面可能出現在不同的手數)。"""
+    if score >= WIN_SCORE - MAX_PLY * 2:
+        return score + ply
+    if score <= -(WIN_SCORE - MAX_PLY * 2):
+        return score - ply
+    return score
+
+
+def _score_from_tt(score, ply):
+    if score >= WIN_SCORE - MAX_PLY * 2:
+        return score - ply
+    if score <= -(WIN_SCORE - MAX_PLY * 2):
+        return score + ply
+    return score
+
+
+def _flag_score(flags, win_mask):
+    if flags & win_mask:
+        return SCORE_FIVE
+    if flags & line_table.STRAIGHT_FOUR:
+        return SCORE_OPEN_FOUR
+    if flags & line_table.EXACT_FOUR:
+        return SCORE_FOUR
+    if flags & line_table.ANY_THREE:
+        return SCORE_THREE
+    return 0
+
+
+class AlphaBetaSearch:
+    """對單一 RuleSet 的 alpha-beta 搜尋器 (表格只建立一次，可重複搜尋)。"""
+
+    def __init__(self, ruleset, max_depth=MAX_DEPTH, branch_limit=BRANCH_LIMIT, tt=None):
+        """tt: transposition.TranspositionTable (None 表示不使用置換表)。"""
+        self.ruleset = ruleset
+        self.max_depth = max_depth
+        self.branch_limit = branch_limit
+        self.tt = tt
+        self.zobrist = zobrist.get_table(ruleset.board_size)
+        size = self.size = ruleset.board_size
+        # 點以 r * size + c 編號
+        self.points = [(r, c) for r in range(size) for c in range(size)]
+        self.windows = [ruleset.windows[r][c] for r, c in self.points]
+        # line_points[i][d]：i 在方向 d 上前後 5 格內的點
+        self.line_points = [tuple(tuple(cr * size + cc for cr, cc, _ in window[1]) for window in windows)
+                            for windows in self.windows]
+        self._build_lines()
+        self.flag_scores = {player: [_flag_score(flags, ruleset.win_masks[player]) for flags in range(64)]
+                            for player in (BLACK, WHITE)}
+
+    def _build_lines(self):
+        """棋盤上所有長度至少 5 的線，以及每個點所在的線。"""
+        size = self.size
+        self.lines = []
+        self.cell_lines = [[] for _ in self.points]
+        for dr, dc in self.ruleset.directions:
+            for r, c in self.points:
+                if self.ruleset.is_on_board(r - dr, c - dc):
+                    continue # 只從線的起點開始
+                line = []
+                rr, cc = r, c
+                while self.ruleset.is_on_board(rr, cc):
+                    line.append((rr, cc))
+                    rr, cc = rr + dr, cc + dc
+                if len(line) >= 5:
+                    for rr, cc in line:
+                        self.cell_lines[rr * size + cc].append(len(self.lines))
+                    self.lines.append(tuple(line))
+
+    # --- 對外介面 ---
+    @profiling.timed("alphabeta_search")
+    def search(self, board, player, move_count, time_limit=DEFAULT_TIME_LIMIT, max_depth=None, candidates=None,
+               min_depth=1):
+        """
+        搜尋 player 在 board 上的最佳著法，回傳 SearchResult。
+        candidates: 與 board 一致的 CandidateSet (例如 RenjuGame.candidates)，搜尋使用其複本；
+        None 時由 board 建立。
+        min_depth: 迭代加深的起始深度 (平行搜尋的輔助行程從較深的一層開始)。
+        """
+        self.start = time.perf_counter()
+        self.deadline = self.start + time_limit
+        self.nodes = 0
+        max_depth = self.max_depth if max_depth is None else max_depth
+        if self.tt is not None:
+            self.tt.new_search()
+            self._tt_counts = (self.tt.probes, self.tt.hits)
+        self._setup(board, player, candidates)
+
+        if move_count == 0 or not self.cands:
+            center = (self.ruleset.center, self.ruleset.center)
+            move = center if board[center[0]][center[1]] == EMPTY else None
+            return self._result(move, 0, 0)
+        own_win, opp_wins = self._threats(player)
+        if own_win is not None:
+            return self._result(self.points[own_win], WIN_SCORE, 1)
+        moves = self._ordered_moves(player, opp_wins)
+        if len(moves) <= 1:
+            move = self.points[moves[0]] if moves else None
+            return self._result(move, 0 if moves else -WIN_SCORE, 0)
+
+        best_move, best_score, completed = moves[0], 0, 0
+        for depth in range(min(min_depth, max_depth), max_depth + 1):
+            try:
+                if completed == 0 or abs(best_score) >= WIN_SCORE - MAX_PLY:
+                    score, move = self._root(moves, depth, -INFINITY, INFINITY)
+                else:
+                    alpha, beta = best_score - ASPIRATION_WINDOW, best_score + ASPIRATION_WINDOW
+                    score, move = self._root(moves, depth, alpha, beta)
+                    if score <= alpha or score >= beta: # 落在視窗外，以完整視窗重搜
+                        score, move = self._root(moves, depth, -INFINITY, INFINITY)
+            except SearchTimeout:
+                break
+            best_move, best_score, completed = move, score, depth
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) >= WIN_SCORE - MAX_PLY:
+                break # 已證明勝負
+            if time.perf_counter() - self.start > time_limit / 2:
+                break # 下一層不太可能在時間內完成
+        return self._result(self.points[best_move], best_score, completed)
+
+    def predicted_moves(self, board, player, limit=3, candidates=None):
+        """
+        player 在 board 上最可能的 limit 個著法 ((row, col))：置換表中的最佳著法在前，
+        其次依威脅排序 (與搜尋的著法順序相同)。
+        """
+        self._setup(board, player, candidates)
+        own_win, opp_wins = self._threats(player)
+        if own_win is not None:
+            return [self.points[own_win]]
+        moves = self._ordered_moves(player, opp_wins)
+        if self.tt is not None:
+            entry = self.tt.probe(self.hash ^ self.zobrist.side_key if player == WHITE else self.hash)
+            if entry is not None and entry[3] in moves:
+                moves.remove(entry[3])
+                moves.insert(0, entry[3])
+        return [self.points[q] for q in moves[:limit]]
+
+    def cancel(self):
+        """讓進行中的搜尋 (在其他執行緒) 盡快停止，回傳最後一個完整深度的結果。"""
+        self.deadline = 0.0
+
+    def _result(self, move, score, depth):
+        elapsed = time.perf_counter() - self.start
+        if self.tt is None:
+            return SearchResult(move, score, depth, self.nodes, elapsed)
+        probes, hits = self.tt.probes - self._tt_counts[0], self.tt.hits - self._tt_counts[1]
+        return SearchResult(move, score, depth, self.nodes, elapsed,
+                            hits / probes if probes else 0.0, self.tt.fill())
+
+    # --- 狀態 ---
+    def _setup(self, board, player, candidates=None):
+        """從 board 建立搜尋狀態 (複本、雜湊、候選點、點旗標與線評估)。"""
+        size = self.size
+        self.board = [row[:] for row in board]
+        self.side = player
+        self.hash = self.zobrist.hash_board(self.board)
+        self.undo = []
+        # 搜尋中途逾時不會撤銷，因此一律使用複本
+        self.candidates = candidates.copy() if candidates is not None else CandidateSet.from_board(self.board)
+        self.cands = self.candidates.indices
+
+        self.dir_flags = {BLACK: [0] * (4 * size * size), WHITE: [0] * (4 * size * size)}
+        self.point_flags = {BLACK: [0] * (size * size), WHITE: [0] * (size * size)}
+        self.point_scores = {BLACK: [0] * (size * size), WHITE: [0] * (size * size)}
+        for i, (r, c) in enumerate(self.points):
+            if self.board[r][c] == EMPTY:
+                for d in range(4):
+                    self._set_dir_flags(i, d)
+
+        self.line_values = [_line_value(tuple(self.board[r][c] for r, c in line)) for line in self.lines]
+        self.totals = {BLACK: sum(v[0] for v in self.line_values), WHITE: sum(v[1] for v in self.line_values)}
+
+    def _set_dir_flags(self, i, d):
+        """重新計算點 i 在方向 d 上雙方的旗標，並更新點旗標與點分數。"""
+        edge_code, cells = self.windows[i][d]
+        board = self.board
+        code_b = code_w = edge_code
+        for cr, cc, shift in cells:
+            cell = board[cr][cc]
+            if cell == BLACK:
+                code_b |= line_table.CELL_OWN << shift
+                code_w |= line_table.CELL_OPP << shift
+            elif cell == WHITE:
+                code_b |= line_table.CELL_OPP << shift
+                code_w |= line_table.CELL_OWN << shift
+        table = self.ruleset.table
+        base = 4 * i
+        for player, code in ((BLACK, code_b), (WHITE, code_w)):
+            dir_flags = self.dir_flags[player]
+            dir_flags[base + d] = table[code]
+            flags = dir_flags[base:base + 4]
+            scores = self.flag_scores[player]
+            self.point_flags[player][i] = flags[0] | flags[1] | flags[2] | flags[3]
+            self.point_scores[player][i] = scores[flags[0]] + scores[flags[1]] + scores[flags[2]] + scores[flags[3]]
+
+    def _make(self, i, player):
+        r, c = self.points[i]
+        board = self.board
+        board[r][c] = player
+        self.hash = self.zobrist.toggle(self.hash, player, r, c)
+        self.candidates.place(r, c)
+        # 點旗標：先保存受影響的值，撤銷時直接還原
+        saved = []
+        for d, line in enumerate(self.line_points[i]):
+            for q in line:
+                if board[q // self.size][q % self.size] == EMPTY:
+                    saved.append((q, d, self.dir_flags[BLACK][4 * q + d], self.dir_flags[WHITE][4 * q + d],
+                                  self.point_flags[BLACK][q], self.point_flags[WHITE][q],
+                                  self.point_scores[BLACK][q], self.point_scores[WHITE][q]))
+                    self._set_dir_flags(q, d)
+        # 線評估
+        lines = []
+        for li in self.cell_lines[i]:
+            old = self.line_values[li]
+            new = _line_value(tuple(board[rr][cc] for rr, cc in self.lines[li]))
+            self.line_values[li] = new
+            self.totals[BLACK] += new[0] - old[0]
+            self.totals[WHITE] += new[1] - old[1]
+            lines.append((li, old))
+        self.undo.append((saved, lines))
+        self.side = WHITE if player == BLACK else BLACK
+
+    def _unmake(self, i, player):
+        r, c = self.points[i]
+        self.board[r][c] = EMPTY
+        self.hash = self.zobrist.toggle(self.hash, player, r, c)
+        self.candidates.remove(r, c)
+        saved, lines = self.undo.pop()
+        for q, d, db, dw, fb, fw, sb, sw in reversed(saved):
+            self.dir_flags[BLACK][4 * q + d], self.dir_flags[WHITE][4 * q + d] = db, dw
+            self.point_flags[BLACK][q], self.point_flags[WHITE][q] = fb, fw
+            self.point_scores[BLACK][q], self.point_scores[WHITE][q] = sb, sw
+        for li, old in lines:
+            new = self.line_values[li]
+            self.line_values[li] = old
+            self.totals[BLACK] += old[0] - new[0]
+            self.totals[WHITE] += old[1] - new[1]
+        self.side = player
+
+    # --- 評估與著法產生 ---
+    def _evaluate(self, player):
+        opponent = WHITE if player == BLACK else BLACK
+        return self.totals[player] - self.totals[opponent]
+
+    def _threats(self, player):
+        """回傳 (player 的一個成五點或 None, 對手的成五點列表)。"""
+        opponent = WHITE if player == BLACK else BLACK
+        own_flags, opp_flags = self.point_flags[player], self.point_flags[opponent]
+        own_mask, opp_mask = self.ruleset.win_masks[player], self.ruleset.win_masks[opponent]
+        opp_wins = []
+        for q in self.cands:
+            if own_flags[q] & own_mask:
+                return q, opp_wins
+            if opp_flags[q] & opp_mask:
+                opp_wins.append(q)
+        return None, opp_wins
+
+    def _legal(self, q, player):
+        if player != BLACK or not self.ruleset.forbidden or not self.point_flags[BLACK][q] & FORBIDDEN_FLAGS:
+            return True
+        r, c = self.points[q]
+        return self.ruleset.forbidden_reason(self.board, r, c) is None
+
+    def _ordered_moves(self, player, opp_wins):
+        """依威脅產生並排序的著法 (點編號)。"""
+        if opp_wins:
+            return [q for q in opp_wins if self._legal(q, player)]
+        opponent = WHITE if player == BLACK else BLACK
+        own_flags, opp_flags = self.point_flags[player], self.point_flags[opponent]
+        own_scores, opp_scores = self.point_scores[player], self.point_scores[opponent]
+        cands = self.cands
+        if any(opp_flags[q] & line_table.STRAIGHT_FOUR for q in cands) and \
+                not any(own_flags[q] & line_table.STRAIGHT_FOUR for q in cands):
+            # 對手有活三：擋住 (對手的四 / 活四點) 或以衝四反擊
+            cands = [q for q in cands if opp_flags[q] & FOUR_FLAGS or own_flags[q] & FOUR_FLAGS]
+        near = self.candidates.near
+        ordered = sorted(cands, key=lambda q: (own_scores[q] + opp_scores[q], near[q]), reverse=True)
+        moves = []
+        for q in ordered:
+            if self._legal(q, player):
+                moves.append(q)
+                if len(moves) >= self.branch_limit:
+                    break
+        return moves
+
+    # --- 搜尋 ---
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes & 255 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def _root(self, moves, depth, alpha, beta):
+        player = self.side
+        best_score, best_move = -INFINITY, moves[0]
+        for m in moves:
+            self._make(m, player)
+            score = -self._negamax(depth - 1, -beta, -max(alpha, best_score), 1)
+            self._unmake(m, player)
+            if score > best_score:
+                best_score, best_move = score, m
+                if score >= beta:
+                    break
+        return best_score, best_move
+
+    def _negamax(self, depth, alpha, beta, ply):
+        self._tick()
+        player = self.side
+        own_win, opp_wins = self._threats(player)
+        if own_win is not None:
+            return WIN_SCORE - ply
+        if depth <= 0 and (not opp_wins or ply >= MAX_PLY):
+            return self._evaluate(player)
+
+        tt = self.tt if depth > 0 else None
+        tt_move = None
+        if tt is not None:
+            key = self.hash ^ self.zobrist.side_key if player == WHITE else self.hash
+            entry = tt.probe(key)
+            if entry is not None:
+                tt_depth, bound, score, tt_move = entry
+                if tt_depth >= depth:
+                    score = _score_from_tt(score, ply)
+                    if bound == transposition.EXACT or \
+                            (bound == transposition.LOWER and score >= beta) or \
+                            (bound == transposition.UPPER and score <= alpha):
+                        return score
+
+        moves = self._ordered_moves(player, opp_wins)
+        if not moves:
+            # 擋不住 (黑方的擋點是禁手) 為輸，沒有空點為和
+            return -(WIN_SCORE - ply) if opp_wins else 0
+        if tt_move is not None and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        alpha_start = alpha
+        best, best_move = -INFINITY, None
+        for m in moves:
+            self._make(m, player)
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            self._unmake(m, player)
+            if score > best:
+                best, best_move = score, m
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        if tt is not None:
+            if best >= beta:
+                bound = transposition.LOWER
+            elif best <= alpha_start:
+                bound = transposition.UPPER
+            else:
+                bound = transposition.EXACT
+            tt.store(key, depth, bound, _score_to_tt(best, ply), best_move)
+        return best
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+嚴格連珠禁手判斷 (strict Renju forbidden-move resolver)。
+
+rules.check_forbidden_move_at 把任何「活三」模式都算成三。正式規則要求：
+  - 三：再下一子能成為「真活四」(兩端都能成為恰好五連)，而且那一子本身不是禁手；
+  - 四：再下一子能成為恰好五連；同一條線上由不同四顆棋子組成的四分別計算
+        (例如 XXX_X_XXX 的一線四四)。
+判斷「那一子」是否為禁手需要遞迴，以 MAX_DEPTH 限制深度，
+超過深度時視為非禁手 (與簡化規則相同)。
+
+兩層記憶：
+  - line_info(code)：以單線視窗內容 (line_table 代碼) 為鍵，快取該線的四數量與活三延伸點；
+  - 遞迴結果：同一次查詢內以 (點, 已試下的棋子) 為鍵快取。
+只有簡化規則已判定至少兩個活三時才會進入遞迴，其餘情況只需要查表。
+"""
+from functools import lru_cache
+from config import BOARD_SIZE, EMPTY, BLACK, DIRECTIONS
+import line_table
+import rules
+
+MAX_DEPTH = 4
+
+_CENTER = line_table.WINDOW_RADIUS
+
+
+def _run(cells, idx):
+    """回傳包含 idx 的連續己方棋子區間 (start, end)。"""
+    start = idx
+    while start > 0 and cells[start - 1] == line_table.CELL_OWN:
+        start -= 1
+    end = idx
+    while end < len(cells) - 1 and cells[end + 1] == line_table.CELL_OWN:
+        end += 1
+    return start, end
+
+
+def _makes_exact_five(cells, e):
+    """在空點 e 補一子後，包含 e 的連續棋子是否恰好五顆。"""
+    cells[e] = line_table.CELL_OWN
+    start, end = _run(cells, e)
+    cells[e] = line_table.CELL_EMPTY
+    return end - start + 1 == 5
+
+
+def _is_straight_four(cells):
+    """包含中心的連續四子，兩端皆為空點且兩端補子都恰好成五 (真活四)。"""
+    start, end = _run(cells, _CENTER)
+    if end - start + 1 != 4 or start == 0 or end == len(cells) - 1:
+        return False
+    for e in (start - 1, end + 1):
+        if cells[e] != line_table.CELL_EMPTY or not _makes_exact_five(cells, e):
+            return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def line_info(code):
+    """
+    單線分析 (中心為剛落下的黑子)，回傳 (fours, three_points)：
+      fours        -- 包含中心的「四」數量，不同四顆棋子的組合分別計算
+      three_points -- 補一子即成為真活四的空點，以相對中心的偏移表示
+    """
+    cells = list(line_table.decode(code))
+    four_sets = set()
+    three_points = []
+    for e, cell in enumerate(cells):
+        if cell != line_table.CELL_EMPTY:
+            continue
+        cells[e] = line_table.CELL_OWN
+        start, end = _run(cells, _CENTER)
+        if start <= e <= end:
+            if end - start + 1 == 5:
+                four_sets.add(frozenset(range(start, end + 1)) - {e})
+            elif _is_straight_four(cells):
+                three_points.append(e - _CENTER)
+        cells[e] = line_table.CELL_EMPTY
+    return len(four_sets), tuple(three_points)
+
+
+def _resolve(board, r, c, depth, memo, placed, window_codes, visited):
+    key = (r, c, placed)
+    if key in memo:
+        return memo[key]
+
+    table = line_table.get_table()
+    codes = window_codes(board, r, c, BLACK)
+    if visited is not None:
+        visited.add((r, c))
+    flags = [table[code] for code in codes]
+
+    reason = None
+    if any(f & line_table.FIVE for f in flags):
+        reason = None # 五連優先，不算禁手
+    elif any(f & line_table.OVERLINE for f in flags):
+        reason = "長連"
+    elif sum(line_info(code)[0] for code in codes) >= 2:
+        reason = "四四"
+    elif sum(1 for f in flags if f & line_table.ANY_THREE) >= 2:
+        # 簡化規則認為是三三，逐條確認每個三的延伸點本身不是禁手
+        threes = 0
+        inner_placed = tuple(sorted(placed + ((r, c),)))
+        with rules.trial_move(board, r, c, BLACK):
+            for (dr, dc), code in zip(DIRECTIONS, codes):
+                for offset in line_info(code)[1]:
+                    er, ec = r + offset * dr, c + offset * dc
+                    if depth <= 0 or _resolve(board, er, ec, depth - 1, memo, inner_placed, window_codes, visited) is None:
+                        threes += 1
+                        break
+        if threes >= 2:
+            reason = "三三"
+
+    memo[key] = reason
+    return reason
+
+
+def forbidden_reason(board, r, c, depth=MAX_DEPTH, memo=None, window_codes=line_table.window_codes, visited=None):
+    """
+    黑棋在空點 (r, c) 落子的嚴格禁手原因："長連" / "四四" / "三三"，非禁手為 None。
+    memo 可在棋盤未改變的多次查詢之間共用。
+    window_codes 可換成 RuleSet.window_codes 以支援其他大小的棋盤。
+    visited 為 set 時加入所有讀取過視窗的點 ((r, c) 與遞迴檢查的延伸點)：
+    只有這些點四條線上 5 格內的棋子改變時，結果才可能改變 (ForbiddenMap 以此追蹤依賴)。
+    """
+    if memo is None:
+        memo = {}
+    return _resolve(board, r, c, depth, memo, (), window_codes, visited)
+
+
+def is_legal_move(r, c, player, move_count, board):
+    """
+    嚴格規則版本的 is_legal_move，回傳格式與 rules.is_legal_move 相同。
+    棋盤大小取自 board (BitBoard 固定為 BOARD_SIZE)，其他大小使用對應 RuleSet 的視窗代碼。
+    """
+    is_bitboard = isinstance(board, line_table.bitboard.BitBoard)
+    size = BOARD_SIZE if is_bitboard else len(board)
+    if not (0 <= r < size and 0 <= c < size):
+        return False, "Occupied or Off-board"
+    cell = board.get(r, c) if is_bitboard else board[r][c]
+    if cell != EMPTY:
+        return False, "Occupied or Off-board"
+
+    if player == BLACK and move_count == 0:
+        center = size // 2
+        if (r, c) != (center, center):
+            return False, rules.tengen_text(size)
+        return True, None
+
+    if player == BLACK:
+        window_codes = line_table.window_codes
+        if size != BOARD_SIZE:
+            import ruleset # ruleset 匯入本模組，延遲匯入避免循環
+            window_codes = ruleset.get_ruleset("renju_strict", size).window_codes
+        reason = forbidden_reason(board, r, c, window_codes=window_codes)
+        if reason:
+            return False, reason
+    return True, None
@@ -0,0 +1,209 @@
+# test_analysis.py
+import unittest
+import os
+import sys
+import random
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+import rules
+import test_pattern_matcher # 原本的字串棋型比對 (_legacy_bits)
+from config import BLACK, WHITE, EMPTY, BOARD_SIZE, DIRECTIONS, GameState
+
+
+def _empty_board():
+    return [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+
+
+def _random_board(rng, stones):
+    board = _empty_board()
+    for _ in range(stones):
+        r, c = rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE)
+        board[r][c] = rng.choice([BLACK, BLACK, WHITE])
+    return board
+
+
+class TestAnalysisIncremental(unittest.TestCase):
+    """AnalysisHandler 的增量棋型快取應與整盤重新掃描一致"""
+
+    def test_empty_board_records_skip_tengen(self):
+        """第一手之前：scan_all 與 point_records 都不把天元規則當成禁手"""
+        import contextlib
+        import io
+        from game_logic import RenjuGame
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = RenjuGame(black_player_type="human", white_player_type="human")
+        handler = game.analysis_handler
+        board = handler.analysis_board
+        self.assertEqual(game.move_count, 0)
+        records = handler.scan_all(board)
+        self.assertEqual(records, handler.point_records)
+        self.assertTrue(all(record[2] is None for row in records for record in row))
+
+    def test_incremental_matches_full_scan(self):
+        import contextlib
+        import io
+        from game_logic import RenjuGame
+        rng = random.Random(5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = RenjuGame(black_player_type="human", white_player_type="human")
+            handler = game.analysis_handler
+            game.make_move(7, 7)
+            for _ in range(70):
+                legal, _ = rules.legal_move_mask(game.board, game.current_player, game.move_count)
+                candidates = [(r, c) for r in range(3, 12) for c in range(3, 12) if legal[r, c]]
+                game.make_move(*rng.choice(candidates))
+                if game.game_state != GameState.PLAYING:
+                    break # 終局時不會更新棋型
+                board = handler.analysis_board
+                self.assertEqual(handler.point_records, handler.scan_all(board), game.move_count)
+                expected = {
+                    "live_three": handler.find_live_threes(board),
+                    "jump_live_three": handler.find_jump_live_threes(board),
+                    "four": handler.find_four_positions(board),
+                    "jump_four": handler.find_jump_four_positions(board),
+                    "five": handler.find_five_positions(board),
+                    "sleep_three": handler.find_sleep_threes(board),
+                }
+                actual = {
+                    "live_three": handler.live_three_positions,
+                    "jump_live_three": handler.jump_live_three_positions,
+                    "four": handler.four_positions,
+                    "jump_four": handler.jump_four_positions,
+                    "five": handler.five_positions,
+                    "sleep_three": handler.sleep_three_positions,
+                }
+                for pattern_type in expected:
+                    for player in (BLACK, WHITE):
+                        self.assertEqual(sorted(actual[pattern_type][player]), sorted(expected[pattern_type][player]),
+                                         (game.move_count, pattern_type, player))
+
+    def test_strict_incremental_matches_full_scan(self):
+        """嚴格連珠：延伸點改變的禁手狀態也要反映在 point_records (含悔棋)"""
+        import contextlib
+        import io
+        import ruleset
+        from game_logic import RenjuGame
+        rs = ruleset.get_ruleset("renju_strict")
+        rng = random.Random(6)
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = RenjuGame(black_player_type="human", white_player_type="human", ruleset=rs)
+            handler = game.analysis_handler
+            game.make_move(7, 7)
+            for _ in range(60):
+                legal, _ = rs.legal_move_mask(game.board, game.current_player, game.move_count)
+                game.make_move(*rng.choice([(r, c) for r in range(3, 12) for c in range(3, 12) if legal[r, c]]))
+                if game.game_state != GameState.PLAYING:
+                    break
+                self.assertEqual(handler.point_records, handler.scan_all(handler.analysis_board), game.move_count)
+            while game.move_count > 10:
+                game.undo_move()
+                self.assertEqual(handler.point_records, handler.scan_all(handler.analysis_board), game.move_count)
+
+    def test_scan_all_records(self):
+        """scan_all 的每個點：雙方棋型與舊字串比對相同，連五與勝負判斷相同，禁手與 is_legal_move 相同"""
+        import contextlib
+        import io
+        import pattern_matcher as pm
+        from game_logic import RenjuGame
+        rng = random.Random(11)
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = RenjuGame(black_player_type="human", white_player_type="human")
+        handler = game.analysis_handler
+        board = _random_board(rng, 50)
+        game.move_count = 50
+        records = handler.scan_all(board)
+        legacy_mask = pm.FOUR | pm.JUMP_FOUR | pm.LIVE_THREE | pm.JUMP_LIVE_THREE
+        for r in range(BOARD_SIZE):
+            for c in range(BOARD_SIZE):
+                black_bits, white_bits, forbidden = records[r][c]
+                if board[r][c] != EMPTY:
+                    self.assertEqual(records[r][c], (0, 0, None))
+                    continue
+                legal, reason = rules.is_legal_move(r, c, BLACK, 50, board)
+                self.assertEqual(forbidden, None if legal else reason, (r, c))
+                for player, bits in ((BLACK, black_bits), (WHITE, white_bits)):
+                    legacy = 0
+                    for direction in DIRECTIONS:
+                        legacy |= test_pattern_matcher.TestPatternMatcher._legacy_bits(board, r, c, player, direction)
+                    self.assertEqual(bits & legacy_mask, legacy & legacy_mask, (r, c, player))
+                    with rules.trial_move(board, r, c, player):
+                        wins = rules.check_win_condition_at(r, c, player, board)
+                    self.assertEqual(bool(bits & pm.FIVE), wins, (r, c, player))
+
+    def test_navigate_with_keyframes(self):
+        """分析模式任意跳轉後的棋盤、影響力與棋型，應與從頭重播到該步相同"""
+        import contextlib
+        import io
+        import numpy as np
+        import analysis
+        from game_logic import RenjuGame
+        from influence_map import InfluenceMap
+        rng = random.Random(13)
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = RenjuGame(black_player_type="human", white_player_type="human")
+            game.make_move(7, 7)
+            while game.game_state == GameState.PLAYING and game.move_count < 60:
+                legal, _ = rules.legal_move_mask(game.board, game.current_player, game.move_count)
+                game.make_move(*rng.choice([(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if legal[r, c]]))
+        moves = game.move_log
+        self.assertGreater(len(moves), analysis.KEYFRAME_INTERVAL * 2)
+        game.game_state = GameState.ANALYSIS
+        handler = game.analysis_handler
+        handler._reconstruct_board(-1)
+        for step in range(40):
+            if step % 3 == 0:
+                handler._reconstruct_board(rng.randrange(-1, len(moves)))
+            else:
+                handler.navigate(rng.choice(['first', 'prev', 'next', 'next', 'last']))
+            n = handler.analysis_step + 1
+            board = _empty_board()
+            for data in moves[:n]:
+                board[data['row']][data['col']] = data['player']
+            self.assertEqual(handler.get_board_to_draw(), board)
+            self.assertEqual(handler.get_last_move_to_draw(), (moves[n - 1]['row'], moves[n - 1]['col']) if n else None)
+            self.assertTrue(np.array_equal(handler.influence_map, InfluenceMap.from_board(board).display))
+            self.assertEqual(handler.point_records, handler.scan_all(board), n)
+        self.assertEqual(game.analysis_step, handler.analysis_step)
+
+
+class TestThreatGrids(unittest.TestCase):
+    """威脅分數格與逐一查找棋型位置列表的評分 (原本的 elif 順序) 相同"""
+
+    def test_grids_match_position_lists(self):
+        import contextlib
+        import io
+        from game_logic import RenjuGame
+        from ai_player import HEURISTIC_WEIGHTS
+        rng = random.Random(22)
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = RenjuGame(black_player_type="human", white_player_type="human")
+            handler = game.analysis_handler
+            game.make_move(7, 7)
+            for _ in range(50):
+                legal, _ = rules.legal_move_mask(game.board, game.current_player, game.move_count)
+                game.make_move(*rng.choice([(r, c) for r in range(3, 12) for c in range(3, 12) if legal[r, c]]))
+                if game.game_state != GameState.PLAYING:
+                    break
+                attack, defence = handler.threat_grids(HEURISTIC_WEIGHTS)
+                self.assertIs(handler.threat_grids(HEURISTIC_WEIGHTS)[0], attack) # 同一局面使用快取
+                for player in (BLACK, WHITE):
+                    opponent = WHITE if player == BLACK else BLACK
+                    own = [({(p[0], p[1]) for p in getattr(handler, f"get_{name}_positions")(player)}, a)
+                           for name, a, _ in HEURISTIC_WEIGHTS]
+                    opp = [({(p[0], p[1]) for p in getattr(handler, f"get_{name}_positions")(opponent)}, d)
+                           for name, _, d in HEURISTIC_WEIGHTS]
+                    for r in range(BOARD_SIZE):
+                        for c in range(BOARD_SIZE):
+                            expected_attack = next((a for points, a in own if (r, c) in points), 0)
+                            expected_defence = next((d for points, d in opp if (r, c) in points), 0)
+                            self.assertEqual((attack[player][r, c], defence[player][r, c]),
+                                             (expected_attack, expected_defence), (game.move_count, player, r, c))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,56 @@
+# test_analysis_worker.py
+import unittest
+import os
+import sys
+import random
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+import rules
+from config import GameState
+
+
+class TestAnalysisWorker(unittest.TestCase):
+    """背景分析的結果應與同步分析相同，且只保留最新局面的結果"""
+
+    def test_latest_version_matches_sync_analysis(self):
+        import contextlib
+        import io
+        import numpy as np
+        from game_logic import RenjuGame
+        from analysis_worker import AnalysisWorker
+        rng = random.Random(14)
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = RenjuGame(black_player_type="human", white_player_type="human")
+        worker = AnalysisWorker(game.ruleset)
+        worker.start()
+        try:
+            game.make_move(7, 7)
+            versions = []
+            for _ in range(30):
+                legal, _ = rules.legal_move_mask(game.board, game.current_player, game.move_count)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    game.make_move(*rng.choice([(r, c) for r in range(4, 11) for c in range(4, 11) if legal[r, c]]))
+                if game.game_state != GameState.PLAYING:
+                    break
+                worker.submit(game.board, game.move_count, game.position_version)
+                versions.append(game.position_version)
+            self.assertEqual(len(set(versions)), len(versions))
+            result = worker.wait_for(versions[-1], timeout=10)
+            self.assertIsNotNone(result)
+            handler = game.analysis_handler
+            self.assertEqual(result.get_positions("live_three"), handler.live_three_positions)
+            self.assertEqual(result.get_positions("four"), handler.four_positions)
+            self.assertEqual(result.get_positions("five"), handler.five_positions)
+            self.assertTrue(np.array_equal(result.influence_map, handler.influence_map))
+        finally:
+            worker.stop()
+        self.assertIs(worker.latest(), result)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
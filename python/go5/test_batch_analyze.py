@@ -0,0 +1,65 @@
+# test_batch_analyze.py
+import unittest
+import os
+import sys
+import csv
+import json
+import tempfile
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+import batch_analyze
+import benchmark
+from config import BLACK, WHITE
+
+
+class TestBatchAnalyze(unittest.TestCase):
+    """棋譜批次分析的輸出內容與平行結果"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saves = os.path.join(self.tmp.name, "saves")
+        os.makedirs(self.saves)
+        for name, moves in benchmark.KIFU_SEQUENCES.items():
+            move_log = [{"player": BLACK if i % 2 == 0 else WHITE, "row": r, "col": c, "time": 0.0, "pause": 0.0}
+                        for i, (r, c) in enumerate(moves)]
+            with open(os.path.join(self.saves, f"{name}.json"), 'w', encoding='utf-8') as f:
+                json.dump({"move_log": move_log, "player_black": "human", "player_white": "human"}, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _read(self, path):
+        with open(path, newline='', encoding='utf-8') as f:
+            return sorted((row["game"], int(row["move"]), tuple(row.values())) for row in csv.DictReader(f))
+
+    def test_rows_and_parallel_output(self):
+        serial = os.path.join(self.tmp.name, "serial.csv")
+        parallel = os.path.join(self.tmp.name, "parallel.csv")
+        stats = batch_analyze.run(batch_analyze.find_games([self.saves]), serial, workers=1, vcf_time=0.1)
+        self.assertEqual(stats["games"], len(benchmark.KIFU_SEQUENCES))
+        self.assertEqual(stats["errors"], [])
+        self.assertGreater(stats["games_per_sec"], 0)
+        batch_analyze.run(batch_analyze.find_games([self.saves]), parallel, workers=2, vcf_time=0.1)
+        self.assertEqual(self._read(serial), self._read(parallel))
+
+        with open(serial, newline='', encoding='utf-8') as f:
+            rows = {(row["game"], int(row["move"])): row for row in csv.DictReader(f)}
+        self.assertEqual(list(next(iter(rows.values()))), batch_analyze.COLUMNS)
+        # black_win：黑方第 11 手成五，之前白方沒有擋
+        self.assertEqual(rows[("black_win.json", 11)]["win"], "1")
+        self.assertGreater(int(rows[("black_win.json", 11)]["own_five"]), 0)
+        self.assertEqual(rows[("black_win.json", 10)]["forced_block"], "0")
+        self.assertEqual(rows[("black_win.json", 11)]["vcf"], "found")
+        # 第 9 手白方已有四 (8,0)-(8,3)，黑方只有活三，沒有 VCF
+        self.assertEqual(rows[("black_win.json", 9)]["vcf"], "none")
+        # three_three：第 11 手之前 (1,1) 對黑方是三三禁手
+        self.assertGreater(int(rows[("three_three.json", 10)]["forbidden_points"]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
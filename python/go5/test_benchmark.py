@@ -0,0 +1,50 @@
+# test_benchmark.py
+import unittest
+import os
+import sys
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    """基準語料與退步判斷"""
+
+    def test_corpus_replays(self):
+        """語料中的每個局面都必須能以合法棋步重播"""
+        corpus = benchmark.build_corpus(random_games=2)
+        names = [name for name, _ in corpus]
+        self.assertIn("three_three[9]", names)
+        self.assertIn("random[1]", names)
+        # 前綴都包含在最長的序列中，只需重播每組最長的一個
+        longest = {}
+        for name, moves in corpus:
+            base = name.split("[")[0] if not name.startswith("random") else name
+            if len(moves) > len(longest.get(base, ())):
+                longest[base] = moves
+        for name, moves in longest.items():
+            game = benchmark.replay(moves)
+            self.assertEqual(game.move_count, len(moves), name)
+
+    def test_run_and_compare(self):
+        """結果格式，以及超過門檻才算退步"""
+        corpus = [("kifu_basic[3]", benchmark.KIFU_SEQUENCES["kifu_basic"][:3])]
+        report = benchmark.run(["rules.is_legal_move"], repeat=1, corpus=corpus)
+        res = report["results"]["rules.is_legal_move"]
+        self.assertGreater(res["ops_per_sec"], 0)
+        self.assertLessEqual(res["p50_us"], res["p99_us"])
+
+        fast = {"results": {"f": {"ops_per_sec": 100.0}, "g": {"ops_per_sec": 100.0}}}
+        slow = {"results": {"f": {"ops_per_sec": 70.0}, "g": {"ops_per_sec": 90.0}}}
+        self.assertEqual(benchmark.compare(slow, fast, 0.25), [("f", 100.0, 70.0)])
+        self.assertEqual(benchmark.compare(slow, fast, 0.25, fail_on=["g"]), [])
+        self.assertEqual(benchmark.compare(fast, slow, 0.25), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
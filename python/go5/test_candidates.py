@@ -0,0 +1,55 @@
+# test_candidates.py
+import unittest
+import os
+import sys
+import random
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+from config import BLACK, EMPTY, BOARD_SIZE, GameState
+
+
+class TestCandidateSet(unittest.TestCase):
+    """候選點集合的增量更新與整盤掃描一致，悔棋後回到原本的狀態"""
+
+    def _scan(self, board, radius=2):
+        size = len(board)
+        return {(r, c) for r in range(size) for c in range(size) if board[r][c] == EMPTY and
+                any(board[rr][cc] != EMPTY
+                    for rr in range(max(0, r - radius), min(size, r + radius + 1))
+                    for cc in range(max(0, c - radius), min(size, c + radius + 1)))}
+
+    def test_game_moves_and_undo(self):
+        from game_logic import RenjuGame
+        from candidates import CandidateSet
+        game = RenjuGame(black_player_type="human", white_player_type="human")
+        rng = random.Random(21)
+        history = [set(game.candidates)]
+        while len(game.move_log) < 25:
+            legal = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)
+                     if game.ruleset.is_legal_move(r, c, game.current_player, game.move_count, game.board)[0]]
+            near = [p for p in legal if p in game.candidates] or legal
+            game.make_move(*rng.choice(near))
+            self.assertEqual(set(game.candidates), self._scan(game.board))
+            history.append(set(game.candidates))
+            if game.game_state != GameState.PLAYING:
+                break
+        self.assertEqual(set(CandidateSet.from_board(game.board)), set(game.candidates))
+        hash_before = game.analysis_handler.position_hash
+        while game.move_log:
+            history.pop()
+            self.assertTrue(game.undo_move())
+            self.assertEqual(set(game.candidates), history[-1])
+        self.assertEqual(game.move_count, 0)
+        self.assertEqual(game.current_player, BLACK)
+        self.assertEqual(game.analysis_handler.position_hash, 0)
+        self.assertNotEqual(hash_before, 0)
+        self.assertFalse(game.undo_move())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,58 @@
+# test_influence_map.py
+import unittest
+import os
+import sys
+import random
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+from config import BLACK, WHITE, EMPTY, BOARD_SIZE
+
+
+def _empty_board():
+    return [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+
+
+class TestInfluenceMap(unittest.TestCase):
+    """影響力地圖的增量更新應與整盤重新計算一致"""
+
+    def test_incremental_matches_recompute(self):
+        from influence_map import InfluenceMap, OCCUPIED_INFLUENCE
+        rng = random.Random(12)
+        board = _empty_board()
+        influence = InfluenceMap(BOARD_SIZE)
+        moves = []
+        for _ in range(60):
+            r, c = rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE)
+            if board[r][c] != EMPTY:
+                continue
+            player = rng.choice([BLACK, WHITE])
+            board[r][c] = player
+            influence.place(player, r, c)
+            moves.append((player, r, c))
+        # 原本 update_influence_map 的整盤計算
+        for r in range(BOARD_SIZE):
+            for c in range(BOARD_SIZE):
+                counts = {BLACK: 0, WHITE: 0}
+                for dr in (-1, 0, 1):
+                    for dc in (-1, 0, 1):
+                        nr, nc = r + dr, c + dc
+                        if (dr or dc) and 0 <= nr < BOARD_SIZE and 0 <= nc < BOARD_SIZE and board[nr][nc] != EMPTY:
+                            counts[board[nr][nc]] += 1
+                expected = OCCUPIED_INFLUENCE if board[r][c] != EMPTY else counts[BLACK] + counts[WHITE]
+                self.assertEqual(influence.display[r, c], expected)
+                if board[r][c] == EMPTY:
+                    self.assertEqual(influence.influence(r, c, BLACK), counts[BLACK])
+                    self.assertEqual(influence.influence(r, c, WHITE), counts[WHITE])
+        # 依相反順序移除後回到空地圖
+        for player, r, c in reversed(moves):
+            influence.remove(player, r, c)
+        self.assertFalse(influence.combined.any() or influence.display.any() or influence.occupied.any())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
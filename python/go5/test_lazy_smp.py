@@ -0,0 +1,69 @@
+# test_lazy_smp.py
+import unittest
+import os
+import sys
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+from config import BLACK, WHITE
+
+
+class TestLazySMP(unittest.TestCase):
+    """共用記憶體上的置換表在行程間互相可見，平行搜尋的結果與單一行程一致"""
+
+    def test_shared_buffer(self):
+        from multiprocessing import shared_memory
+        import transposition
+        shm = shared_memory.SharedMemory(create=True, size=transposition.buffer_size(1))
+        try:
+            a = transposition.TranspositionTable(1, buffer=shm.buf)
+            b = transposition.TranspositionTable(1, buffer=shm.buf)
+            a.clear()
+            a.store(12345, 3, transposition.LOWER, -70, 42)
+            self.assertEqual(b.probe(12345), (3, transposition.LOWER, -70, 42))
+            del a, b
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def test_parallel_search(self):
+        import ruleset
+        import lazy_smp
+        rs = ruleset.get_ruleset("renju", 15)
+        board = rs.new_board()
+        for (r, c), player in [((7, 7), BLACK), ((6, 6), WHITE), ((7, 8), BLACK), ((8, 8), WHITE), ((7, 6), BLACK)]:
+            board[r][c] = player
+        searcher = lazy_smp.LazySMPSearch(rs, workers=2, tt_mb=1)
+        try:
+            result = searcher.search(board, WHITE, 5, time_limit=5, max_depth=3)
+            self.assertEqual(result.workers, 2)
+            self.assertEqual(result.depth, 3)
+            self.assertIn(result.move, [(7, 5), (7, 9), (7, 4), (7, 10)])
+            self.assertGreater(result.tt_fill, 0)
+        finally:
+            lazy_smp.shutdown()
+        self.assertIsNone(searcher.shm)
+
+    def test_pool_requires_main_thread(self):
+        import threading
+        import lazy_smp
+        errors = []
+
+        def create():
+            try:
+                lazy_smp.start_pool(1)
+            except RuntimeError as exc:
+                errors.append(exc)
+        thread = threading.Thread(target=create)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(errors), 1)
+        self.assertIsNone(lazy_smp._pool)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+# test_mcts.py
+import unittest
+import os
+import sys
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+from config import BLACK, WHITE, EMPTY
+
+
+class TestMCTS(unittest.TestCase):
+    """MCTS：處理立即的勝負與活三，下一手沿用搜尋樹，根平行化合併各行程的結果"""
+
+    def _board(self, rs, stones):
+        board = rs.new_board()
+        for (r, c), player in stones:
+            board[r][c] = player
+        return board
+
+    def test_tactics(self):
+        import ruleset
+        import mcts
+        rs = ruleset.get_ruleset("renju", 15)
+        searcher = mcts.MCTSSearch(rs, seed=1)
+        board = self._board(rs, [((7, 7), BLACK), ((6, 6), WHITE), ((7, 8), BLACK), ((8, 8), WHITE), ((7, 6), BLACK)])
+        result = searcher.search(board, WHITE, 5, time_limit=0.5)
+        self.assertIn(result.move, [(7, 5), (7, 9), (7, 4), (7, 10)])
+        self.assertGreater(result.playouts, 0)
+        result = searcher.search(board, BLACK, 5, time_limit=0.5)
+        self.assertIn(result.move, [(7, 5), (7, 9)])
+        board = self._board(rs, [((7, 7), WHITE), ((6, 6), WHITE), ((8, 8), WHITE), ((9, 9), WHITE), ((5, 5), BLACK),
+                                 ((3, 7), BLACK), ((3, 8), BLACK), ((2, 2), BLACK)])
+        self.assertEqual(searcher.search(board, BLACK, 8, time_limit=0.3).move, (10, 10))
+
+    def test_tree_reuse(self):
+        import ruleset
+        import mcts
+        rs = ruleset.get_ruleset("renju", 15)
+        searcher = mcts.MCTSSearch(rs, seed=2)
+        board = self._board(rs, [((7, 7), BLACK), ((7, 8), WHITE), ((8, 8), BLACK), ((6, 6), WHITE)])
+        result = searcher.search(board, BLACK, 4, time_limit=0.5)
+        self.assertEqual(result.reused, 0)
+        # 下搜尋選的著法，對手回應樹中訪問最多的著法
+        child = max(searcher.root.children, key=lambda n: n.visits)
+        reply = max(child.children, key=lambda n: n.visits)
+        board[result.move[0]][result.move[1]] = BLACK
+        r, c = searcher.points[reply.move]
+        board[r][c] = WHITE
+        visits = reply.visits
+        result = searcher.search(board, BLACK, 6, time_limit=0.2)
+        self.assertIs(searcher.root, reply)
+        self.assertEqual(result.reused, visits)
+        self.assertGreater(result.reused, 0)
+        # 悔棋後的局面不能沿用
+        board[r][c] = EMPTY
+        board[result.move[0]][result.move[1]] = EMPTY
+        self.assertEqual(searcher.search(board, WHITE, 5, time_limit=0.1).reused, 0)
+
+    def test_root_parallel(self):
+        import ruleset
+        import mcts
+        rs = ruleset.get_ruleset("renju", 15)
+        searcher = mcts.MCTSSearch(rs, workers=2, seed=3)
+        board = self._board(rs, [((7, 7), WHITE), ((6, 6), WHITE), ((8, 8), WHITE), ((9, 9), WHITE), ((5, 5), BLACK),
+                                 ((3, 7), BLACK), ((3, 8), BLACK), ((2, 2), BLACK)])
+        try:
+            result = searcher.search(board, BLACK, 8, time_limit=0.6)
+        finally:
+            mcts.shutdown_pool()
+        self.assertEqual(result.move, (10, 10))
+        self.assertEqual(result.workers, 2)
+        self.assertGreaterEqual(result.playouts, 2)
+
+    def test_pool_requires_main_thread(self):
+        import threading
+        import mcts
+        errors = []
+
+        def create():
+            try:
+                mcts.start_pool(2)
+            except RuntimeError as exc:
+                errors.append(exc)
+        thread = threading.Thread(target=create)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(errors), 1)
+        self.assertIsNone(mcts._pool)
+        self.assertEqual(mcts.DEFAULT_WORKERS, 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
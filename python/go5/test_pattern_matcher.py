@@ -0,0 +1,107 @@
+# test_pattern_matcher.py
+import unittest
+import os
+import sys
+import random
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+from config import BLACK, WHITE, EMPTY, BOARD_SIZE
+
+
+def _empty_board():
+    return [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+
+
+def _random_board(rng, stones):
+    board = _empty_board()
+    for _ in range(stones):
+        r, c = rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE)
+        board[r][c] = rng.choice([BLACK, BLACK, WHITE])
+    return board
+
+
+class TestPatternMatcher(unittest.TestCase):
+    """pattern_matcher 的整數編碼比對應與原本的字串比對結果相同"""
+
+    @staticmethod
+    def _legacy_bits(board, r, c, player, direction):
+        """原 AnalysisHandler._get_stones_string + 子字串比對 (界外寫成 '0')"""
+        import pattern_matcher as pm
+
+        def stones(length):
+            half = length // 2
+            out = []
+            for i in range(-half, length - half):
+                rr, cc = r + i * direction[0], c + i * direction[1]
+                on_board = 0 <= rr < BOARD_SIZE and 0 <= cc < BOARD_SIZE
+                out.append(str(player if (rr, cc) == (r, c) else board[rr][cc]) if on_board else '0')
+            return ''.join(out)
+
+        p = str(player)
+        s11, s7 = stones(11), stones(7)
+        bits = 0
+        if p * 5 in s11:
+            bits |= pm.FIVE
+        if p * 4 + '0' in s11 or '0' + p * 4 in s11:
+            bits |= pm.FOUR
+        if any(x in s11 for x in (p + '0' + p * 3, p * 3 + '0' + p, p * 2 + '0' + p * 2)):
+            bits |= pm.JUMP_FOUR
+        if '0' + p * 3 + '0' in s7:
+            bits |= pm.LIVE_THREE
+        if '0' + p + '0' + p * 2 + '0' in s7 or '0' + p * 2 + '0' + p + '0' in s7:
+            bits |= pm.JUMP_LIVE_THREE
+        return bits
+
+    def test_matches_legacy_string_patterns(self):
+        import pattern_matcher as pm
+        import ruleset
+        rs = ruleset.get_ruleset("freestyle") # 長連也算五連，與字串比對相同
+        legacy_mask = pm.FIVE | pm.FOUR | pm.JUMP_FOUR | pm.LIVE_THREE | pm.JUMP_LIVE_THREE
+        rng = random.Random(10)
+        for _ in range(30):
+            board = _random_board(rng, rng.randint(20, 120))
+            for r in range(BOARD_SIZE):
+                for c in range(BOARD_SIZE):
+                    for d, direction in enumerate(rs.directions):
+                        codes = pm.line_codes(board, rs.windows[r][c][d])
+                        for player, code in zip((BLACK, WHITE), codes):
+                            self.assertEqual(pm.classify(code) & legacy_mask,
+                                             self._legacy_bits(board, r, c, player, direction), (r, c, d, player))
+
+    def test_flat_table(self):
+        """棋型表的大小固定，內容與逐格分類相同"""
+        import line_table
+        import pattern_matcher as pm
+        table = pm.get_table()
+        self.assertIsInstance(table, bytes)
+        self.assertEqual(len(table), line_table.TABLE_SIZE)
+        windows = list(line_table.iter_windows())
+        for code, cells in random.Random(12).sample(windows, 3000):
+            self.assertEqual(table[code], pm.classify_cells(cells), cells)
+            self.assertEqual(pm.classify(code), table[code])
+
+    def test_sleep_three(self):
+        """眠三：一端被對方或邊界擋住"""
+        import pattern_matcher as pm
+        import ruleset
+        rs = ruleset.get_ruleset("renju")
+        board = _empty_board()
+        board[7][3] = WHITE
+        board[7][4] = board[7][5] = BLACK
+        bits = pm.classify_line(board, rs.windows[7][6][0])
+        self.assertTrue(bits[BLACK] & pm.SLEEP_THREE)
+        self.assertFalse(bits[BLACK] & pm.LIVE_THREE)
+        board[7][3] = EMPTY
+        self.assertTrue(pm.classify_line(board, rs.windows[7][6][0])[BLACK] & pm.LIVE_THREE)
+        board = _empty_board()
+        board[7][1] = board[7][2] = BLACK
+        self.assertTrue(pm.classify_line(board, rs.windows[7][0][0])[BLACK] & pm.SLEEP_THREE) # 邊界
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
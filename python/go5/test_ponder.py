@@ -0,0 +1,86 @@
+# test_ponder.py
+import unittest
+import os
+import sys
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+from config import BLACK, WHITE
+
+
+class TestPondering(unittest.TestCase):
+    """背景思考：命中時直接使用 (或沿用) 結果，未命中時乾淨地停止"""
+
+    def _setup(self, **kwargs):
+        import ai_player
+        from candidates import CandidateSet
+        ai = ai_player.AIPlayer(**kwargs)
+        board = ai.ruleset.new_board()
+        for (r, c), player in [((7, 7), BLACK), ((7, 8), WHITE), ((8, 8), BLACK), ((6, 6), WHITE), ((8, 7), BLACK)]:
+            board[r][c] = player
+        return ai, board, CandidateSet.from_board(board)
+
+    def _wait(self, ai, timeout=10):
+        thread = ai.ponderer._thread
+        thread.join(timeout)
+        self.assertFalse(thread.is_alive())
+
+    def test_alphabeta_hit(self):
+        import ai_player
+        ai, board, candidates = self._setup()
+        # 白方 (AI) 剛下完，黑方 (人類) 思考
+        ai.start_pondering(board, WHITE, 5, ai_player.ENGINE_ALPHABETA, time_left=6, candidates=candidates)
+        self._wait(ai)
+        predicted = ai.ponderer._predicted
+        self.assertTrue(predicted)
+        r, c = predicted[0]
+        board[r][c] = BLACK
+        self.assertTrue(ai.stop_pondering(board))
+        stats = ai.ponderer.stats
+        self.assertEqual((stats.ponders, stats.hits, stats.instant), (1, 1, 1))
+        self.assertGreater(stats.time_saved, 0)
+        pondered = ai._pondered[1]
+        self.assertIs(ai.search_move(board, WHITE, 6, time_left=6), pondered)
+        self.assertIsNone(ai._pondered)
+
+    def test_miss_cancels(self):
+        import time
+        import ai_player
+        ai, board, candidates = self._setup()
+        ai.start_pondering(board, WHITE, 5, ai_player.ENGINE_ALPHABETA, time_left=300, candidates=candidates)
+        time.sleep(0.2)
+        board[0][14] = BLACK # 不在預想之中
+        start = time.perf_counter()
+        self.assertTrue(ai.stop_pondering(board))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertFalse(ai.ponderer.active)
+        stats = ai.ponderer.stats
+        self.assertEqual((stats.ponders, stats.hits, stats.time_saved), (1, 0, 0.0))
+        result = ai.search_move(board, WHITE, 6, time_left=6)
+        self.assertIsNotNone(result.move)
+
+    def test_mcts_reuses_tree(self):
+        import time
+        import ai_player
+        ai, board, candidates = self._setup(mcts_workers=1)
+        ai.start_pondering(board, WHITE, 5, ai_player.ENGINE_MCTS, time_left=6, candidates=candidates)
+        time.sleep(0.4)
+        ai.ponderer._searcher.cancel()
+        self._wait(ai)
+        searcher = ai._mcts_searcher()
+        reply = max(searcher.root.children, key=lambda n: n.visits)
+        r, c = searcher.points[reply.move]
+        board[r][c] = BLACK
+        ai.stop_pondering(board)
+        self.assertEqual(ai.ponderer.stats.hits, 1)
+        self.assertGreater(ai.ponderer.stats.time_saved, 0)
+        result = ai.mcts_move(board, WHITE, 6, time_left=6)
+        self.assertGreater(result.reused, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
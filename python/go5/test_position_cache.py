@@ -0,0 +1,48 @@
+# test_position_cache.py
+import unittest
+import os
+import sys
+import random
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+import rules
+from config import BOARD_SIZE, GameState
+
+
+class TestPositionCache(unittest.TestCase):
+    """局面快取：重複瀏覽同一棋譜時命中快取，Zobrist 雜湊與整盤重算相同"""
+
+    def test_position_cache_second_pass_hits(self):
+        """第二次瀏覽同一棋譜時每一步都命中快取，且結果與整盤掃描相同"""
+        import contextlib
+        import io
+        from game_logic import RenjuGame
+        rng = random.Random(15)
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = RenjuGame(black_player_type="human", white_player_type="human")
+            game.make_move(7, 7)
+            while game.game_state == GameState.PLAYING and game.move_count < 40:
+                legal, _ = rules.legal_move_mask(game.board, game.current_player, game.move_count)
+                game.make_move(*rng.choice([(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if legal[r, c]]))
+        game.game_state = GameState.ANALYSIS
+        handler = game.analysis_handler
+        handler.cache.clear()
+        misses = []
+        for _ in range(2):
+            handler._reconstruct_board(-1)
+            for _ in range(len(game.move_log)):
+                handler.navigate('next')
+                self.assertEqual(handler.position_hash, handler.zobrist.hash_board(handler.analysis_board))
+                self.assertEqual(handler.point_records, handler.scan_all(handler.analysis_board))
+            misses.append(handler.cache.misses)
+        self.assertEqual(misses[1], misses[0]) # 第二次全部命中
+        self.assertGreater(handler.cache.hits, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,48 @@
+# test_profiling.py
+import unittest
+import os
+import sys
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+
+class TestProfiling(unittest.TestCase):
+    """profiling 關閉時不包裝函式，開啟時累計呼叫次數與計數器"""
+
+    def setUp(self):
+        import profiling
+        self.profiling = profiling
+        self.was_enabled = profiling.ENABLED
+        profiling.reset()
+
+    def tearDown(self):
+        self.profiling.ENABLED = self.was_enabled
+        self.profiling.reset()
+
+    def test_disabled_and_enabled(self):
+        profiling = self.profiling
+        def work(x):
+            return x * 2
+        profiling.ENABLED = False
+        self.assertIs(profiling.timed("work")(work), work)
+
+        profiling.ENABLED = True
+        timed_work = profiling.timed("work")(work)
+        self.assertIsNot(timed_work, work)
+        self.assertEqual([timed_work(i) for i in range(3)], [0, 2, 4])
+        profiling.count("board_copy")
+        profiling.count("board_copy", 2)
+        snapshot = profiling.snapshot()
+        self.assertEqual(snapshot["timers"]["work"][0], 3)
+        self.assertEqual(snapshot["counters"], {"board_copy": 3})
+        lines = profiling.summary_lines()
+        self.assertTrue(lines[0].startswith("work: 3 calls"))
+        self.assertIn("board_copy: 3", lines)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,331 @@
+# test_rules.py
+import unittest
+import os
+import sys
+import random
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+import rules
+import bitboard
+from config import BLACK, WHITE, EMPTY, BOARD_SIZE, GameState
+
+
+def _empty_board():
+    return [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+
+
+def _random_board(rng, stones):
+    board = _empty_board()
+    for _ in range(stones):
+        r, c = rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE)
+        board[r][c] = rng.choice([BLACK, BLACK, WHITE])
+    return board
+
+
+class TestRulesBackends(unittest.TestCase):
+    """比對 list、bitboard 與 table 三種規則引擎的結果。"""
+
+    def setUp(self):
+        self._backend = rules.BACKEND
+
+    def tearDown(self):
+        rules.BACKEND = self._backend
+
+    def _legal_with(self, backend, r, c, player, move_count, board):
+        rules.BACKEND = backend
+        return rules.is_legal_move(r, c, player, move_count, board)
+
+    def test_backends_agree_on_random_boards(self):
+        """隨機局面上，每個點的合法性與原因都應一致"""
+        rng = random.Random(20240501)
+        for _ in range(40):
+            board = _random_board(rng, rng.randint(10, 110))
+            bb = bitboard.BitBoard.from_board(board)
+            for r in range(BOARD_SIZE):
+                for c in range(BOARD_SIZE):
+                    for player in (BLACK, WHITE):
+                        expected = self._legal_with("list", r, c, player, 9, board)
+                        self.assertEqual(self._legal_with("bitboard", r, c, player, 9, board), expected, (r, c, player))
+                        self.assertEqual(self._legal_with("table", r, c, player, 9, board), expected, (r, c, player))
+                        self.assertEqual(rules.is_legal_move(r, c, player, 9, bb), expected, (r, c, player))
+                        self.assertEqual(bitboard.is_legal_move(r, c, player, 9, bb), expected, (r, c, player))
+
+    def test_legal_move_mask_matches_is_legal_move(self):
+        """legal_move_mask 的結果應與逐點 is_legal_move 一致"""
+        rng = random.Random(4)
+        for _ in range(40):
+            board = _random_board(rng, rng.randint(5, 120))
+            for player, move_count in ((BLACK, 9), (WHITE, 9), (BLACK, 0)):
+                legal, reasons = rules.legal_move_mask(board, player, move_count)
+                for r in range(BOARD_SIZE):
+                    for c in range(BOARD_SIZE):
+                        ok, reason = rules.is_legal_move(r, c, player, move_count, board)
+                        self.assertEqual(bool(legal[r, c]), ok, (r, c, player))
+                        self.assertEqual(rules.REASON_TEXT[int(reasons[r, c])], reason, (r, c, player))
+
+    def test_three_three_and_win(self):
+        """三三禁手、黑棋恰好五連、黑棋長連"""
+        board = _empty_board()
+        for r, c in [(2, 1), (2, 3), (1, 2), (3, 2)]:
+            board[r][c] = BLACK
+        self.assertEqual(rules.is_legal_move(2, 2, BLACK, 9, board), (False, "三三"))
+        self.assertEqual(rules.is_legal_move(2, 2, WHITE, 9, board), (True, None))
+
+        board = _empty_board()
+        for c in (0, 1, 2, 3, 5):
+            board[7][c] = BLACK
+        self.assertEqual(rules.is_legal_move(7, 4, BLACK, 9, board), (False, "長連"))
+        board[7][0] = EMPTY
+        self.assertEqual(rules.is_legal_move(7, 4, BLACK, 9, board), (True, None))
+        board[7][4] = BLACK
+        self.assertTrue(rules.check_win_condition_at(7, 4, BLACK, board))
+
+    def test_strict_renju_resolver(self):
+        """嚴格規則：假三、一線四四、延伸點為禁手的三"""
+        import strict_rules
+
+        # O_XXX_O：兩端延伸都不能成為真活四，簡化規則仍算三
+        board = _empty_board()
+        for r, c in [(7, 5), (7, 6), (5, 7), (6, 7)]:
+            board[r][c] = BLACK
+        board[7][3] = board[7][9] = WHITE
+        self.assertEqual(rules.is_legal_move(7, 7, BLACK, 9, board), (False, "三三"))
+        self.assertIsNone(strict_rules.forbidden_reason(board, 7, 7))
+
+        # X_XXX_X：同一條線上的四四
+        board = _empty_board()
+        for c in (3, 5, 6, 9):
+            board[7][c] = BLACK
+        self.assertEqual(rules.is_legal_move(7, 7, BLACK, 9, board), (True, None))
+        self.assertEqual(strict_rules.forbidden_reason(board, 7, 7), "四四")
+
+        # 橫向活三的兩個延伸點 (7,4)、(7,8) 都是長連禁手，只剩直向一個真三
+        board = _empty_board()
+        for r, c in [(7, 5), (7, 6), (9, 7), (10, 7),
+                     (5, 4), (6, 4), (8, 4), (9, 4), (10, 4),
+                     (5, 8), (6, 8), (8, 8), (9, 8), (10, 8)]:
+            board[r][c] = BLACK
+        self.assertEqual(rules.is_legal_move(7, 7, BLACK, 9, board), (False, "三三"))
+        self.assertEqual(strict_rules.forbidden_reason(board, 7, 7, depth=0), "三三")
+        self.assertIsNone(strict_rules.forbidden_reason(board, 7, 7))
+        self.assertEqual(strict_rules.forbidden_reason(board, 7, 4), "長連")
+        rules.STRICT_RENJU = True
+        try:
+            self.assertEqual(rules.is_legal_move(7, 7, BLACK, 9, board), (True, None))
+        finally:
+            rules.STRICT_RENJU = False
+        self.assertEqual(board[7][7], EMPTY)
+
+    def test_bitboard_place_remove(self):
+        """BitBoard 放子與移除後應回到原狀"""
+        bb = bitboard.BitBoard()
+        bb.place(3, 4, WHITE)
+        self.assertEqual(bb.get(3, 4), WHITE)
+        bb.remove(3, 4, WHITE)
+        self.assertEqual(bb.get(3, 4), EMPTY)
+        self.assertEqual(bb.masks, bitboard.BitBoard().masks)
+
+    def test_line_table_cache_roundtrip(self):
+        """磁碟快取內容應與重新生成的表格一致 (寫在暫存目錄，不留下暫存檔)"""
+        import tempfile
+        import line_table
+        table = line_table.build_table()
+        self.assertEqual(len(table), line_table.TABLE_SIZE)
+        self.assertEqual(line_table.get_table(), table)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "line_table.bin")
+            line_table._save_cache(path, table)
+            line_table._save_cache(path, table) # 覆寫既有的快取
+            self.assertEqual(line_table._load_cache(path), table)
+            self.assertEqual(os.listdir(tmp_dir), ["line_table.bin"])
+        # 中心加上左右各兩顆己方棋子 -> 恰好五連
+        cells = (line_table.CELL_EDGE, line_table.CELL_EMPTY, line_table.CELL_EMPTY,
+                 line_table.CELL_OWN, line_table.CELL_OWN, line_table.CELL_OWN,
+                 line_table.CELL_OWN, line_table.CELL_OWN, line_table.CELL_OPP,
+                 line_table.CELL_EMPTY, line_table.CELL_EMPTY)
+        self.assertTrue(line_table.classify_window(cells) & line_table.FIVE)
+
+    def test_forbidden_map_incremental_matches_rebuild(self):
+        """ForbiddenMap 逐步更新的結果應與整盤重算相同"""
+        from forbidden_map import ForbiddenMap
+        rng = random.Random(11)
+        board = _empty_board()
+        fmap = ForbiddenMap(board)
+        for _ in range(120):
+            r, c = rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE)
+            if board[r][c] != EMPTY:
+                continue
+            board[r][c] = rng.choice([BLACK, BLACK, WHITE])
+            fmap.update(r, c)
+            self.assertEqual(fmap.reasons, ForbiddenMap(board).reasons)
+        legal, _ = rules.legal_move_mask(board, BLACK, 9)
+        for r in range(BOARD_SIZE):
+            for c in range(BOARD_SIZE):
+                if board[r][c] == EMPTY:
+                    self.assertEqual(fmap.is_forbidden(r, c), not legal[r, c], (r, c))
+
+    def test_forbidden_map_strict_matches_rebuild(self):
+        """嚴格連珠：延伸點可能在 5 格以外，逐步更新 (落子與提子) 的結果仍應與整盤重算相同"""
+        import ruleset
+        from forbidden_map import ForbiddenMap
+        rs = ruleset.get_ruleset("renju_strict")
+        for seed in (41, 52):
+            rng = random.Random(seed)
+            board = rs.new_board()
+            fmap = ForbiddenMap(board, rs)
+            moves = []
+            for _ in range(40):
+                while True:
+                    r, c = rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE)
+                    if board[r][c] == EMPTY:
+                        break
+                board[r][c] = rng.choice([BLACK, BLACK, WHITE])
+                moves.append((r, c))
+                before = [row[:] for row in fmap.reasons]
+                changed = fmap.update(r, c)
+                self.assertEqual(fmap.reasons, ForbiddenMap(board, rs).reasons, seed)
+                self.assertEqual(changed, {(rr, cc) for rr in range(BOARD_SIZE) for cc in range(BOARD_SIZE)
+                                           if before[rr][cc] != fmap.reasons[rr][cc]})
+            for r, c in reversed(moves[20:]):
+                board[r][c] = EMPTY
+                fmap.update(r, c)
+                self.assertEqual(fmap.reasons, ForbiddenMap(board, rs).reasons, seed)
+
+    def test_trial_move_restores_board(self):
+        """trial_move 離開時 (包含例外) 必須復原棋盤"""
+        board = _empty_board()
+        with rules.trial_move(board, 5, 5, BLACK):
+            self.assertEqual(board[5][5], BLACK)
+        self.assertEqual(board[5][5], EMPTY)
+
+        with self.assertRaises(RuntimeError):
+            with rules.trial_move(board, 5, 5, WHITE):
+                raise RuntimeError("boom")
+        self.assertEqual(board, _empty_board())
+
+        bb = bitboard.BitBoard()
+        with rules.trial_move(bb, 1, 2, WHITE):
+            self.assertEqual(bb.get(1, 2), WHITE)
+        self.assertEqual(bb.get(1, 2), EMPTY)
+
+    def test_list_backend_does_not_modify_board(self):
+        """list 後端試下後棋盤內容不變"""
+        rules.BACKEND = "list"
+        board = _random_board(random.Random(7), 60)
+        snapshot = [row[:] for row in board]
+        for r in range(BOARD_SIZE):
+            for c in range(BOARD_SIZE):
+                rules.is_legal_move(r, c, BLACK, 9, board)
+        self.assertEqual(board, snapshot)
+
+
+class TestRuleSets(unittest.TestCase):
+    """RuleSet 變體：預設連珠與 rules 一致、自由 / 標準五子棋的勝利條件、19x19 棋盤。"""
+
+    def test_renju_matches_rules(self):
+        """15x15 連珠 RuleSet 的合法性與遮罩應與 rules 相同"""
+        import ruleset
+        renju = ruleset.get_ruleset("renju")
+        self.assertIs(renju, ruleset.get_ruleset("renju", 15))
+        rng = random.Random(3)
+        for _ in range(15):
+            board = _random_board(rng, rng.randint(10, 100))
+            for player in (BLACK, WHITE):
+                legal, reasons = renju.legal_move_mask(board, player, 9)
+                for r in range(BOARD_SIZE):
+                    for c in range(BOARD_SIZE):
+                        expected = rules.is_legal_move(r, c, player, 9, board)
+                        self.assertEqual(renju.is_legal_move(r, c, player, 9, board), expected, (r, c, player))
+                        self.assertEqual((bool(legal[r, c]), renju.reason_text(int(reasons[r, c]))), expected)
+
+    def test_strict_variant_mask(self):
+        """嚴格連珠 RuleSet 的遮罩應與 strict_rules 逐點結果相同"""
+        import ruleset
+        import strict_rules
+        strict = ruleset.get_ruleset("renju_strict")
+        board = _random_board(random.Random(8), 70)
+        legal, _ = strict.legal_move_mask(board, BLACK, 9)
+        for r in range(BOARD_SIZE):
+            for c in range(BOARD_SIZE):
+                self.assertEqual(bool(legal[r, c]), strict_rules.is_legal_move(r, c, BLACK, 9, board)[0], (r, c))
+
+    def test_strict_is_legal_move_other_sizes(self):
+        """strict_rules / line_table 的 is_legal_move 的邊界與天元取自棋盤大小"""
+        import line_table
+        import ruleset
+        import strict_rules
+        rng = random.Random(9)
+        for size in (9, 19):
+            renju = ruleset.get_ruleset("renju", size)
+            strict = ruleset.get_ruleset("renju_strict", size)
+            board = strict.new_board()
+            self.assertEqual(strict_rules.is_legal_move(size // 2, size // 2, BLACK, 0, board), (True, None))
+            self.assertFalse(strict_rules.is_legal_move(7, 7, BLACK, 0, board)[0])
+            self.assertFalse(strict_rules.is_legal_move(size, 0, WHITE, 5, board)[0])
+            empty = [(r, c) for r in range(size) for c in range(size)]
+            for r, c in rng.sample(empty, size * 3):
+                board[r][c] = rng.choice((BLACK, WHITE))
+            for r in range(size):
+                for c in range(size):
+                    self.assertEqual(strict_rules.is_legal_move(r, c, BLACK, 9, board)[0],
+                                     strict.is_legal_move(r, c, BLACK, 9, board)[0], (size, r, c))
+                    self.assertEqual(line_table.is_legal_move(r, c, BLACK, 9, board),
+                                     renju.is_legal_move(r, c, BLACK, 9, board), (size, r, c))
+            self.assertEqual(line_table.is_legal_move(size // 2, size // 2, BLACK, 0, renju.new_board()), (True, None))
+
+    def test_win_conditions(self):
+        """長連：自由五子棋算勝，標準五子棋不算勝，兩者都沒有禁手"""
+        import ruleset
+        freestyle = ruleset.get_ruleset("freestyle")
+        standard = ruleset.get_ruleset("standard")
+        board = _empty_board()
+        for c in (0, 1, 2, 3, 5):
+            board[7][c] = BLACK
+        for rs in (freestyle, standard):
+            self.assertEqual(rs.is_legal_move(7, 4, BLACK, 9, board), (True, None))
+            self.assertEqual(rs.is_legal_move(3, 3, BLACK, 0, board), (True, None)) # 沒有天元規則
+        board[7][4] = BLACK
+        self.assertTrue(freestyle.check_win_condition_at(7, 4, BLACK, board))
+        self.assertFalse(standard.check_win_condition_at(7, 4, BLACK, board))
+
+        board = _empty_board()
+        for r, c in [(2, 1), (2, 3), (1, 2), (3, 2)]:
+            board[r][c] = BLACK
+        legal, _ = freestyle.legal_move_mask(board, BLACK, 9)
+        self.assertTrue(legal[2, 2])
+
+    def test_19x19_game(self):
+        """19x19 棋盤：邊角落子與五連勝利"""
+        import ruleset
+        from game_logic import RenjuGame
+        rs = ruleset.get_ruleset("freestyle", 19)
+        self.assertEqual(len(rs.neighbors[18][18]), 3)
+        game = RenjuGame(black_player_type="human", white_player_type="human", ruleset=rs)
+        self.assertEqual(len(game.board), 19)
+        for c in range(14, 18):
+            self.assertTrue(game.make_move(18, c))   # 黑
+            self.assertTrue(game.make_move(0, c))    # 白
+        self.assertTrue(game.make_move(18, 18))
+        self.assertEqual(game.game_state, GameState.BLACK_WINS)
+
+        renju19 = ruleset.get_ruleset("renju", 19)
+        self.assertEqual(renju19.is_legal_move(0, 0, BLACK, 0, renju19.new_board()), (False, "First move must be Tengen (9,9)"))
+        legal, reasons = renju19.legal_move_mask(renju19.new_board(), BLACK, 0)
+        self.assertEqual(renju19.reason_text(int(reasons[0, 0])), "First move must be Tengen (9,9)")
+        self.assertEqual(rules.reason_text(rules.REASON_TENGEN, 19), "First move must be Tengen (9,9)")
+        board = renju19.new_board()
+        for r, c in [(16, 15), (16, 17), (15, 16), (17, 16)]:
+            board[r][c] = BLACK
+        self.assertEqual(renju19.is_legal_move(16, 16, BLACK, 9, board), (False, "三三"))
+        legal, reasons = renju19.legal_move_mask(board, BLACK, 9)
+        self.assertFalse(legal[16, 16])
+        self.assertEqual(renju19.reason_text(int(reasons[16, 16])), "三三")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+# test_search.py
+import unittest
+import os
+import sys
+import random
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+from config import BLACK, WHITE, EMPTY
+
+
+class TestAlphaBetaSearch(unittest.TestCase):
+    """alpha-beta 搜尋：增量狀態與重新建立的一致，並能處理立即的勝負與活三"""
+
+    def _board(self, rs, stones):
+        board = rs.new_board()
+        for (r, c), player in stones:
+            board[r][c] = player
+        return board
+
+    def test_incremental_state(self):
+        import ruleset
+        import search
+        rs = ruleset.get_ruleset("renju", 15)
+        searcher, fresh = search.AlphaBetaSearch(rs), search.AlphaBetaSearch(rs)
+        rng = random.Random(19)
+
+        def state(s):
+            empty = [i for i, (r, c) in enumerate(s.points) if s.board[r][c] == EMPTY]
+            return ([(s.point_flags[BLACK][i], s.point_flags[WHITE][i],
+                      s.point_scores[BLACK][i], s.point_scores[WHITE][i]) for i in empty],
+                    s.totals, s.cands, s.candidates.near, s.hash)
+
+        for _ in range(10):
+            board = rs.new_board()
+            for k in range(rng.randint(1, 30)):
+                r, c = rng.randrange(15), rng.randrange(15)
+                if board[r][c] == EMPTY:
+                    board[r][c] = BLACK if k % 2 == 0 else WHITE
+            searcher._setup(board, BLACK)
+            before = state(searcher)
+            moves = []
+            player = BLACK
+            for _ in range(6):
+                m = rng.choice(sorted(searcher.cands))
+                searcher._make(m, player)
+                moves.append((m, player))
+                player = WHITE if player == BLACK else BLACK
+                fresh._setup(searcher.board, player)
+                self.assertEqual(state(searcher), state(fresh))
+            for m, player in reversed(moves):
+                searcher._unmake(m, player)
+            self.assertEqual(state(searcher), before)
+
+    def test_tactics(self):
+        import ruleset
+        import search
+        rs = ruleset.get_ruleset("renju", 15)
+        searcher = search.AlphaBetaSearch(rs)
+        # 黑方活三 (7,6)-(7,8)：白方必須擋在兩端之一，黑方下活四即勝
+        board = self._board(rs, [((7, 7), BLACK), ((6, 6), WHITE), ((7, 8), BLACK), ((8, 8), WHITE), ((7, 6), BLACK)])
+        result = searcher.search(board, WHITE, 5, time_limit=0.5)
+        self.assertIn(result.move, [(7, 5), (7, 9), (7, 4), (7, 10)])
+        self.assertGreaterEqual(result.depth, 1)
+        result = searcher.search(board, BLACK, 5, time_limit=0.5)
+        self.assertIn(result.move, [(7, 5), (7, 9)])
+        self.assertGreaterEqual(result.score, search.WIN_SCORE - search.MAX_PLY)
+        # 白方四 (6,6)-(9,9)：黑方必須擋 (10,10)，而且不能先下自己的活三
+        board = self._board(rs, [((7, 7), WHITE), ((6, 6), WHITE), ((8, 8), WHITE), ((9, 9), WHITE), ((5, 5), BLACK),
+                                 ((3, 7), BLACK), ((3, 8), BLACK), ((2, 2), BLACK)])
+        result = searcher.search(board, BLACK, 8, time_limit=0.5)
+        self.assertEqual(result.move, (10, 10))
+        # 自己有成五點時直接獲勝
+        board[10][10] = BLACK
+        board[3][9] = BLACK
+        board[3][6] = BLACK
+        result = searcher.search(board, BLACK, 11, time_limit=0.5)
+        self.assertIn(result.move, [(3, 5), (3, 10)])
+
+    def test_game_uses_search_engine(self):
+        from game_logic import RenjuGame
+        game = RenjuGame(black_player_type="human", white_player_type="ai-ab")
+        game.make_move(7, 7)
+        game.timers[WHITE] = 10 # 每手約 0.33 秒
+        move, used_book = game.request_ai_move()
+        self.assertIsNotNone(move)
+        if not used_book:
+            self.assertIsNotNone(game.ai.last_search)
+            self.assertEqual(game.ai.last_search.move, move)
+        self.assertTrue(game.make_move(*move))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
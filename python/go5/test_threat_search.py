@@ -0,0 +1,86 @@
+# test_threat_search.py
+import unittest
+import os
+import sys
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+from config import BLACK, WHITE, EMPTY, BOARD_SIZE
+
+
+def _empty_board():
+    return [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+
+
+class TestThreatSearch(unittest.TestCase):
+    """VCF / VCT 搜尋找到的手順必須是合法且每一步都是威脅的勝利手順"""
+
+    def _verify(self, rs, board, result):
+        """攻方 (最後一手除外) 每一步都留下成五點，守方的 VCF 應手就是唯一的成五點，最後一手成五。"""
+        board = [row[:] for row in board]
+        attacker = result.attacker
+        sequence = result.sequence
+        for i, (r, c, player) in enumerate(sequence):
+            self.assertEqual(board[r][c], EMPTY)
+            if i == len(sequence) - 1:
+                self.assertEqual(player, attacker)
+                self.assertTrue(rs.check_win_condition_at(r, c, player, board))
+            if player == BLACK and not rs.check_win_condition_at(r, c, player, board):
+                self.assertIsNone(rs.forbidden_reason(board, r, c), (i, sequence))
+            board[r][c] = player
+            if result.kind == "vcf" and player == attacker and i < len(sequence) - 1:
+                wins = [(wr, wc) for wr in range(rs.board_size) for wc in range(rs.board_size)
+                        if board[wr][wc] == EMPTY and rs.check_win_condition_at(wr, wc, attacker, board)]
+                self.assertTrue(wins)
+                if len(wins) == 1:
+                    self.assertEqual(sequence[i + 1][:2], wins[0])
+
+    def test_double_four_and_forbidden(self):
+        import ruleset
+        from threat_search import ThreatSearch
+        rs = ruleset.get_ruleset("renju")
+        for attacker, defender in ((WHITE, BLACK), (BLACK, WHITE)):
+            board = _empty_board()
+            for r, c in ((5, 5), (5, 6), (5, 7), (6, 8), (7, 8), (8, 8)):
+                board[r][c] = attacker
+            board[5][4] = board[9][8] = defender
+            result = ThreatSearch(rs).vcf(board, attacker)
+            if attacker == WHITE: # 白方 (5,8) 四四即勝
+                self.assertTrue(result.found)
+                self.assertEqual(result.sequence[0], (5, 8, WHITE))
+            else: # 黑方 (5,8) 是四四禁手
+                self.assertEqual(rs.forbidden_reason(board, 5, 8), "四四")
+                if result.found:
+                    self.assertNotEqual(result.sequence[0][:2], (5, 8))
+            if result.found:
+                self._verify(rs, board, result)
+
+    def test_random_positions(self):
+        import benchmark
+        import ruleset
+        from threat_search import ThreatSearch
+        rs = ruleset.get_ruleset("renju")
+        search = ThreatSearch(rs, time_limit=0.3)
+        found = 0
+        for name, moves in benchmark.build_corpus(random_games=4):
+            if not name.startswith("random"):
+                continue
+            for n in range(10, len(moves), 5):
+                board = _empty_board()
+                for i, (r, c) in enumerate(moves[:n]):
+                    board[r][c] = BLACK if i % 2 == 0 else WHITE
+                attacker = BLACK if n % 2 == 0 else WHITE
+                for result in (search.vcf(board, attacker), search.vct(board, attacker)):
+                    self.assertLess(result.elapsed, 1.0)
+                    if result.found:
+                        found += 1
+                        self._verify(rs, board, result)
+        self.assertGreater(found, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
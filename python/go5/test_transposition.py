@@ -0,0 +1,61 @@
+# test_transposition.py
+import unittest
+import os
+import sys
+
+# --- 路徑設定 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '.'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# --- 結束路徑設定 ---
+
+from config import BLACK, WHITE
+
+
+class TestTranspositionTable(unittest.TestCase):
+    """置換表的存取、取代策略，以及在相同深度下與不使用置換表的搜尋分數相同"""
+
+    def test_store_probe_and_replacement(self):
+        import transposition as tp
+        table = tp.TranspositionTable(size_mb=0.01)
+        self.assertLessEqual(table.capacity * tp.ENTRY_BYTES, 0.01 * (1 << 20))
+        self.assertIsNone(table.probe(12345))
+        table.store(12345, 3, tp.LOWER, -999990, 224)
+        self.assertEqual(table.probe(12345), (3, tp.LOWER, -999990, 224))
+        table.store(12345, 4, tp.EXACT, 17) # 同一局面直接更新
+        self.assertEqual(table.probe(12345), (4, tp.EXACT, 17, None))
+        # 同一個桶：較淺的結果放到第二格，不會蓋掉同一次搜尋中較深的結果
+        other = 12345 + (table.capacity << 3)
+        table.store(other, 1, tp.UPPER, 5, 0)
+        self.assertEqual(table.probe(12345)[0], 4)
+        self.assertEqual(table.probe(other), (1, tp.UPPER, 5, 0))
+        third = 12345 + (table.capacity << 4)
+        table.store(third, 2, tp.EXACT, 0, 1)
+        self.assertIsNone(table.probe(other))
+        # 新的一次搜尋：舊項目可以被較淺的結果取代
+        table.new_search()
+        table.store(other, 1, tp.EXACT, 9, 2)
+        self.assertIsNone(table.probe(12345))
+        self.assertEqual(table.probe(other), (1, tp.EXACT, 9, 2))
+        self.assertGreater(table.hit_rate, 0)
+        self.assertGreater(table.fill(), 0)
+        table.clear()
+        self.assertEqual(table.fill(), 0)
+
+    def test_search_with_table(self):
+        import ruleset
+        import search
+        import transposition as tp
+        rs = ruleset.get_ruleset("renju", 15)
+        board = rs.new_board()
+        for (r, c), player in [((7, 7), BLACK), ((6, 8), WHITE), ((8, 8), BLACK), ((6, 6), WHITE),
+                               ((6, 7), BLACK), ((8, 6), WHITE), ((9, 9), BLACK)]:
+            board[r][c] = player
+        plain = search.AlphaBetaSearch(rs).search(board, WHITE, 7, time_limit=60, max_depth=4)
+        cached = search.AlphaBetaSearch(rs, tt=tp.TranspositionTable(1)).search(board, WHITE, 7, time_limit=60, max_depth=4)
+        self.assertEqual((plain.depth, plain.score), (cached.depth, cached.score))
+        self.assertGreater(cached.tt_hit_rate, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+威脅空間搜尋 (threat-space search)：VCF (連續衝四勝) 與 VCT (連續活三 / 衝四勝)。
+
+深度優先搜尋，攻方只考慮威脅手：
+  - 四：落子後攻方有成五點，守方只能擋在該點 (兩個以上成五點即勝)；
+  - 三 (只用於 VCT)：落子後形成真活三 (strict_rules.line_info)，守方的應手為
+    讓所有活三線都不能再成為真活四的點，以及守方自己的衝四 (反擊)；
+    攻方必須對每一種應手都繼續獲勝。
+黑方的禁手會被考慮：黑方不能在禁手點攻擊或防守，白方衝四的唯一防守點若是黑方禁手，白方即勝。
+
+候選點以增量維護：攻方的威脅只可能出現在上一手攻方棋子的四條線上，
+舊的候選點在使用前重新確認 (守方棋子可能已經擋住)。
+失敗的局面以 Zobrist 雜湊記錄，避免不同手順到達同一局面時重複搜尋。
+搜尋受節點數與時間限制；超過限制時回傳目前結果並標記 complete = False。
+找到的手順一定成立，找不到不代表沒有 (守方反擊衝四後，攻方的擋子本身必須也是威脅)。
+"""
+import time
+
+from config import EMPTY, BLACK, WHITE
+import line_table
+import profiling
+import strict_rules
+import zobrist
+
+DEFAULT_MAX_NODES = 20000
+DEFAULT_TIME_LIMIT = 0.5 # 秒
+VCF_DEPTH = 12 # 攻方最多連續衝四的手數
+VCT_DEPTH = 6  # 攻方最多連續威脅 (三或四) 的手數
+
+FOUR_FLAGS = line_table.EXACT_FOUR | line_table.STRAIGHT_FOUR
+THREE_FLAGS = line_table.ANY_THREE
+
+
+class SearchBudgetExceeded(Exception):
+    """節點數或時間用完 (只在搜尋內部使用)。"""
+
+
+class ThreatResult:
+    """一次 VCF / VCT 搜尋的結果。"""
+
+    def __init__(self, kind, attacker, sequence, nodes, elapsed, complete):
+        self.kind = kind           # "vcf" 或 "vct"
+        self.attacker = attacker
+        self.sequence = sequence   # [(row, col, player), ...]，以攻方成五結束；找不到時為 None
+        self.nodes = nodes
+        self.elapsed = elapsed     # 秒
+        self.complete = complete   # False 表示在限制內沒有搜尋完
+
+    @property
+    def found(self):
+        return self.sequence is not None
+
+    def __repr__(self):
+        return (f"ThreatResult({self.kind}, attacker={self.attacker}, found={self.found}, "
+                f"nodes={self.nodes}, complete={self.complete})")
+
+
+class ThreatSearch:
+    """對單一 RuleSet 的 VCF / VCT 搜尋器。"""
+
+    def __init__(self, ruleset, max_nodes=DEFAULT_MAX_NODES, time_limit=DEFAULT_TIME_LIMIT):
+        self.ruleset = ruleset
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.zobrist = zobrist.get_table(ruleset.board_size)
+        size = ruleset.board_size
+        # line_points[r][c][d]: (r, c) 在方向 d 上前後 5 格內的棋盤座標
+        self.line_points = [[tuple(tuple((cr, cc) for cr, cc, _ in window[1]) for window in ruleset.windows[r][c])
+                             for c in range(size)] for r in range(size)]
+
+    # --- 對外介面 ---
+    def vcf(self, board, attacker, max_depth=VCF_DEPTH):
+        return self._search(board, attacker, "vcf", max_depth)
+
+    def vct(self, board, attacker, max_depth=VCT_DEPTH):
+        return self._search(board, attacker, "vct", max_depth)
+
+    def solve(self, board, attacker):
+        """先找 VCF，找不到再找 VCT (共用同一份節點與時間限制)。"""
+        result = self.vcf(board, attacker)
+        if result.found or not result.complete:
+            return result
+        vct_result = self._search(board, attacker, "vct", VCT_DEPTH,
+                                  self.max_nodes - result.nodes, self.time_limit - result.elapsed)
+        vct_result.nodes += result.nodes
+        vct_result.elapsed += result.elapsed
+        return vct_result
+
+    # --- 搜尋 ---
+    @profiling.timed("threat_search")
+    def _search(self, board, attacker, kind, max_depth, max_nodes=None, time_limit=None):
+        if profiling.ENABLED:
+            profiling.count("board_copy")
+        self.board = [row[:] for row in board] # 在複本上搜尋
+        self.attacker = attacker
+        self.defender = WHITE if attacker == BLACK else BLACK
+        self.allow_threes = kind == "vct"
+        self.nodes = 0
+        self.node_limit = self.max_nodes if max_nodes is None else max_nodes
+        self.deadline = self.time_limit if time_limit is None else time_limit
+        self.failed = {} # (雜湊, 剩餘深度) -> True：已證明在此深度內無法獲勝
+        self.hash = self.zobrist.hash_board(self.board)
+        self.start = time.perf_counter()
+
+        empties = [(r, c) for r in range(self.ruleset.board_size) for c in range(self.ruleset.board_size)
+                   if self.board[r][c] == EMPTY]
+        own_wins = [p for p in empties if self._wins(p, attacker)]
+        opp_wins = [p for p in empties if self._wins(p, self.defender)]
+        own_cands = self._threat_points(empties, attacker)
+        opp_cands = self._threat_points(empties, self.defender, FOUR_FLAGS)
+
+        sequence = None
+        complete = True
+        try:
+            sequence = self._attack(own_wins, opp_wins, own_cands, opp_cands, max_depth)
+        except SearchBudgetExceeded:
+            complete = False
+        return ThreatResult(kind, attacker, sequence, self.nodes, time.perf_counter() - self.start, complete)
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes > self.node_limit or (self.nodes & 63 == 0 and time.perf_counter() - self.start > self.deadline):
+            raise SearchBudgetExceeded()
+
+    # --- 棋盤操作 ---
+    def _place(self, p, player):
+        self.board[p[0]][p[1]] = player
+        self.hash = self.zobrist.toggle(self.hash, player, p[0], p[1])
+
+    def _remove(self, p, player):
+        self.board[p[0]][p[1]] = EMPTY
+        self.hash = self.zobrist.toggle(self.hash, player, p[0], p[1])
+
+    def _wins(self, p, player):
+        """player 在空點 p 落子是否勝利。"""
+        return self.board[p[0]][p[1]] == EMPTY and self.ruleset.check_win_condition_at(p[0], p[1], player, self.board)
+
+    def _legal(self, p, player):
+        return self.board[p[0]][p[1]] == EMPTY and (player != BLACK or self.ruleset.forbidden_reason(self.board, p[0], p[1]) is None)
+
+    def _flags(self, p, player):
+        flags = 0
+        for f in self.ruleset.line_flags(self.board, p[0], p[1], player):
+            flags |= f
+        return flags
+
+    def _threat_points(self, points, player, mask=None):
+        """points 中 player 落子後會形成四 (或 VCT 時的活三) 的空點。"""
+        if mask is None:
+            mask = FOUR_FLAGS | (THREE_FLAGS if self.allow_threes else 0)
+        return [p for p in points if self.board[p[0]][p[1]] == EMPTY and self._flags(p, player) & mask]
+
+    def _near(self, p):
+        """p 四條線上前後 5 格內的點。"""
+        return [q for line in self.line_points[p[0]][p[1]] for q in line]
+
+    def _line_gain(self, p, player, mask):
+        """
+        p 剛落下 player 的棋子：p 四條線上在「該方向」得到 mask 旗標的空點。
+        新棋子只會改變通過它的線，因此每個點只需要查一個方向。
+        """
+        board, table, windows = self.board, self.ruleset.table, self.ruleset.windows
+        window_code = self.ruleset._window_code
+        gained = []
+        for d, line in enumerate(self.line_points[p[0]][p[1]]):
+            for q in line:
+                if board[q[0]][q[1]] == EMPTY and table[window_code(board, windows[q[0]][q[1]][d], player)] & mask:
+                    gained.append(q)
+        return gained
+
+    def _updated_cands(self, cands, p, player, mask=None):
+        """p 落下 player 的棋子後的威脅候選點：保留仍是空點的舊候選 (使用前會再確認)，加上 p 線上的新威脅。"""
+        if mask is None:
+            mask = FOUR_FLAGS | (THREE_FLAGS if self.allow_threes else 0)
+        board = self.board
+        points = dict.fromkeys(q for q in cands if board[q[0]][q[1]] == EMPTY)
+        points.update(dict.fromkeys(self._line_gain(p, player, mask)))
+        return list(points)
+
+    def _win_points_near(self, wins, p, player):
+        """player 的成五點：舊的成五點重新確認，再加上 p 四條線上新的成五點。"""
+        points = dict.fromkeys(q for q in wins if self._wins(q, player))
+        points.update(dict.fromkeys(self._line_gain(p, player, self.ruleset.win_masks[player])))
+        return list(points)
+
+    # --- 攻方 ---
+    def _attack(self, own_wins, opp_wins, own_cands, opp_cands, depth):
+        """攻方落子：回傳勝利手順或 None。"""
+        self._tick()
+        attacker, defender = self.attacker, self.defender
+        own_wins = [p for p in own_wins if self._wins(p, attacker)]
+        if own_wins:
+            r, c = own_wins[0]
+            return [(r, c, attacker)]
+        if depth <= 0:
+            return None
+        key = (self.hash, depth)
+        if key in self.failed:
+            return None
+
+        opp_wins = [p for p in opp_wins if self._wins(p, defender)]
+        if len(opp_wins) >= 2:
+            self.failed[key] = True
+            return None
+
+        fours, threes = [], []
+        for p in own_cands:
+            if self.board[p[0]][p[1]] != EMPTY:
+                continue
+            flags = self._flags(p, attacker)
+            if flags & FOUR_FLAGS:
+                if self._legal(p, attacker):
+                    fours.append(p)
+            elif self.allow_threes and flags & THREE_FLAGS:
+                if self._legal(p, attacker):
+                    threes.append(p)
+        if opp_wins: # 必須擋住守方的成五點，而且擋子本身要是威脅
+            fours = [p for p in fours if p == opp_wins[0]]
+            threes = [p for p in threes if p == opp_wins[0]]
+
+        for m in fours:
+            sequence = self._attack_four(m, opp_wins, own_cands, opp_cands, depth)
+            if sequence is not None:
+                return sequence
+        for m in threes:
+            sequence = self._attack_three(m, opp_wins, own_cands, opp_cands, depth)
+            if sequence is not None:
+                return sequence
+        self.failed[key] = True
+        return None
+
+    def _attack_four(self, m, opp_wins, own_cands, opp_cands, depth):
+        attacker, defender = self.attacker, self.defender
+        self._place(m, attacker)
+        try:
+            new_wins = self._line_gain(m, attacker, self.ruleset.win_masks[attacker])
+            if not new_wins:
+                return None # 例如黑方的「四」只能成為長連
+            move = (m[0], m[1], attacker)
+            if len(new_wins) >= 2: # 活四或四四，守方擋不住
+                (r1, c1), (r2, c2) = new_wins[0], new_wins[1]
+                return [move, (r1, c1, defender), (r2, c2, attacker)]
+            d = new_wins[0]
+            if not self._legal(d, defender): # 唯一的防守點是黑方禁手
+                return [move, (d[0], d[1], attacker)]
+            self._place(d, defender)
+            try:
+                sequence = self._attack(
+                    new_wins,
+                    self._win_points_near(opp_wins, d, defender),
+                    self._updated_cands(own_cands, m, attacker),
+                    self._updated_cands(opp_cands, d, defender, FOUR_FLAGS),
+                    depth - 1)
+            finally:
+                self._remove(d, defender)
+            if sequence is None:
+                return None
+            return [move, (d[0], d[1], defender)] + sequence
+        finally:
+            self._remove(m, attacker)
+
+    def _three_lines(self, m):
+        """m (已落下) 形成真活三的方向：{方向: 補一子即成真活四的點}，以 strict_rules.line_info 判斷。"""
+        r, c = m
+        lines = {}
+        for d, window in enumerate(self.ruleset.windows[r][c]):
+            offsets = strict_rules.line_info(self.ruleset._window_code(self.board, window, self.attacker))[1]
+            if offsets:
+                dr, dc = self.ruleset.directions[d]
+                lines[d] = [(r + k * dr, c + k * dc) for k in offsets]
+        return lines
+
+    def _three_defenses(self, m):
+        """
+        守方對活三 m 的有效防守點 (dict)：落子後 m 的每一條活三線都不再能成為真活四。
+        m 不是真活三，或攻方的活四點都是禁手時回傳 None (不構成威脅)。
+        """
+        lines = self._three_lines(m)
+        if not any(self._legal(t, self.attacker) for points in lines.values() for t in points):
+            return None
+        defenses = {}
+        for d in lines:
+            for q in self.line_points[m[0]][m[1]][d]:
+                if q in defenses or not self._legal(q, self.defender):
+                    continue
+                self._place(q, self.defender)
+                try:
+                    if not any(d2 in self._three_lines(m) for d2 in lines):
+                        defenses[q] = None
+                finally:
+                    self._remove(q, self.defender)
+        return defenses
+
+    def _attack_three(self, m, opp_wins, own_cands, opp_cands, depth):
+        """攻方下活三：守方的每一種應手 (線上空點或反擊衝四) 之後攻方都必須繼續獲勝。"""
+        attacker, defender = self.attacker, self.defender
+        self._place(m, attacker)
+        try:
+            defenses = self._three_defenses(m)
+            if defenses is None:
+                return None
+            defenses.update(dict.fromkeys(q for q in opp_cands # 守方的反擊衝四
+                                          if self._flags(q, defender) & FOUR_FLAGS and self._legal(q, defender)))
+            next_cands = self._updated_cands(own_cands, m, attacker)
+            longest = None
+            for d in defenses:
+                self._place(d, defender)
+                try:
+                    sequence = self._attack(
+                        [],
+                        self._win_points_near(opp_wins, d, defender),
+                        next_cands,
+                        self._updated_cands(opp_cands, d, defender, FOUR_FLAGS),
+                        depth - 1)
+                finally:
+                    self._remove(d, defender)
+                if sequence is None:
+                    return None
+                if longest is None or len(sequence) + 1 > len(longest):
+                    longest = [(d[0], d[1], defender)] + sequence
+            if longest is None:
+                return None
+            return [(m[0], m[1], attacker)] + longest
+        finally:
+            self._remove(m, attacker)
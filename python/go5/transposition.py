@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+置換表 (TranspositionTable)。
+
+五子棋的同一組棋子可以由很多種手順到達，搜尋時以 (Zobrist 雜湊 ^ 輪到誰下) 為鍵保存
+已搜尋過的結果。每個項目壓縮成兩個 64 位元整數，存在固定大小的 NumPy 陣列中
+(容量由 size_mb 決定，取 2 的次方)：
+  - key  : 雜湊 ^ data (讀取時以 key ^ data == 雜湊 驗證，寫到一半的項目不會被誤用)
+  - data : 最佳著法 (16 位元，點編號 + 1) | 深度 (8) | 界限 (2) | 世代 (6) | 分數 (32)
+每個雜湊對應兩格的桶：第一格保留深度較深 (或同一次搜尋) 的結果，第二格總是取代。
+new_search() 讓上一次搜尋的項目變成「舊的」，可以被任何新結果取代。
+"""
+import numpy as np
+
+DEFAULT_SIZE_MB = 16
+ENTRY_BYTES = 16
+
+# --- 界限 ---
+EXACT = 0
+LOWER = 1 # 分數 >= 保存的值 (beta 剪枝)
+UPPER = 2 # 分數 <= 保存的值 (沒有超過 alpha)
+
+_SCORE_OFFSET = 1 << 31
+_GENERATIONS = 64
+
+
+def _capacity(size_mb):
+    """size_mb 內最多的項目數 (2 的次方，至少一個桶)。"""
+    entries = max(2, int(size_mb * (1 << 20)) // ENTRY_BYTES)
+    return 1 << (entries.bit_length() - 1)
+
+
+def buffer_size(size_mb=DEFAULT_SIZE_MB):
+    """size_mb 的置換表使用外部 buffer (例如共用記憶體) 時所需的位元組數。"""
+    return _capacity(size_mb) * ENTRY_BYTES
+
+
+class TranspositionTable:
+    """固定大小的置換表；probe / store 以 Python 整數操作 NumPy 陣列。"""
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB, buffer=None):
+        """buffer 不為 None 時使用外部的記憶體 (至少 buffer_size(size_mb) 位元組，內容不會被清除)。"""
+        self.capacity = _capacity(size_mb)
+        if buffer is None:
+            self.entries = np.zeros((self.capacity, 2), dtype=np.uint64)
+        else:
+            self.entries = np.ndarray((self.capacity, 2), dtype=np.uint64, buffer=buffer)
+        self.size_mb = self.capacity * ENTRY_BYTES / (1 << 20)
+        self._mask = self.capacity - 2 # 桶的起點 (偶數)
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    # --- 存取 ---
+    def probe(self, h):
+        """回傳 (depth, bound, score, move) 或 None；move 為點編號或 None。"""
+        self.probes += 1
+        entries = self.entries
+        i = h & self._mask
+        for slot in (i, i + 1):
+            data = int(entries[slot, 1])
+            if data and int(entries[slot, 0]) ^ data == h:
+                self.hits += 1
+                move = (data & 0xFFFF) - 1
+                return ((data >> 16) & 0xFF, (data >> 24) & 0x3, (data >> 32) - _SCORE_OFFSET,
+                        move if move >= 0 else None)
+        return None
+
+    def store(self, h, depth, bound, score, move=None):
+        """保存結果 (depth 為 0..255，move 為點編號或 None)。"""
+        self.stores += 1
+        data = (((move + 1) if move is not None else 0)
+                | (depth & 0xFF) << 16 | bound << 24 | self.generation << 26
+                | (score + _SCORE_OFFSET) << 32)
+        entries = self.entries
+        i = h & self._mask
+        slot = i + 1 # 預設：總是取代的第二格
+        for candidate in (i, i + 1):
+            old = int(entries[candidate, 1])
+            if old and int(entries[candidate, 0]) ^ old == h: # 同一個局面
+                slot = candidate
+                break
+        else:
+            old = int(entries[i, 1])
+            if not old or (old >> 26) & 0x3F != self.generation or (old >> 16) & 0xFF <= depth:
+                slot = i
+        entries[slot, 0] = h ^ data
+        entries[slot, 1] = data
+
+    def new_search(self):
+        """開始新的一次搜尋：上一次的項目可以被取代。"""
+        self.generation = (self.generation + 1) % _GENERATIONS
+
+    def clear(self):
+        self.entries.fill(0)
+        self.generation = 0
+        self.probes = self.hits = self.stores = 0
+
+    # --- 統計 ---
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def fill(self):
+        """已使用的項目比例。"""
+        return int(np.count_nonzero(self.entries[:, 1])) / self.capacity
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "size_mb": self.size_mb,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate,
+            "stores": self.stores,
+            "fill": self.fill(),
+        }
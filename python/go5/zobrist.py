@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Zobrist 雜湊。
+
+每個 (玩家, 點) 對應一個固定的 64 位元亂數，局面的雜湊為所有棋子亂數的 XOR。
+落子與提子都是同一次 XOR (toggle)，因此可以隨棋盤逐手增量維護；
+亂數以固定種子產生，同樣大小的棋盤在每次執行中得到相同的雜湊。
+"""
+import random
+from config import EMPTY, BLACK, WHITE
+
+ZOBRIST_SEED = 0x5EED60 # 固定種子：雜湊值在不同執行之間保持一致
+
+_tables = {}
+
+
+class ZobristTable:
+    """board_size x board_size 棋盤的 Zobrist 亂數表。"""
+
+    def __init__(self, board_size, seed=ZOBRIST_SEED):
+        rng = random.Random(seed + board_size)
+        self.board_size = board_size
+        self.keys = {player: [[rng.getrandbits(64) for _ in range(board_size)] for _ in range(board_size)]
+                     for player in (BLACK, WHITE)}
+        self.side_key = rng.getrandbits(64) # 輪到白方時 XOR (搜尋的置換表使用)
+
+    def toggle(self, h, player, r, c):
+        """在 (r, c) 放下或移除 player 的棋子後的雜湊。"""
+        return h ^ self.keys[player][r][c]
+
+    def hash_board(self, board):
+        """從頭計算整個棋盤的雜湊 (初始化與驗證用)。"""
+        h = 0
+        for r, row in enumerate(board):
+            for c, cell in enumerate(row):
+                if cell != EMPTY:
+                    h ^= self.keys[cell][r][c]
+        return h
+
+
+def get_table(board_size):
+    """回傳 board_size 的共用 ZobristTable。"""
+    if board_size not in _tables:
+        _tables[board_size] = ZobristTable(board_size)
+    return _tables[board_size]